@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -32,6 +33,7 @@ class Conversation(BaseModel):
     created_at: datetime
     updated_at: datetime
     messages: List[Message] = []
+    message_count: Optional[int] = None
 
 class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
@@ -357,33 +359,24 @@ async def send_message_stream(request: ChatRequest):
         raise HTTPException(status_code=500, detail={"error": str(e)})
 
 @router.get("/conversations", response_model=List[Conversation])
-async def get_conversations():
+async def get_conversations(response: Response, limit: Optional[int] = Query(None, ge=1),
+                            cursor: Optional[str] = None, include_messages: bool = True):
     """
-    Get all conversations with their messages (unsorted per conversation).
+    Conversations with their messages, most recently updated first, one page of `limit` at a
+    time (all of them when limit is omitted and CONVERSATION_PAGE_SIZE is 0). Pass the
+    X-Next-Cursor header back as `cursor` for the next page; include_messages=false returns
+    summaries (message_count only).
     """
-    db_conversations = memory_service.get_conversations()
-    results: List[Conversation] = []
-    for conv in db_conversations:
-        db_messages = memory_service.get_messages(conv.id)
-        results.append(
-            Conversation(
-                id=conv.id,
-                title=conv.title,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                messages=[
-                    Message(
-                        id=m.id,
-                        role=m.role,
-                        content=m.content,
-                        timestamp=m.timestamp,
-                        tokens=m.tokens,
-                        mode=m.mode,
-                    ) for m in db_messages
-                ],
-            )
+    try:
+        page, next_cursor = await run_in_threadpool(
+            memory_service.conversation_page, limit, cursor=cursor, include_messages=include_messages,
         )
-    return results
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e)})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    # Same listing as /memory/conversations; this model has no tags, so they are left out
+    return [Conversation(**conv) for conv in page]
 
 @router.get("/conversation/{conversation_id}", response_model=Conversation)
 async def get_conversation(conversation_id: str):
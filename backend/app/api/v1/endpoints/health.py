@@ -4,6 +4,7 @@ from app.services.budget_service import budget_service
 from app.services.memory_service import memory_service
 from app.services.model_router import ModelRouter
 from app.services.cache_service import cache_service
+from app.services.embedding_service import embedding_service
 from app.models.database import db
 import os
 import psutil
@@ -31,8 +32,8 @@ async def health_services():
     }
     # DB check
     try:
-        # simple query: list conversations
-        _ = db.get_conversations()
+        # simple query: first page of conversations (one row, no messages)
+        _ = db.list_conversations(1, include_messages=False)
     except Exception:
         status["database"] = "error"
 
@@ -113,7 +114,7 @@ async def readiness_probe():
     
     try:
         # Database connectivity
-        _ = db.get_conversations()
+        _ = db.list_conversations(1, include_messages=False)
         checks["database"] = True
     except Exception as e:
         logger.error(f"Database readiness check failed: {e}")
@@ -202,7 +203,8 @@ async def metrics():
             },
             "services": {
                 "redis_healthy": redis_status,
-                "models_count": model_count
+                "models_count": model_count,
+                "embedding_cache": embedding_service.cache_stats(),
             }
         }
     except Exception as e:
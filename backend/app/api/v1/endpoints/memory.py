@@ -1,9 +1,19 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException
+import base64
+import time
+import zlib
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 from datetime import datetime
+from app.core.config import settings
+from app.services import memory_export
 from app.services.memory_service import memory_service
+from app.services.vector_reindex import vector_reindexer
+from app.services.vector_store import vector_store
 
 router = APIRouter()
 
@@ -26,18 +36,20 @@ async def set_message_tags(message_id: str, body: TagsUpdateRequest):
 
 
 @router.get("/export")
-async def export_memory(format: str = "json"):
-    data = memory_service.export_all()
-    if format == "jsonl":
-        # Return JSON Lines
-        import json
-        lines = []
-        for c in data.get("conversations", []):
-            lines.append(json.dumps({"type": "conversation", **c}))
-        for m in data.get("messages", []):
-            lines.append(json.dumps({"type": "message", **m}))
-        return "\n".join(lines)
-    return data
+async def export_memory(format: str = "json", compress: str = "none"):
+    """
+    Stream the whole memory: format=json (one document), jsonl/ndjson (one typed record per
+    line); compress=gzip|zstd compresses on the fly. Memory use does not grow with the export.
+    """
+    try:
+        chunks = memory_service.stream_export(format, compress)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e)})
+    return StreamingResponse(
+        chunks,
+        media_type=memory_export.media_type(format, compress),
+        headers={"Content-Disposition": f'attachment; filename="{memory_export.filename(format, compress)}"'},
+    )
 
 class ImportRequest(BaseModel):
     conversations: List[dict] = []
@@ -46,12 +58,102 @@ class ImportRequest(BaseModel):
 
 @router.post("/import")
 async def import_memory(body: ImportRequest):
-    result = memory_service.import_data({
+    result = await run_in_threadpool(memory_service.import_data, {
         "conversations": body.conversations,
         "messages": body.messages,
     }, merge=body.merge)
     return result
 
+@router.post("/import/ndjson")
+async def import_memory_ndjson(request: Request, merge: bool = True, compress: str = "none"):
+    """
+    Import a streamed NDJSON body (the /export?format=ndjson output, optionally gzip/zstd
+    compressed). Records are inserted and indexed in chunks as they arrive, so the upload is
+    never held in memory; returns counts and rows/sec.
+    """
+    try:
+        reader = memory_export.NdjsonReader(compress)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e)})
+    job = memory_service.begin_import(merge)
+    chunk: list = []
+    try:
+        async for data in request.stream():
+            chunk.extend(reader.feed(data))
+            if len(chunk) >= job.chunk_size:
+                await run_in_threadpool(job.add, chunk)
+                chunk = []
+        chunk.extend(reader.close())
+        if chunk:
+            await run_in_threadpool(job.add, chunk)
+    except (ValueError, zlib.error) as e:
+        # Bad timestamps or a corrupt stream: chunks before it stay imported
+        result = await run_in_threadpool(job.finish)
+        raise HTTPException(status_code=400, detail={"error": str(e), "imported": result})
+    except BaseException:
+        await run_in_threadpool(job.finish)
+        raise
+    return await run_in_threadpool(job.finish)
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+    encoding: Literal["float", "base64"] = "float"  # base64 = little-endian float32 rows, concatenated
+
+@router.post("/embed")
+async def embed_texts(body: EmbedRequest):
+    """
+    Embed many texts in one call. Large batches are sharded across the embedding worker pool.
+    """
+    if len(body.texts) > settings.EMBEDDING_API_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail={"error": "Too many texts", "max": settings.EMBEDDING_API_MAX_TEXTS})
+    started = time.perf_counter()
+    # CPU-bound; keep it off the event loop
+    vecs = await run_in_threadpool(memory_service.embed_texts, body.texts)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    info = memory_service.embedding_info()
+    result = {
+        "count": int(vecs.shape[0]),
+        "dim": int(vecs.shape[1]),
+        "backend": info["backend"],
+        "version": info["version"],
+        "elapsed_ms": round(elapsed_ms, 2),
+    }
+    if body.encoding == "base64":
+        result["embeddings_b64"] = base64.b64encode(np.ascontiguousarray(vecs, dtype="<f4").tobytes()).decode("ascii")
+    else:
+        result["embeddings"] = vecs.tolist()
+    return result
+
+
+@router.get("/index")
+async def vector_index_stats():
+    """
+    Vector index type, size and migration state.
+    """
+    return vector_store.stats()
+
+@router.get("/index/recall")
+async def vector_index_recall(queries: int = 100, k: int = 10):
+    """
+    Recall@k of the live (possibly approximate) index against an exact scan of its vectors.
+    """
+    return await run_in_threadpool(vector_store.recall_check, max(1, min(queries, 1000)), max(1, min(k, 100)))
+
+@router.post("/index/rebuild", status_code=202)
+async def rebuild_vector_index():
+    """
+    Re-embed every message from the database into a new index built side-by-side, then swap
+    it in. Runs in the background; poll GET /index/rebuild for progress.
+    """
+    if not vector_reindexer.start():
+        raise HTTPException(status_code=409, detail={"error": "Rebuild already running", "status": vector_reindexer.status()})
+    return vector_reindexer.status()
+
+@router.get("/index/rebuild")
+async def vector_index_rebuild_status():
+    return vector_reindexer.status()
+
 
 class Message(BaseModel):
     id: str
@@ -75,9 +177,17 @@ class Conversation(BaseModel):
     updated_at: datetime
     messages: List[Message] = []
     tags: List[str] = []
+    message_count: Optional[int] = None
 
 class MemorySearchRequest(BaseModel):
     query: str
+    read_your_writes: bool = False  # wait for just-added messages to be indexed
+    # Optional metadata filters, applied before ranking
+    conversation_id: Optional[str] = None
+    role: Optional[str] = None
+    mode: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
 
 class MemorySearchResponse(BaseModel):
     results: List[Message]
@@ -87,68 +197,39 @@ class ConversationStats(BaseModel):
     total_messages: int
     total_tokens: int
 
+async def _conversation_page(response: Response, limit: Optional[int], cursor: Optional[str],
+                             include_messages: bool, tags: Optional[List[str]] = None) -> List[Conversation]:
+    """One page of a conversation listing; the next page's cursor goes in the X-Next-Cursor header."""
+    try:
+        page, next_cursor = await run_in_threadpool(
+            memory_service.conversation_page, limit, cursor=cursor, tags=tags, include_messages=include_messages,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e)})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [Conversation(**conv) for conv in page]
+
 @router.get("/conversations/by-tags", response_model=List[Conversation])
-async def get_conversations_by_tags(tags: str = ""):
+async def get_conversations_by_tags(response: Response, tags: str = "", limit: Optional[int] = Query(None, ge=1),
+                                    cursor: Optional[str] = None, include_messages: bool = True):
+    """
+    Conversations carrying all of the comma-separated `tags`, paginated like /conversations
+    """
     tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-    convos = memory_service.filter_conversations_by_tags(tag_list)
-    response: List[Conversation] = []
-    for conv in convos:
-        db_messages = memory_service.get_messages(conv.id)
-        messages = [
-            Message(
-                id=msg.id,
-                role=msg.role,
-                content=msg.content,
-                timestamp=msg.timestamp,
-                tokens=msg.tokens,
-                mode=msg.mode,
-            )
-            for msg in db_messages
-        ]
-        response.append(
-            Conversation(
-                id=conv.id,
-                title=conv.title,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                messages=messages,
-                tags=(conv.tags.split(",") if conv.tags else []),
-            )
-        )
-    return response
+    return await _conversation_page(response, limit, cursor, include_messages, tags=tag_list)
 
 @router.get("/conversations", response_model=List[Conversation])
-async def get_conversations():
+async def get_conversations(response: Response, limit: Optional[int] = Query(None, ge=1),
+                            cursor: Optional[str] = None, include_messages: bool = True):
     """
-    Get all conversations
+    Conversations, most recently updated first, one page at a time.
+    - limit: page size, capped at CONVERSATION_PAGE_MAX (default CONVERSATION_PAGE_SIZE; when
+      that is 0, the whole listing in one response, as before paging)
+    - cursor: the X-Next-Cursor header of the previous page; absent on the last page
+    - include_messages=false returns summaries (message_count, no messages)
     """
-    db_conversations = memory_service.get_conversations()
-    response_conversations = []
-    for conv in db_conversations:
-        # Get messages for each conversation
-        db_messages = memory_service.get_messages(conv.id)
-        messages = [
-            Message(
-                id=msg.id,
-                role=msg.role,
-                content=msg.content,
-                timestamp=msg.timestamp,
-                tokens=msg.tokens,
-                mode=msg.mode
-            )
-            for msg in db_messages
-        ]
-        response_conversations.append(
-            Conversation(
-                id=conv.id,
-                title=conv.title,
-                created_at=conv.created_at,
-                updated_at=conv.updated_at,
-                messages=messages,
-                tags=(conv.tags.split(",") if conv.tags else [])
-            )
-        )
-    return response_conversations
+    return await _conversation_page(response, limit, cursor, include_messages)
 
 @router.get("/conversation/{conversation_id}")
 async def get_conversation(conversation_id: str):
@@ -194,6 +275,25 @@ async def get_conversation(conversation_id: str):
         ]
     }
 
+@router.delete("/conversation/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """
+    Delete a conversation, its messages and their vectors
+    """
+    # Database and vector deletes block; keep them off the event loop
+    if not await run_in_threadpool(memory_service.delete_conversation, conversation_id):
+        raise HTTPException(status_code=404, detail={"error": "Conversation not found"})
+    return {"status": "deleted", "id": conversation_id}
+
+@router.delete("/message/{message_id}")
+async def delete_message(message_id: str):
+    """
+    Delete a message and its vector
+    """
+    if not await run_in_threadpool(memory_service.delete_message, message_id):
+        raise HTTPException(status_code=404, detail={"error": "Message not found"})
+    return {"status": "deleted", "id": message_id}
+
 @router.post("/save")
 async def save_memory(item: MemoryItem):
     """
@@ -207,13 +307,15 @@ async def save_memory(item: MemoryItem):
     return {"status": "saved", "id": conversation.id}
 
 @router.get("/search")
-async def search_memory(query: str):
+async def search_memory(query: str, conversation_id: Optional[str] = None, role: Optional[str] = None,
+                        mode: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None):
     """
     Search memory items - performs semantic search across stored conversations
     """
-    # In a full implementation, this would use vector embeddings
-    # For now, it returns an empty list
-    results = memory_service.semantic_search(query)
+    results = await run_in_threadpool(
+        memory_service.semantic_search, query, conversation_id=conversation_id, role=role, mode=mode,
+        since=since, until=until,
+    )
     return {
         "results": [
             {
@@ -234,7 +336,17 @@ async def search_memory_post(request: MemorySearchRequest):
     """
     Search memory using POST with request body
     """
-    results = memory_service.semantic_search(request.query)
+    # Embedding, index search and a read-your-writes flush can all block; keep them off the event loop
+    results = await run_in_threadpool(
+        memory_service.semantic_search,
+        request.query,
+        read_your_writes=request.read_your_writes,
+        conversation_id=request.conversation_id,
+        role=request.role,
+        mode=request.mode,
+        since=request.since,
+        until=request.until,
+    )
     response_results = [
         Message(
             id=result.id,
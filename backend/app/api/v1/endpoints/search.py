@@ -1,7 +1,9 @@
 from __future__ import annotations
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional, Literal, Dict
+from datetime import datetime
 
 from app.services.memory_service import memory_service
 from app.services.unified_search_service import unified_search_service
@@ -12,6 +14,13 @@ router = APIRouter()
 
 class SearchRequest(BaseModel):
     query: str
+    read_your_writes: bool = False  # wait for just-added messages to be indexed
+    # Optional metadata filters, applied before ranking
+    conversation_id: Optional[str] = None
+    role: Optional[str] = None
+    mode: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
 
 
 class SearchResult(BaseModel):
@@ -25,7 +34,17 @@ class SearchResult(BaseModel):
 
 @router.post("/semantic", response_model=List[SearchResult])
 async def semantic_search(req: SearchRequest):
-    results = memory_service.semantic_search(req.query)
+    # Embedding, index search and a read-your-writes flush can all block; keep them off the event loop
+    results = await run_in_threadpool(
+        memory_service.semantic_search,
+        req.query,
+        read_your_writes=req.read_your_writes,
+        conversation_id=req.conversation_id,
+        role=req.role,
+        mode=req.mode,
+        since=req.since,
+        until=req.until,
+    )
     return [
         SearchResult(
             id=m.id,
@@ -38,6 +57,55 @@ async def semantic_search(req: SearchRequest):
         for m in results
     ]
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    k: int = 5
+    read_your_writes: bool = False
+    # Optional metadata filters, applied to every query
+    conversation_id: Optional[str] = None
+    role: Optional[str] = None
+    mode: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+
+class BatchSearchResponse(BaseModel):
+    results: List[List[SearchResult]]  # one list per query, in request order
+
+
+@router.post("/semantic/batch", response_model=BatchSearchResponse)
+async def semantic_search_batch(req: BatchSearchRequest):
+    if len(req.queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail={"error": "Too many queries", "max": settings.SEARCH_BATCH_MAX_QUERIES})
+    if req.k < 1 or req.k > settings.SEARCH_BATCH_MAX_K:
+        raise HTTPException(status_code=422, detail={"error": "k out of range", "max": settings.SEARCH_BATCH_MAX_K})
+    # CPU-bound embedding + index search; keep it off the event loop
+    batches = await run_in_threadpool(
+        memory_service.search_batch,
+        req.queries,
+        k=req.k,
+        read_your_writes=req.read_your_writes,
+        conversation_id=req.conversation_id,
+        role=req.role,
+        mode=req.mode,
+        since=req.since,
+        until=req.until,
+    )
+    return BatchSearchResponse(results=[
+        [
+            SearchResult(
+                id=m.id,
+                role=m.role,
+                content=m.content,
+                timestamp=m.timestamp.isoformat(),
+                tokens=m.tokens,
+                mode=m.mode,
+            )
+            for m in results
+        ]
+        for results in batches
+    ])
+
 class UnifiedSearchRequest(BaseModel):
     query: str
     include_local: bool = True
@@ -16,6 +16,27 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./data/local_ai.db"
+    DATABASE_ECHO: bool = False  # log every SQL statement (LOG_LEVEL=DEBUG also turns SQL logging on)
+    DATABASE_POOL_SIZE: int = 8  # pooled connections kept open (pragmas run once per connection)
+    DATABASE_MAX_OVERFLOW: int = 16  # extra connections allowed under bursts
+    DATABASE_POOL_TIMEOUT_SEC: float = 30.0
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL: readers never block the writer or each other; "DELETE" = SQLite default
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # NORMAL (with WAL) survives app crashes, may lose the last commits on power loss; FULL = SQLite default
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # wait this long for a competing writer instead of failing with "database is locked"
+    SQLITE_CACHE_SIZE_MB: int = 64  # page cache per connection (SQLite default ~2 MB)
+    SQLITE_MMAP_SIZE_MB: int = 256  # memory-map this much of the file for reads; 0 = off (SQLite default)
+    CONVERSATION_PAGE_SIZE: int = 0  # page size of conversation listings requested without `limit`; 0 = the whole listing
+    CONVERSATION_PAGE_MAX: int = 500  # largest page a client may request
+    MEMORY_EXPORT_BATCH_SIZE: int = 1000  # rows fetched per round-trip while streaming /memory/export
+    MEMORY_IMPORT_CHUNK_SIZE: int = 1000  # records per insert batch (and transaction) when importing
+    MEMORY_IMPORT_ENCRYPT_THREADS: int = 0  # threads encrypting imported content; 0 = min(4, cpu count), 1 = inline
+    MEMORY_IMPORT_MAX_LINE_BYTES: int = 16 * 1024 * 1024  # longest (decompressed) NDJSON import line; longer fails the import; 0 = no limit
+
+    # Memory retrieval
+    MEMORY_HYBRID_SEARCH: bool = True  # SQLite FTS5 lexical index fused with vector hits in semantic search
+    MEMORY_HYBRID_CANDIDATES: int = 20  # hits taken from each retriever before fusion
+    MEMORY_RRF_K: int = 60  # reciprocal rank fusion constant (higher flattens rank differences)
+    MEMORY_LEXICAL_WEIGHT: float = 1.0  # weight of lexical ranks relative to vector ranks
     
     # Cache (Redis)
     REDIS_URL: str = "redis://redis:6379/0"
@@ -26,8 +47,59 @@ class Settings(BaseSettings):
     # Embeddings / Vector index
     EMBEDDING_DIM: int = 768
     EMBEDDING_MODEL_PATH: Optional[str] = None  # If None, defaults to f"{MODEL_PATH}/embedding.onnx" in code
+    EMBEDDING_TOKEN_CACHE_SIZE: int = 200_000  # LRU entries for token -> hash bucket (0 disables)
+    EMBEDDING_BACKEND: str = "hashing"  # hashing | onnx (falls back to hashing if the model is missing)
+    EMBEDDING_TOKENIZER_PATH: Optional[str] = None  # If None, tokenizer.json next to the ONNX model
+    EMBEDDING_MAX_LENGTH: int = 256
+    EMBEDDING_ONNX_INTRA_OP_THREADS: int = 0  # 0 lets onnxruntime pick
+    EMBEDDING_ONNX_INTER_OP_THREADS: int = 1
+    EMBEDDING_BATCH_WINDOW_MS: float = 5.0  # dynamic batching window for concurrent calls (0 disables)
+    EMBEDDING_MAX_BATCH_SIZE: int = 64
+    EMBEDDING_CACHE_SIZE: int = 10_000  # in-memory LRU entries for text -> vector (0 disables)
+    EMBEDDING_CACHE_PATH: Optional[str] = "./data/embedding_cache.db"  # SQLite store, opened on first use; empty disables
+    EMBEDDING_CACHE_DISK_MAX_ITEMS: int = 200_000  # SQLite store rows before least recently used ones are evicted (0 = no cap)
+    EMBEDDING_POOL_WORKERS: int = 0  # worker processes for bulk embedding (0 = cpu count)
+    EMBEDDING_POOL_MIN_BATCH: int = 2048  # smaller batches stay in-process
+    EMBEDDING_POOL_CHUNK_SIZE: int = 1024  # texts per worker task
+    EMBEDDING_API_MAX_TEXTS: int = 100_000  # per /memory/embed request
+    SEARCH_BATCH_MAX_QUERIES: int = 1024  # /search/semantic/batch request cap
+    SEARCH_BATCH_MAX_K: int = 100
     VECTOR_INDEX_PATH: str = "./data/vector.index"
     VECTOR_META_PATH: str = "./data/vector_meta.json"
+    VECTOR_SHARD_BY: str = "none"  # none | month (time-partitioned shards, see ShardedVectorStore)
+    VECTOR_SHARD_DIR: Optional[str] = None  # If None, f"{VECTOR_INDEX_PATH}.shards"
+    VECTOR_SHARD_SEARCH_THREADS: int = 0  # 0 = min(8, cpu count)
+    VECTOR_INDEX_MMAP: bool = True  # memory-map dense index snapshots on load (copied on first write)
+    VECTOR_INDEX_TYPE: str = "flat"  # flat | sparse | hnsw | ivf | ivfpq | fp16 | sq8 | pq | opq | auto (flat -> hnsw -> ivf by size)
+    VECTOR_AUTO_HNSW_AT: int = 100_000  # "auto": migrate flat -> HNSW at this many vectors
+    VECTOR_AUTO_IVF_AT: int = 2_000_000  # "auto": migrate HNSW -> IVF at this many vectors
+    VECTOR_MIGRATION_RETRY_SEC: float = 300.0  # after a failed index migration, writes wait this long before retrying it
+    VECTOR_HNSW_M: int = 32
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 80
+    VECTOR_HNSW_EF_SEARCH: int = 64
+    VECTOR_IVF_NLIST: int = 0  # 0 = ~4*sqrt(n)
+    VECTOR_IVF_NPROBE: int = 16
+    VECTOR_PQ_M: int = 64  # PQ sub-quantizers (rounded down to a divisor of the dimension)
+    VECTOR_ANN_TRAIN_SAMPLE: int = 100_000  # max vectors sampled for IVF/PQ/SQ training
+    VECTOR_MEMORY_BUDGET_MB: float = 0  # "auto": compress (fp16 -> sq8 -> pq) to fit this index size; 0 = unlimited
+    VECTOR_RERANK_FACTOR: int = 4  # lossy indexes shortlist k*factor hits, rescored from full-precision vectors; 0 = off
+    VECTOR_TOMBSTONE_PURGE_RATIO: float = 0.2  # rebuild without removed vectors past this dead fraction
+    VECTOR_TOMBSTONE_PURGE_MIN: int = 1000  # ...and at least this many dead vectors
+    VECTOR_FILTER_EXACT_MAX: int = 4096  # filtered searches matching at most this many vectors are scored exactly
+    VECTOR_LOG_PATH: Optional[str] = None  # If None, f"{VECTOR_INDEX_PATH}.log"
+    VECTOR_SNAPSHOT_KEEP: int = 2  # snapshot versions kept on disk (older ones are fallbacks if the newest is damaged)
+    VECTOR_SNAPSHOT_VERIFY_CHECKSUMS: bool = True  # CRC32 snapshot files on startup (False: sizes only)
+    VECTOR_SNAPSHOT_FSYNC: bool = True  # fsync snapshot files before the commit rename
+    VECTOR_LOG_COMPACT_BYTES: int = 64 * 1024 * 1024  # fold the append log into a snapshot past this size
+    VECTOR_LOG_FSYNC: bool = False
+    VECTOR_WRITE_BEHIND: bool = True  # index new messages in a background batch instead of on the request path
+    VECTOR_WRITE_BATCH_SIZE: int = 64
+    VECTOR_WRITE_FLUSH_MS: float = 200.0
+    VECTOR_WRITE_ATTEMPTS: int = 3  # tries per queued insert before it is dropped (counted as write_dropped)
+    VECTOR_WRITE_RETRY_MS: float = 1000.0  # pause before retrying a failed write-behind batch
+    VECTOR_READ_YOUR_WRITES_TIMEOUT_SEC: float = 2.0
+    VECTOR_REINDEX_BATCH_SIZE: int = 2048  # messages per DB page / embedding batch when rebuilding from the database
+    VECTOR_REINDEX_ON_STARTUP: bool = True  # rebuild in the background when the index is missing, unreadable or of another dimension
 
     # Retrieval-Augmented Generation (RAG)
     RETRIEVAL_ENABLED: bool = True
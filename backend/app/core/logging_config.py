@@ -62,6 +62,9 @@ def setup_logging():
         console_handler.setFormatter(formatter)
     
     root_logger.addHandler(console_handler)
+
+    # SQL statements only at DEBUG (DATABASE_ECHO forces them on regardless)
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if log_level == "DEBUG" else logging.WARNING)
     
     # File handlers for production
     if os.getenv("ENV") == "production":
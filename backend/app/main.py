@@ -1,11 +1,15 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1 import router as api_v1_router
 from app.core.config import settings
 from app.core.logging_config import setup_logging
+from app.services.vector_reindex import vector_reindexer
+from app.services.vector_store import vector_store
 
 # Setup logging based on environment
 setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,8 +24,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin clients need the listing cursor to fetch the next page
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.on_event("startup")
+def rebuild_vector_index_if_needed():
+    # A lost/unreadable index or a new embedding dimension is rebuilt from the database in the background
+    if not settings.VECTOR_REINDEX_ON_STARTUP:
+        return
+    try:
+        vector_reindexer.start_if_needed()
+    except Exception:
+        # Searches keep working on whatever index there is; a rebuild can be started via the API
+        logger.exception("Starting the vector index rebuild failed")
+
+@app.on_event("shutdown")
+def flush_vector_writes():
+    # Index anything still queued by write-behind inserts before the process exits
+    if not vector_store.flush(timeout=10.0):
+        logger.warning("Shutting down with %d vector inserts not yet indexed", vector_store.pending_writes)
+    # Fold the log into the snapshot so the next start can memory-map it without replaying
+    try:
+        vector_store.compact_if_dirty()
+    except Exception:
+        # The log is still replayed on the next start
+        logger.exception("Compacting the vector index on shutdown failed")
+
 # Include API routers
 app.include_router(api_v1_router, prefix="/api/v1")
 
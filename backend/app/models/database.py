@@ -1,9 +1,15 @@
 from sqlmodel import SQLModel, Field, create_engine, Session, select
-from typing import Optional, List, Dict
-from datetime import datetime
+from typing import Optional, List, Dict, Iterator, Tuple
+from datetime import datetime, timezone
+import hashlib
+import logging
 import os
+import re
 import uuid
-from sqlalchemy import delete, func
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import and_, delete, event, func, literal, or_, table, text
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.orm import aliased
 from app.core.config import settings
 
 # Lightweight crypto helpers for encrypt-at-rest without importing privacy_service (to avoid circular deps)
@@ -11,6 +17,33 @@ import base64
 from Crypto.Cipher import AES
 from Crypto.Protocol.KDF import PBKDF2
 
+logger = logging.getLogger(__name__)
+
+# Word characters as the FTS5 tokenizer below sees them ("_" kept, so snake_case identifiers stay whole)
+_LEXICAL_TERM = re.compile(r"\w+")
+_FTS_TOKENIZE = "unicode61 tokenchars '_'"
+
+def _naive_utc(dt: datetime) -> datetime:
+    # Timestamps are stored as naive UTC
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+
+def encode_cursor(updated_at: datetime, conversation_id: str) -> str:
+    """Opaque listing cursor: position just after this conversation in (updated_at, id) order."""
+    raw = f"{updated_at.isoformat()}|{conversation_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        stamp, conversation_id = raw.split("|", 1)
+        return datetime.fromisoformat(stamp), conversation_id
+    except Exception as e:
+        raise ValueError(f"invalid cursor {cursor!r}") from e
+
+
 class Conversation(SQLModel, table=True):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     title: str
@@ -28,6 +61,64 @@ class Message(SQLModel, table=True):
     mode: str = "chat"  # "chat", "coding", "reasoning"
     tags: Optional[str] = Field(default="")  # comma-separated
 
+def sqlite_pragmas(in_memory: bool = False) -> List[str]:
+    """Per-connection PRAGMAs for the SQLITE_* settings (journal_mode=WAL also persists in the file)."""
+    pragmas = [] if in_memory else [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024)}",
+    ]
+    return pragmas + [
+        f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA cache_size={-int(settings.SQLITE_CACHE_SIZE_MB * 1024)}",  # negative: KiB instead of pages
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def create_database_engine(url: str):
+    """
+    Engine for DATABASE_URL. SQL echo only with DATABASE_ECHO; otherwise statements go to the
+    "sqlalchemy.engine" logger, which setup_logging() enables only at LOG_LEVEL=DEBUG.
+    File SQLite gets a connection pool (DATABASE_POOL_*) whose connections are set up once
+    with sqlite_pragmas(); sessions borrow them, so opening a Session per helper is cheap.
+    In-memory SQLite shares one connection (each connection would be a separate database).
+    """
+    kwargs: Dict = {"echo": settings.DATABASE_ECHO}
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                             pool_timeout=settings.DATABASE_POOL_TIMEOUT_SEC, pool_pre_ping=True, **kwargs)
+    db_path = url.split("sqlite:///")[-1]
+    in_memory = db_path in ("", ":memory:", "sqlite://") or "mode=memory" in db_path
+    # Ensure data directory exists for SQLite file paths like sqlite:///./data/local_ai.db
+    if not in_memory:
+        data_dir = os.path.dirname(db_path) or "."
+        if data_dir and not os.path.exists(data_dir):
+            os.makedirs(data_dir, exist_ok=True)
+    connect_args = {"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+    if in_memory:
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool, **kwargs)
+    else:
+        engine = create_engine(url, connect_args=connect_args, poolclass=QueuePool,
+                               pool_size=settings.DATABASE_POOL_SIZE, max_overflow=settings.DATABASE_MAX_OVERFLOW,
+                               pool_timeout=settings.DATABASE_POOL_TIMEOUT_SEC, **kwargs)
+    pragmas = sqlite_pragmas(in_memory)
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            for pragma in pragmas:
+                try:
+                    cur.execute(pragma)
+                except Exception as e:
+                    # e.g. WAL on a filesystem without shared memory: keep the connection usable
+                    logger.warning("SQLite %s failed: %s", pragma, e)
+        finally:
+            cur.close()
+
+    return engine
+
+
 class MemoryDatabase:
     """
     Database interface for conversation memory storage
@@ -35,15 +126,7 @@ class MemoryDatabase:
     
     def __init__(self):
         # Ensure data directory exists for SQLite file paths like sqlite:///./data/local_ai.db
-        if settings.DATABASE_URL.startswith("sqlite"):
-            db_path = settings.DATABASE_URL.split("sqlite:///")[-1]
-            data_dir = os.path.dirname(db_path) or "."
-            if data_dir and not os.path.exists(data_dir):
-                os.makedirs(data_dir, exist_ok=True)
-            connect_args = {"check_same_thread": False}
-        else:
-            connect_args = {}
-        self.engine = create_engine(settings.DATABASE_URL, echo=True, connect_args=connect_args)
+        self.engine = create_database_engine(settings.DATABASE_URL)
         SQLModel.metadata.create_all(self.engine)
         # Derive encryption key once if enabled
         self._encrypt_enabled: bool = bool(getattr(settings, "PRIVACY_ENCRYPT_AT_REST", False))
@@ -57,6 +140,9 @@ class MemoryDatabase:
                 # Disable encryption if key derivation fails
                 self._encrypt_enabled = False
                 self._key = None
+        # Lexical (FTS5) index over message content; None when unavailable
+        self._fts_table: Optional[str] = None
+        self._init_lexical_index()
         
     def _enc_prefix(self) -> str:
         return "enc:v1:"
@@ -88,7 +174,130 @@ class MemoryDatabase:
         except Exception:
             # On failure, return raw content
             return maybe_encrypted
-        
+
+    def _decrypt_all(self, msgs: List[Message]) -> List[Message]:
+        """Decrypt message contents in place for callers; plaintext rows are left untouched."""
+        prefix = self._enc_prefix()
+        for m in msgs:
+            if isinstance(m.content, str) and m.content.startswith(prefix):
+                m.content = self._decrypt_if_needed(m.content)
+        return msgs
+
+    # Lexical index (SQLite FTS5)
+    def _init_lexical_index(self) -> None:
+        """
+        Create the FTS5 table over message content if needed, backfilling it from existing messages.
+        - FTS rows share the message's rowid; a trigger drops them when messages are deleted,
+          so bulk deletes (conversation delete, retention purge) need no extra bookkeeping.
+        - With encryption at rest the table holds keyed digests of the words instead of the
+          text, so lookups stay exact-match and no plaintext is written next to the ciphertext.
+        """
+        if not settings.MEMORY_HYBRID_SEARCH or self.engine.dialect.name != "sqlite":
+            return
+        name, other = ("message_fts_keyed", "message_fts") if self._encrypt_enabled else ("message_fts", "message_fts_keyed")
+        try:
+            with self.engine.begin() as conn:
+                # An index built in the other privacy mode cannot answer queries in this one
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {other}_delete"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {other}"))
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+                ).first() is not None
+                if not exists:
+                    conn.execute(text(f"CREATE VIRTUAL TABLE {name} USING fts5(body, tokenize=\"{_FTS_TOKENIZE}\")"))
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON message "
+                    f"BEGIN DELETE FROM {name} WHERE rowid = old.rowid; END"
+                ))
+        except Exception:
+            # SQLite built without FTS5: semantic search stays vector-only
+            logger.warning("SQLite FTS5 unavailable; lexical search disabled", exc_info=True)
+            return
+        self._fts_table = name
+        if not exists:
+            self.rebuild_lexical_index()
+
+    def _lexical_terms(self, tokens: List[str]) -> List[str]:
+        if not self._encrypt_enabled:
+            return tokens
+        return [hashlib.blake2b(t.lower().encode("utf-8"), key=self._key, digest_size=8).hexdigest() for t in tokens]
+
+    def _lexical_body(self, plaintext: str) -> str:
+        if not self._encrypt_enabled:
+            return plaintext or ""
+        return " ".join(self._lexical_terms(_LEXICAL_TERM.findall(plaintext or "")))
+
+    def _index_lexical(self, session: Session, rows: List[Dict]) -> None:
+        """Add {"id", "body"} rows for messages added (and flushed) in `session`."""
+        if self._fts_table and rows:
+            session.flush()
+            session.execute(
+                text(f"INSERT INTO {self._fts_table}(rowid, body) SELECT rowid, :body FROM message WHERE id = :id"),
+                rows,
+            )
+
+    def rebuild_lexical_index(self, batch_size: int = 1000) -> int:
+        """Re-create the FTS rows of all messages (e.g. after VACUUM renumbered rowids); returns the row count."""
+        if not self._fts_table:
+            return 0
+        count = 0
+        last_id = ""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self._fts_table}"))
+            while True:
+                page = conn.execute(
+                    text("SELECT rowid, id, content FROM message WHERE id > :last ORDER BY id LIMIT :n"),
+                    {"last": last_id, "n": batch_size},
+                ).all()
+                if not page:
+                    break
+                conn.execute(
+                    text(f"INSERT INTO {self._fts_table}(rowid, body) VALUES (:rowid, :body)"),
+                    [{"rowid": r[0], "body": self._lexical_body(self._decrypt_if_needed(r[2]))} for r in page],
+                )
+                count += len(page)
+                last_id = page[-1][1]
+        logger.info("Lexical index built over %d messages", count)
+        return count
+
+    def search_lexical(self, query: str, k: int = 20, conversation_id: Optional[str] = None,
+                       role: Optional[str] = None, mode: Optional[str] = None,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[str]:
+        """
+        IDs of the k messages best matching `query` by BM25, filters applied inside the query.
+        Each whitespace-separated chunk of the query is one phrase (so "ERR-42" or "foo.bar"
+        match as written) and a message matching any of them qualifies. The time window is
+        [since, until), like VectorFilter, so hybrid results agree at the boundaries.
+        """
+        if not self._fts_table or k <= 0:
+            return []
+        phrases = []
+        for chunk in (query or "").split():
+            tokens = self._lexical_terms(_LEXICAL_TERM.findall(chunk))
+            if tokens:
+                phrases.append('"' + " ".join(tokens) + '"')
+        if not phrases:
+            return []
+        fts = table(self._fts_table)
+        statement = (
+            select(Message.id)
+            .join(fts, text(f"{self._fts_table}.rowid = message.rowid"))
+            .where(text(f"{self._fts_table} MATCH :q"))
+        )
+        if conversation_id is not None:
+            statement = statement.where(Message.conversation_id == conversation_id)
+        if role is not None:
+            statement = statement.where(Message.role == role)
+        if mode is not None:
+            statement = statement.where(Message.mode == mode)
+        if since is not None:
+            statement = statement.where(Message.timestamp >= _naive_utc(since))
+        if until is not None:
+            statement = statement.where(Message.timestamp < _naive_utc(until))
+        statement = statement.order_by(text(f"{self._fts_table}.rank")).limit(k)
+        with Session(self.engine) as session:
+            return list(session.exec(statement, params={"q": " OR ".join(phrases)}).all())
+
     def create_conversation(self, title: str) -> Conversation:
         """Create a new conversation"""
         conversation = Conversation(title=title)
@@ -138,6 +347,7 @@ class MemoryDatabase:
         )
         with Session(self.engine) as session:
             session.add(message)
+            self._index_lexical(session, [{"id": message.id, "body": self._lexical_body(content)}])
             # Touch conversation.updated_at
             convo = session.get(Conversation, conversation_id)
             if convo:
@@ -158,13 +368,7 @@ class MemoryDatabase:
             statement = select(Message).where(Message.conversation_id == conversation_id)
             result = session.exec(statement)
             msgs = result.all()
-            # Decrypt in-place for callers
-            for m in msgs:
-                try:
-                    m.content = self._decrypt_if_needed(m.content)
-                except Exception:
-                    pass
-            return msgs
+            return self._decrypt_all(msgs)
 
     def get_messages_sorted(self, conversation_id: str, ascending: bool = True) -> List[Message]:
         """Get messages sorted by timestamp"""
@@ -174,12 +378,7 @@ class MemoryDatabase:
             statement = select(Message).where(Message.conversation_id == conversation_id).order_by(order)
             result = session.exec(statement)
             msgs = result.all()
-            for m in msgs:
-                try:
-                    m.content = self._decrypt_if_needed(m.content)
-                except Exception:
-                    pass
-            return msgs
+            return self._decrypt_all(msgs)
     
     def get_message(self, message_id: str) -> Optional[Message]:
         """Get a single message by ID"""
@@ -188,12 +387,43 @@ class MemoryDatabase:
             result = session.exec(statement)
             msg = result.first()
             if msg:
-                try:
-                    msg.content = self._decrypt_if_needed(msg.content)
-                except Exception:
-                    pass
+                self._decrypt_all([msg])
             return msg
 
+    def get_messages_by_ids(self, message_ids: List[str]) -> List[Message]:
+        """Get many messages in one query; returned in the order of `message_ids`, missing IDs skipped"""
+        wanted = list(dict.fromkeys(message_ids))
+        if not wanted:
+            return []
+        by_id: Dict[str, Message] = {}
+        with Session(self.engine) as session:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for i in range(0, len(wanted), 500):
+                for m in self._decrypt_all(session.exec(select(Message).where(Message.id.in_(wanted[i:i + 500]))).all()):
+                    by_id[m.id] = m
+        return [by_id[mid] for mid in message_ids if mid in by_id]
+
+    def count_messages(self) -> int:
+        with Session(self.engine) as session:
+            return int(session.exec(select(func.count()).select_from(Message)).one())
+
+    def iter_messages(self, batch_size: int = 1000) -> Iterator[List[Message]]:
+        """Yield all messages in pages of `batch_size`, decrypted; keyset-paginated by ID so each page is one indexed query"""
+        last_id: Optional[str] = None
+        while True:
+            with Session(self.engine) as session:
+                statement = select(Message).order_by(Message.id).limit(batch_size)
+                if last_id is not None:
+                    statement = statement.where(Message.id > last_id)
+                page = session.exec(statement).all()
+            if not page:
+                return
+            self._decrypt_all(page)
+            last_id = page[-1].id
+            yield page
+            if len(page) < batch_size:
+                return
+
     def delete_message(self, message_id: str) -> bool:
         """Delete a message by ID"""
         with Session(self.engine) as session:
@@ -218,13 +448,17 @@ class MemoryDatabase:
 
     def delete_messages_older_than(self, cutoff_datetime: datetime) -> int:
         """Delete messages older than cutoff; return count deleted"""
+        return len(self.purge_messages_older_than(cutoff_datetime))
+
+    def purge_messages_older_than(self, cutoff_datetime: datetime) -> List[str]:
+        """Delete messages older than cutoff; return the deleted message IDs"""
         with Session(self.engine) as session:
-            old_msgs = session.exec(select(Message).where(Message.timestamp < cutoff_datetime)).all()
-            count = len(old_msgs)
-            for m in old_msgs:
-                session.delete(m)
+            ids = list(session.exec(select(Message.id).where(Message.timestamp < cutoff_datetime)).all())
+            # Chunked to stay under SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                session.exec(delete(Message).where(Message.id.in_(ids[i:i + 500])))
             session.commit()
-            return count
+            return ids
 
     def get_conversation_stats(self, conversation_id: str) -> Dict:
         """Return counts and token sums for a conversation"""
@@ -279,39 +513,95 @@ class MemoryDatabase:
                     result.append(c)
             return result
 
+    def list_conversations(self, limit: Optional[int], cursor: Optional[str] = None, tags: Optional[List[str]] = None,
+                           include_messages: bool = True) -> Tuple[List[Tuple[Conversation, List[Message], int]], Optional[str]]:
+        """
+        One page of conversations, most recently updated first, as (conversation, messages,
+        message_count) plus the cursor of the next page (None on the last page).
+        limit=None returns everything from the cursor on as a single page.
+        - Keyset pagination on (updated_at, id): each page is an indexed range scan, however
+          deep. A conversation updated while a client pages moves to the front and is not
+          repeated on later pages.
+        - tags: only conversations carrying ALL of them (matched in SQL on the stored list)
+        - include_messages: messages come from the same query (the page joined with its
+          messages, sorted by timestamp); otherwise messages is [] and only counts are read.
+        """
+        page = select(Conversation)
+        if cursor:
+            updated_at, last_id = decode_cursor(cursor)
+            page = page.where(or_(Conversation.updated_at < updated_at,
+                                  and_(Conversation.updated_at == updated_at, Conversation.id < last_id)))
+        for tag in set(self._normalize_tags(tags or []).split(",")) - {""}:
+            page = page.where(func.instr(literal(",") + Conversation.tags + literal(","), f",{tag},") > 0)
+        page = page.order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+        if limit is not None:
+            # One extra row tells whether another page follows
+            page = page.limit(limit + 1)
+        page = page.subquery()
+        conv = aliased(Conversation, page)
+        order = (conv.updated_at.desc(), conv.id.desc())
+        with Session(self.engine) as session:
+            if include_messages:
+                statement = (select(conv, Message).outerjoin(Message, Message.conversation_id == conv.id)
+                             .order_by(*order, Message.timestamp, Message.id))
+            else:
+                statement = (select(conv, func.count(Message.id)).outerjoin(Message, Message.conversation_id == conv.id)
+                             .group_by(conv.id).order_by(*order))
+            rows: List[Tuple[Conversation, List[Message], int]] = []
+            for c, extra in session.exec(statement).all():
+                if not rows or rows[-1][0].id != c.id:
+                    rows.append((c, [], 0 if include_messages else int(extra)))
+                if include_messages and extra is not None:
+                    rows[-1][1].append(extra)
+        if include_messages:
+            rows = [(c, self._decrypt_all(msgs), len(msgs)) for c, msgs, _ in rows]
+        if limit is None or len(rows) <= limit:
+            return rows, None
+        next_cursor = encode_cursor(rows[limit - 1][0].updated_at, rows[limit - 1][0].id)
+        return rows[:limit], next_cursor
+
     # Export/Import
-    def export_all(self) -> Dict:
+    @staticmethod
+    def _conversation_record(c: Conversation) -> Dict:
+        return {
+            "id": c.id,
+            "title": c.title,
+            "created_at": c.created_at.isoformat(),
+            "updated_at": c.updated_at.isoformat(),
+            "tags": (c.tags or "").split(",") if c.tags else [],
+        }
+
+    def _message_record(self, m: Message) -> Dict:
+        return {
+            "id": m.id,
+            "conversation_id": m.conversation_id,
+            "role": m.role,
+            # Decrypt content for export if needed
+            "content": self._decrypt_if_needed(m.content),
+            "timestamp": m.timestamp.isoformat(),
+            "tokens": m.tokens,
+            "mode": m.mode,
+            "tags": (m.tags or "").split(",") if m.tags else [],
+        }
+
+    def iter_export(self, batch_size: int = 1000) -> Iterator[Tuple[str, Dict]]:
+        """
+        ("conversation" | "message", record) for every row, conversations first, as
+        export_all() would return them. Rows are streamed from one read transaction
+        (a consistent snapshot) `batch_size` at a time and decrypted one by one, so memory
+        does not grow with the size of the database.
+        """
         with Session(self.engine) as session:
-            convos = session.exec(select(Conversation)).all()
-            msgs = session.exec(select(Message)).all()
-            def conv_to_dict(c: Conversation) -> Dict:
-                return {
-                    "id": c.id,
-                    "title": c.title,
-                    "created_at": c.created_at.isoformat(),
-                    "updated_at": c.updated_at.isoformat(),
-                    "tags": (c.tags or "").split(",") if c.tags else [],
-                }
-            def msg_to_dict(m: Message) -> Dict:
-                # Decrypt content for export if needed
-                try:
-                    content = self._decrypt_if_needed(m.content)
-                except Exception:
-                    content = m.content
-                return {
-                    "id": m.id,
-                    "conversation_id": m.conversation_id,
-                    "role": m.role,
-                    "content": content,
-                    "timestamp": m.timestamp.isoformat(),
-                    "tokens": m.tokens,
-                    "mode": m.mode,
-                    "tags": (m.tags or "").split(",") if m.tags else [],
-                }
-            return {
-                "conversations": [conv_to_dict(c) for c in convos],
-                "messages": [msg_to_dict(m) for m in msgs],
-            }
+            for c in session.exec(select(Conversation).execution_options(yield_per=batch_size)):
+                yield "conversation", self._conversation_record(c)
+            for m in session.exec(select(Message).execution_options(yield_per=batch_size)):
+                yield "message", self._message_record(m)
+
+    def export_all(self) -> Dict:
+        data: Dict[str, List[Dict]] = {"conversations": [], "messages": []}
+        for kind, record in self.iter_export():
+            data[f"{kind}s"].append(record)
+        return data
 
     def import_data(self, data: Dict, merge: bool = True) -> Dict:
         """Import conversations and messages.
@@ -321,65 +611,153 @@ class MemoryDatabase:
         - Messages whose (remapped) conversation does not exist are skipped.
         Returns counts including skipped messages and the set of missing conversation IDs.
         """
-        imported_convos = 0
-        imported_msgs = 0
-        skipped_msgs = 0
-        missing_cids: set[str] = set()
-        conv_id_map: Dict[str, str] = {}
-        with Session(self.engine) as session:
-            # Import conversations first, building an ID map
-            for c in data.get("conversations", []):
-                old_cid = c.get("id")
-                new_cid = old_cid
-                if not merge or not old_cid or session.get(Conversation, old_cid):
-                    new_cid = str(uuid.uuid4())
-                convo = Conversation(
-                    id=new_cid,
-                    title=c.get("title", "Untitled"),
-                    created_at=datetime.fromisoformat(c.get("created_at")) if c.get("created_at") else datetime.utcnow(),
-                    updated_at=datetime.fromisoformat(c.get("updated_at")) if c.get("updated_at") else datetime.utcnow(),
-                    tags=self._normalize_tags(c.get("tags", [])),
-                )
-                if old_cid:
-                    conv_id_map[old_cid] = new_cid
-                session.add(convo)
-                imported_convos += 1
-            session.commit()
+        bulk = self.bulk_import(merge)
+        try:
+            for kind in ("conversation", "message"):
+                records = data.get(f"{kind}s", [])
+                for i in range(0, len(records), bulk.chunk_size):
+                    bulk.add([(kind, r) for r in records[i:i + bulk.chunk_size]])
+        finally:
+            bulk.close()
+        return bulk.result()
+
+    def bulk_import(self, merge: bool = True, chunk_size: Optional[int] = None) -> "BulkImport":
+        """Incremental import_data() for large or streamed inputs; see BulkImport."""
+        return BulkImport(self, merge, chunk_size or settings.MEMORY_IMPORT_CHUNK_SIZE)
+
+
+class BulkImport:
+    """
+    Chunked import of ("conversation" | "message", record) pairs, with import_data() semantics.
+    - Each add() is one transaction. It makes one IN query per chunk for the IDs that already
+      exist (and for referenced conversations not seen yet), then one executemany INSERT per
+      table. The FTS rows go in the same transaction.
+    - Contents are encrypted in a thread pool (MEMORY_IMPORT_ENCRYPT_THREADS; AES releases
+      the GIL) when encryption at rest is on.
+    - Conversations must arrive before their messages, as export_all()/iter_export() order them.
+      Only the conversation ID map is kept across chunks, so memory is bounded by the chunk size.
+    """
+
+    def __init__(self, db: MemoryDatabase, merge: bool = True, chunk_size: int = 1000):
+        self.db = db
+        self.merge = merge
+        self.chunk_size = max(1, int(chunk_size))
+        self.conv_id_map: Dict[str, str] = {}
+        # Conversation IDs known to exist: imported in this run or found in the database
+        self._known: set[str] = set()
+        self.conversations = 0
+        self.messages = 0
+        self.skipped_messages = 0
+        self.invalid_records = 0
+        self.missing_conversations: set[str] = set()
+        threads = settings.MEMORY_IMPORT_ENCRYPT_THREADS or min(4, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="memory-import") \
+            if db._encrypt_enabled and threads > 1 else None
 
-            # Import messages, remapping conversation_id via conv_id_map
-            for m in data.get("messages", []):
-                old_mid = m.get("id")
-                if not merge or not old_mid or session.get(Message, old_mid):
-                    new_mid = str(uuid.uuid4())
-                else:
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def result(self) -> Dict:
+        out = {
+            "conversations": self.conversations,
+            "messages": self.messages,
+            "skipped_messages": self.skipped_messages,
+            "missing_conversations": sorted(self.missing_conversations),
+        }
+        if self.invalid_records:
+            out["invalid_records"] = self.invalid_records
+        return out
+
+    @staticmethod
+    def _existing(session: Session, column, ids: List[str]) -> set:
+        found: set = set()
+        for i in range(0, len(ids), 500):
+            found.update(session.exec(select(column).where(column.in_(ids[i:i + 500]))).all())
+        return found
+
+    @staticmethod
+    def _timestamp(value: Optional[str]) -> datetime:
+        return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+    def _encrypt(self, contents: List[str]) -> List[str]:
+        if self._pool is not None and len(contents) > 1:
+            return list(self._pool.map(self.db._encrypt_if_enabled, contents))
+        return [self.db._encrypt_if_enabled(c) for c in contents]
+
+    def add(self, records: List[Tuple[str, Dict]]) -> List[Message]:
+        """Import one chunk; returns the imported messages with plaintext content (not attached to a session)."""
+        convos = [r for kind, r in records if kind == "conversation" and isinstance(r, dict)]
+        msgs = [r for kind, r in records if kind == "message" and isinstance(r, dict)]
+        self.invalid_records += len(records) - len(convos) - len(msgs)
+        normalize = self.db._normalize_tags
+        imported: List[Message] = []
+        with Session(self.db.engine) as session:
+            if convos:
+                taken = self._existing(session, Conversation.id, [c["id"] for c in convos if c.get("id")]) if self.merge else set()
+                rows = []
+                for c in convos:
+                    old_cid = c.get("id")
+                    new_cid = old_cid
+                    if not self.merge or not old_cid or old_cid in taken:
+                        new_cid = str(uuid.uuid4())
+                    taken.add(new_cid)
+                    self._known.add(new_cid)
+                    if old_cid:
+                        self.conv_id_map[old_cid] = new_cid
+                    rows.append({
+                        "id": new_cid,
+                        "title": c.get("title", "Untitled"),
+                        "created_at": self._timestamp(c.get("created_at")),
+                        "updated_at": self._timestamp(c.get("updated_at")),
+                        "tags": normalize(c.get("tags", [])),
+                    })
+                session.execute(Conversation.__table__.insert(), rows)
+                self.conversations += len(rows)
+
+            if msgs:
+                # Referenced conversations that were neither imported in this run nor checked yet
+                mapped = {self.conv_id_map.get(m.get("conversation_id"), m.get("conversation_id")) for m in msgs}
+                self._known |= self._existing(session, Conversation.id, [cid for cid in mapped - self._known if cid])
+                taken = self._existing(session, Message.id, [m["id"] for m in msgs if m.get("id")]) if self.merge else set()
+                keep = []
+                for m in msgs:
+                    orig_cid = m.get("conversation_id")
+                    mapped_cid = self.conv_id_map.get(orig_cid, orig_cid)
+                    # Validate conversation exists (either newly created or pre-existing)
+                    if not mapped_cid or mapped_cid not in self._known:
+                        self.skipped_messages += 1
+                        if orig_cid:
+                            self.missing_conversations.add(orig_cid)
+                        continue
+                    old_mid = m.get("id")
                     new_mid = old_mid
-                orig_cid = m.get("conversation_id")
-                mapped_cid = conv_id_map.get(orig_cid, orig_cid)
-                # Validate conversation exists (either newly created or pre-existing)
-                if not mapped_cid or not session.get(Conversation, mapped_cid):
-                    skipped_msgs += 1
-                    if orig_cid:
-                        missing_cids.add(orig_cid)
-                    continue
-                msg = Message(
-                    id=new_mid,
-                    conversation_id=mapped_cid,
-                    role=m.get("role", "user"),
-                    content=self._encrypt_if_enabled(m.get("content", "")),
-                    timestamp=datetime.fromisoformat(m.get("timestamp")) if m.get("timestamp") else datetime.utcnow(),
-                    tokens=m.get("tokens"),
-                    mode=m.get("mode", "chat"),
-                    tags=self._normalize_tags(m.get("tags", [])),
-                )
-                session.add(msg)
-                imported_msgs += 1
+                    if not self.merge or not old_mid or old_mid in taken:
+                        new_mid = str(uuid.uuid4())
+                    taken.add(new_mid)
+                    keep.append(Message(
+                        id=new_mid,
+                        conversation_id=mapped_cid,
+                        role=m.get("role", "user"),
+                        content=m.get("content", "") or "",
+                        timestamp=self._timestamp(m.get("timestamp")),
+                        tokens=m.get("tokens"),
+                        mode=m.get("mode", "chat"),
+                        tags=normalize(m.get("tags", [])),
+                    ))
+                if keep:
+                    stored = self._encrypt([msg.content for msg in keep])
+                    session.execute(Message.__table__.insert(), [
+                        {"id": msg.id, "conversation_id": msg.conversation_id, "role": msg.role, "content": content,
+                         "timestamp": msg.timestamp, "tokens": msg.tokens, "mode": msg.mode, "tags": msg.tags}
+                        for msg, content in zip(keep, stored)
+                    ])
+                    self.db._index_lexical(session, [{"id": msg.id, "body": self.db._lexical_body(msg.content)} for msg in keep])
+                    self.messages += len(keep)
+                    imported = keep
             session.commit()
-        return {
-            "conversations": imported_convos,
-            "messages": imported_msgs,
-            "skipped_messages": skipped_msgs,
-            "missing_conversations": sorted(missing_cids),
-        }
+        return imported
 
 # Global database instance
 db = MemoryDatabase()
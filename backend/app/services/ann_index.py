@@ -0,0 +1,241 @@
+from __future__ import annotations
+import math
+from typing import Callable, Optional
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services.sparse_index import SparseInvertedIndex
+
+DENSE_KINDS = ("flat", "hnsw", "ivf", "ivfpq", "fp16", "sq8", "pq", "opq")
+# Kinds that store vectors lossily (quantized codes); VectorStore reranks them exactly
+LOSSY_KINDS = ("ivfpq", "fp16", "sq8", "pq", "opq")
+# Cheapest kinds first, per starting point, when "auto" has to fit VECTOR_MEMORY_BUDGET_MB
+_BUDGET_LADDER = {"ivf": ("ivf", "ivfpq"), "hnsw": ("hnsw", "flat", "fp16", "sq8", "pq"), "flat": ("flat", "fp16", "sq8", "pq")}
+
+
+def index_kind(index) -> str:
+    """Classify an index instance into one of the VECTOR_INDEX_TYPE names."""
+    if isinstance(index, SparseInvertedIndex):
+        return "sparse"
+    if isinstance(index, faiss.IndexPreTransform):
+        return "opq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def ivf_nlist(n: int) -> int:
+    """Number of IVF lists for `n` vectors (VECTOR_IVF_NLIST, or ~4*sqrt(n))."""
+    if settings.VECTOR_IVF_NLIST > 0:
+        return settings.VECTOR_IVF_NLIST
+    return int(max(16, min(65536, 4 * math.sqrt(max(n, 1)))))
+
+
+def min_train_size(kind: str, n: int) -> int:
+    """
+    Vectors needed before `kind` is worth building; the store stays flat below this.
+    FAISS wants ~39 training points per centroid (IVF lists, 256 PQ codewords); scalar
+    quantization needs no real training but saves nothing worth a rebuild on tiny stores.
+    """
+    if kind in ("ivf", "ivfpq"):
+        return 39 * ivf_nlist(n)
+    if kind in ("pq", "opq"):
+        return 39 * 256
+    if kind in ("fp16", "sq8"):
+        return 1000
+    return 0
+
+
+def pq_subquantizers(d: int) -> int:
+    """Largest divisor of d not above VECTOR_PQ_M (PQ requires m | d)."""
+    m = max(1, min(settings.VECTOR_PQ_M, d))
+    while d % m:
+        m -= 1
+    return m
+
+
+def bytes_per_vector(kind: str, d: int) -> float:
+    """Approximate in-memory size of one vector in an index of `kind`."""
+    if kind == "hnsw":
+        return 4 * d + 8 * settings.VECTOR_HNSW_M  # float32 storage + level-0 links
+    if kind == "ivf":
+        return 4 * d + 8  # + stored ID
+    if kind == "ivfpq":
+        return pq_subquantizers(d) + 8
+    if kind == "fp16":
+        return 2 * d
+    if kind == "sq8":
+        return d
+    if kind in ("pq", "opq"):
+        return pq_subquantizers(d)
+    return 4 * d
+
+
+def index_bytes(index) -> int:
+    if isinstance(index, SparseInvertedIndex):
+        return index.memory_bytes()
+    return int(bytes_per_vector(index_kind(index), index.d) * index.ntotal)
+
+
+def fit_memory_budget(kind: str, n: int, d: int, budget_bytes: float) -> str:
+    """Least lossy kind, starting from `kind`, whose `n` vectors fit in `budget_bytes`."""
+    ladder = _BUDGET_LADDER.get(kind, (kind,))
+    for candidate in ladder:
+        if n * bytes_per_vector(candidate, d) <= budget_bytes:
+            return candidate
+    return ladder[-1]
+
+
+def create_empty(kind: str, d: int):
+    """Index that can accept adds without training (flat, sparse, hnsw)."""
+    if kind == "sparse":
+        return SparseInvertedIndex(d)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, settings.VECTOR_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = settings.VECTOR_HNSW_EF_CONSTRUCTION
+        apply_search_params(index)
+        return index
+    return faiss.IndexFlatIP(d)
+
+
+def build(kind: str, vectors: np.ndarray, seed: int = 1234):
+    """Create an index of `kind` sized for `vectors`, train it on a sample and add all vectors in order."""
+    n, d = vectors.shape
+    if kind in ("fp16", "sq8", "pq", "opq"):
+        m = pq_subquantizers(d)
+        spec = {"fp16": "SQfp16", "sq8": "SQ8", "pq": f"PQ{m}", "opq": f"OPQ{m},PQ{m}"}[kind]
+        index = faiss.index_factory(d, spec, faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            index.train(_train_sample(kind, vectors, seed))
+    elif kind in ("ivf", "ivfpq"):
+        nlist = ivf_nlist(n)
+        quantizer = faiss.IndexFlatIP(d)
+        if kind == "ivfpq":
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_subquantizers(d), 8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, d, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(_train_sample(kind, vectors, seed))
+        # Keep reconstruct() working so later migrations and recall checks can read vectors back
+        index.set_direct_map_type(faiss.DirectMap.Array)
+    else:
+        index = create_empty(kind, d)
+    for i in range(0, n, 65536):
+        index.add(np.ascontiguousarray(vectors[i:i + 65536], dtype=np.float32))
+    apply_search_params(index)
+    return index
+
+
+def _train_sample(kind: str, vectors: np.ndarray, seed: int) -> np.ndarray:
+    n = vectors.shape[0]
+    sample_size = min(n, max(min_train_size(kind, n), settings.VECTOR_ANN_TRAIN_SAMPLE))
+    rng = np.random.default_rng(seed)
+    sample = vectors[np.sort(rng.choice(n, size=sample_size, replace=False))] if sample_size < n else vectors
+    return np.ascontiguousarray(sample, dtype=np.float32)
+
+
+def apply_search_params(index) -> None:
+    """Apply VECTOR_HNSW_EF_SEARCH / VECTOR_IVF_NPROBE to a loaded or freshly built index."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.VECTOR_HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = settings.VECTOR_IVF_NPROBE
+
+
+def search_filtered(index, x: np.ndarray, k: int, allowed: np.ndarray):
+    """
+    Top-k over the slots where `allowed` (bool, length ntotal) is True. The mask is applied
+    inside the index scan (FAISS IDSelectorBitmap / sparse candidate mask), so k results come
+    back without over-fetching. Very selective filters are scored exactly over the allowed
+    slots instead, which is cheaper and avoids the recall drop of a sparse HNSW walk.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    slots = np.flatnonzero(allowed)
+    if not slots.shape[0] or k <= 0:
+        return np.full((x.shape[0], max(k, 0)), -np.inf, dtype=np.float32), np.full((x.shape[0], max(k, 0)), -1, dtype=np.int64)
+    if isinstance(index, SparseInvertedIndex):
+        return index.search(x, k, allowed=allowed)
+    if slots.shape[0] <= settings.VECTOR_FILTER_EXACT_MAX:
+        scores = x @ np.asarray(index.reconstruct_batch(slots), dtype=np.float32).T
+        kk = min(k, slots.shape[0])
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :kk]
+        out_scores = np.full((x.shape[0], k), -np.inf, dtype=np.float32)
+        out_ids = np.full((x.shape[0], k), -1, dtype=np.int64)
+        out_scores[:, :kk] = np.take_along_axis(scores, top, axis=1)
+        out_ids[:, :kk] = slots[top]
+        return out_scores, out_ids
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexPreTransform)):
+        # PQ search takes no IDSelector
+        return _search_post_filtered(index, x, k, allowed, slots.shape[0])
+    # The selector only holds a raw pointer; `bits` must stay alive until search returns
+    bits = np.packbits(allowed, bitorder="little")
+    sel = faiss.IDSelectorBitmap(allowed.shape[0], faiss.swig_ptr(bits))
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=sel, efSearch=max(settings.VECTOR_HNSW_EF_SEARCH, k))
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=sel, nprobe=settings.VECTOR_IVF_NPROBE)
+    else:
+        params = faiss.SearchParameters(sel=sel)
+    scores, ids = index.search(x, k, params=params)
+    del bits
+    return scores, ids
+
+
+def _search_post_filtered(index, x: np.ndarray, k: int, allowed: np.ndarray, n_allowed: int):
+    """Over-fetch (by the inverse of the filter's selectivity) and drop disallowed slots."""
+    fetch = min(index.ntotal, max(4 * k, -(-k * index.ntotal // n_allowed)))
+    while True:
+        scores, ids = index.search(x, fetch)
+        ok = ids >= 0
+        ok[ok] = allowed[ids[ok]]
+        if fetch >= index.ntotal or int(ok.sum(axis=1).min()) >= k:
+            break
+        fetch = min(4 * fetch, index.ntotal)
+    # Stable sort keeps the score order among the allowed hits
+    keep = np.argsort(~ok, axis=1, kind="stable")[:, :k]
+    ok = np.take_along_axis(ok, keep, axis=1)
+    scores = np.where(ok, np.take_along_axis(scores, keep, axis=1), -np.inf).astype(np.float32)
+    ids = np.where(ok, np.take_along_axis(ids, keep, axis=1), -1)
+    if ids.shape[1] < k:
+        pad = k - ids.shape[1]
+        scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+        ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+    return scores, ids
+
+
+def reconstruct_all(index, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+    """Read back vectors [start, end) (lossy for PQ)."""
+    end = index.ntotal if end is None else end
+    if end <= start:
+        return np.zeros((0, index.d), dtype=np.float32)
+    return np.asarray(index.reconstruct_n(start, end - start), dtype=np.float32)
+
+
+def recall_at_k(index, vectors: np.ndarray, n_queries: int = 100, k: int = 10, seed: int = 0,
+                search: Optional[Callable[[np.ndarray, int], np.ndarray]] = None) -> float:
+    """
+    Recall@k of `index` against an exact IndexFlatIP over the same (full-precision)
+    vectors, using stored vectors as queries. `search(queries, k) -> slots` replaces
+    index.search, e.g. to measure reranked results.
+    """
+    n = vectors.shape[0]
+    if n == 0:
+        return 1.0
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, size=min(n_queries, n), replace=False)]
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    _, truth = exact.search(queries, k)
+    got = search(queries, k) if search is not None else index.search(queries, k)[1]
+    hits = sum(len(set(t.tolist()) & set(g.tolist())) for t, g in zip(truth, got))
+    return hits / float(truth.size)
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Compiled once; splitting on anything that is not [a-z0-9] after lowercasing
+_TOKEN_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
+
+def l2_normalize(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class EmbeddingBackend(ABC):
+    """Produces L2-normalized float32 embeddings of a fixed dimension."""
+    name: str = "base"
+    # Bump whenever a backend changes its output so persisted vectors can be invalidated
+    version: str = "0"
+    dim: int = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 matrix, one L2-normalized row per text."""
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Feature hashing over lowercase alphanumeric tokens.
+    Token -> bucket assignments are memoized in a bounded LRU cache and counts are
+    accumulated in one vectorized pass; output is bit-identical to the original
+    per-token sha1 loop.
+    """
+    name = "hashing"
+    version = "hash-sha1-v1"
+
+    def __init__(self, dim: int, token_cache_size: int = 200_000):
+        self.dim = int(dim)
+        # Per-instance cache so different dims never share bucket assignments
+        self._bucket_for = lru_cache(maxsize=max(0, int(token_cache_size)))(self._hash_token)
+
+    def _tokenize(self, text: str) -> List[str]:
+        # Simple whitespace + punctuation split; lowercase for normalization
+        return [t for t in _TOKEN_SPLIT_RE.split(text.lower()) if t]
+
+    def _hash_token(self, token: str) -> int:
+        # Use sha1 for stable hashing across runs/platforms.
+        # int.from_bytes on the raw digest equals int(hexdigest, 16) without the hex round-trip.
+        digest = hashlib.sha1(token.encode("utf-8")).digest()
+        return int.from_bytes(digest, "big") % self.dim
+
+    def token_cache_info(self):
+        return self._bucket_for.cache_info()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        mat = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows: List[int] = []
+        cols: List[int] = []
+        bucket_for = self._bucket_for
+        for i, text in enumerate(texts):
+            buckets = [bucket_for(tok) for tok in self._tokenize(text)]
+            cols.extend(buckets)
+            rows.extend([i] * len(buckets))
+        if cols:
+            # Unbuffered add so repeated (row, bucket) pairs accumulate like the scalar loop did
+            np.add.at(mat, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+        return l2_normalize(mat)
+
+
+class _PendingBatch:
+    __slots__ = ("texts", "result", "error", "done")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class DynamicBatcher:
+    """
+    Merges concurrent embed calls into one forward pass.
+    The first caller to arrive becomes the leader: it waits up to `window_ms` (or until
+    `max_batch_size` texts are queued), runs `fn` once on everything queued and hands each
+    caller its slice. Followers just block until their slice is ready.
+    """
+
+    def __init__(self, fn: Callable[[List[str]], np.ndarray], window_ms: float = 5.0, max_batch_size: int = 64):
+        self.fn = fn
+        self.window_sec = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._cond = threading.Condition()
+        self._pending: List[_PendingBatch] = []
+        self._pending_texts = 0
+        self._leader_active = False
+        self.batches_run = 0
+        self.requests_merged = 0
+
+    def submit(self, texts: List[str]) -> np.ndarray:
+        if self.window_sec <= 0 or len(texts) >= self.max_batch_size:
+            return self.fn(texts)
+        item = _PendingBatch(texts)
+        with self._cond:
+            self._pending.append(item)
+            self._pending_texts += len(texts)
+            is_leader = not self._leader_active
+            if is_leader:
+                self._leader_active = True
+            else:
+                self._cond.notify_all()
+        if not is_leader:
+            item.done.wait()
+        else:
+            self._lead()
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _lead(self) -> None:
+        deadline = time.monotonic() + self.window_sec
+        with self._cond:
+            while self._pending_texts < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._pending = self._pending, []
+            self._pending_texts = 0
+            self._leader_active = False
+        texts: List[str] = [t for item in batch for t in item.texts]
+        try:
+            out = self.fn(texts)
+            offset = 0
+            for item in batch:
+                item.result = out[offset:offset + len(item.texts)]
+                offset += len(item.texts)
+        except BaseException as e:
+            for item in batch:
+                item.error = e
+        self.batches_run += 1
+        self.requests_merged += len(batch)
+        for item in batch:
+            item.done.set()
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    Local sentence-embedding model executed with onnxruntime on CPU.
+    - Tokenizer is a HuggingFace `tokenizer.json` (defaults to the model's directory).
+    - Token-level outputs are mean-pooled with the attention mask; pooled outputs are used as-is.
+    - Concurrent calls are merged by a DynamicBatcher into a single session.run.
+    """
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: Optional[str] = None,
+        max_length: int = 256,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 64,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Embedding model not found: {model_path}")
+        tokenizer_path = tokenizer_path or os.path.join(os.path.dirname(model_path) or ".", "tokenizer.json")
+        if not os.path.exists(tokenizer_path):
+            raise FileNotFoundError(f"Embedding tokenizer not found: {tokenizer_path}")
+
+        opts = ort.SessionOptions()
+        if intra_op_threads > 0:
+            opts.intra_op_num_threads = int(intra_op_threads)
+        if inter_op_threads > 0:
+            opts.inter_op_num_threads = int(inter_op_threads)
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(model_path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self._session.get_inputs()}
+
+        self._tokenizer = Tokenizer.from_file(tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=int(max_length))
+        self._tokenizer.enable_padding()
+
+        # Version ties cached/persisted vectors to this exact model file
+        with open(model_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        self.version = f"onnx-{digest}"
+        self.dim = self._infer_dim()
+        self._batcher = DynamicBatcher(self._forward, window_ms=batch_window_ms, max_batch_size=max_batch_size)
+
+    def _infer_dim(self) -> int:
+        last = self._session.get_outputs()[0].shape[-1]
+        if isinstance(last, int) and last > 0:
+            return last
+        # Dynamic output dimension: probe with a single short input
+        return int(self._forward(["dimension probe"]).shape[1])
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+        feeds = {k: v for k, v in feeds.items() if k in self._input_names}
+        out = self._session.run(None, feeds)[0]
+        if out.ndim == 3:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            out = (out * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return l2_normalize(out.astype(np.float32, copy=False))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self._batcher.submit(list(texts))
+
+
+def create_backend(name: str, hash_dim: int, token_cache_size: int = 200_000,
+                   batch_window_ms: Optional[float] = None) -> EmbeddingBackend:
+    """
+    Build the backend selected by `name` ("hashing" | "onnx") from settings.
+    Falls back to hashing when the ONNX model or runtime is unavailable.
+    """
+    from app.core.config import settings
+    if (name or "hashing").lower() == "onnx":
+        model_path = settings.EMBEDDING_MODEL_PATH or f"{settings.MODEL_PATH}/embedding.onnx"
+        try:
+            return OnnxEmbeddingBackend(
+                model_path,
+                tokenizer_path=settings.EMBEDDING_TOKENIZER_PATH,
+                max_length=settings.EMBEDDING_MAX_LENGTH,
+                intra_op_threads=settings.EMBEDDING_ONNX_INTRA_OP_THREADS,
+                inter_op_threads=settings.EMBEDDING_ONNX_INTER_OP_THREADS,
+                batch_window_ms=settings.EMBEDDING_BATCH_WINDOW_MS if batch_window_ms is None else batch_window_ms,
+                max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+            )
+        except Exception as e:
+            logger.warning("ONNX embedding backend unavailable (%s); falling back to hashing", e)
+    return HashingEmbeddingBackend(hash_dim, token_cache_size=token_cache_size)
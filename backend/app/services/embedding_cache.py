@@ -0,0 +1,202 @@
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed text -> vector cache.
+    - Keys are sha256(text); entries are namespaced by backend name, version and dim so a
+      model change never serves stale vectors.
+    - In-memory LRU in front of an optional SQLite store holding float32 vectors as BLOBs.
+      The store is opened on first use and holds at most `max_disk_items` rows (0 = no cap);
+      past that the least recently used rows are evicted, down to 90% of the cap.
+    - Hit/miss counters are kept for reporting.
+    """
+
+    def __init__(self, namespace: str, dim: int, max_items: int = 10_000, path: Optional[str] = None,
+                 max_disk_items: int = 0):
+        self.namespace = namespace
+        self.dim = int(dim)
+        self.max_items = max(0, int(max_items))
+        self.max_disk_items = max(0, int(max_disk_items))
+        self.path = path or None
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Set once opening the store failed; the cache then stays memory-only
+        self._disk_failed = False
+        self._disk_rows = 0
+        # Logical clock for the `used` column: larger = more recently written or read
+        self._clock = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        """The SQLite store, opened on first use (callers hold `_lock`)."""
+        if self._conn is None and self.path and not self._disk_failed:
+            try:
+                self._conn = self._open_disk()
+            except Exception:
+                # Disk cache is an optimization only; keep serving from memory
+                self._disk_failed = True
+                logger.exception("Embedding cache store %s could not be opened; caching in memory only", self.path)
+        return self._conn
+
+    def _open_disk(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache ("
+                " namespace TEXT NOT NULL, key BLOB NOT NULL, vec BLOB NOT NULL,"
+                " used INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(embedding_cache)")}
+            if "used" not in columns:
+                # Stores written before eviction existed; their rows go first
+                conn.execute("ALTER TABLE embedding_cache ADD COLUMN used INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS embedding_cache_used ON embedding_cache (used)")
+            conn.commit()
+            self._disk_rows, self._clock = conn.execute("SELECT COUNT(*), COALESCE(MAX(used), 0) FROM embedding_cache").fetchone()
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def key_for(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return cached vectors for the given keys (missing keys are absent from the result)."""
+        found: Dict[bytes, np.ndarray] = {}
+        missing: List[bytes] = []
+        with self._lock:
+            for key in keys:
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+            if missing and self._disk() is not None:
+                for key, vec in self._disk_get(missing).items():
+                    found[key] = vec
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+            self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]) -> None:
+        if not items:
+            return
+        with self._lock:
+            for key, vec in items.items():
+                self._remember(key, vec)
+            conn = self._disk()
+            if conn is None:
+                return
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (namespace, key, vec, used) VALUES (?, ?, ?, ?)",
+                    [(self.namespace, key, np.ascontiguousarray(vec, dtype=np.float32).tobytes(), self._now())
+                     for key, vec in items.items()],
+                )
+                # Replaced rows are over-counted; eviction recounts before deleting anything
+                self._disk_rows += len(items)
+                if self.max_disk_items and self._disk_rows > self.max_disk_items:
+                    self._evict(conn)
+                conn.commit()
+            except Exception:
+                self.disk_errors += 1
+                logger.exception("Embedding cache store %s: writing %d vectors failed", self.path, len(items))
+                conn.rollback()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        self._disk_rows = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        excess = self._disk_rows - self.max_disk_items
+        if excess <= 0:
+            return
+        # Evict a little extra so the next few puts do not evict again
+        n = excess + self.max_disk_items // 10
+        deleted = conn.execute(
+            "DELETE FROM embedding_cache WHERE (namespace, key) IN"
+            " (SELECT namespace, key FROM embedding_cache ORDER BY used LIMIT ?)", (n,)
+        ).rowcount
+        self._disk_rows -= deleted
+        self.disk_evictions += deleted
+
+    def _now(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def _remember(self, key: bytes, vec: np.ndarray) -> None:
+        if self.max_items == 0:
+            return
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def _disk_get(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        out: Dict[bytes, np.ndarray] = {}
+        try:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vec FROM embedding_cache WHERE namespace = ? AND key IN ({placeholders})",
+                    [self.namespace, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    vec = np.frombuffer(blob, dtype=np.float32)
+                    if vec.shape[0] == self.dim:
+                        out[bytes(key)] = vec
+            if out and self.max_disk_items:
+                # Hits count as use, so eviction drops the rows nobody asks for
+                now = self._now()
+                self._conn.executemany("UPDATE embedding_cache SET used = ? WHERE namespace = ? AND key = ?",
+                                       [(now, self.namespace, key) for key in out])
+                self._conn.commit()
+        except Exception:
+            self.disk_errors += 1
+            logger.exception("Embedding cache store %s: reading %d keys failed", self.path, len(keys))
+            return out
+        return out
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "memory_items": len(self._lru),
+                "memory_capacity": self.max_items,
+                "disk_enabled": bool(self.path) and not self._disk_failed,
+                "disk_items": self._disk_rows,
+                "disk_capacity": self.max_disk_items,
+                "disk_evictions": self.disk_evictions,
+                "disk_errors": self.disk_errors,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+            }
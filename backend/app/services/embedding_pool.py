@@ -0,0 +1,132 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_backends import EmbeddingBackend, create_backend
+
+# Per-worker backend, built once by the pool initializer
+_worker_backend: Optional[EmbeddingBackend] = None
+
+
+def _init_worker(backend_name: str, dim: int, token_cache_size: int) -> None:
+    global _worker_backend
+    # Each worker embeds a whole shard at once; dynamic batching would only add latency
+    _worker_backend = create_backend(backend_name, dim, token_cache_size=token_cache_size, batch_window_ms=0)
+
+
+def _embed_shard(out_path: str, total_rows: int, dim: int, start: int, texts: List[str]) -> int:
+    """Embed `texts` and write them straight into rows [start, start+len) of the shared output file."""
+    vecs = _worker_backend.embed(texts)
+    out = np.memmap(out_path, dtype=np.float32, mode="r+", shape=(total_rows, dim))
+    out[start:start + len(texts)] = vecs
+    out.flush()
+    del out
+    return len(texts)
+
+
+def _shared_tmp_dir() -> Optional[str]:
+    # tmpfs-backed /dev/shm keeps the output array in shared memory on Linux
+    return "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+
+
+class EmbeddingPool:
+    """
+    Shards large embedding batches across worker processes.
+    - Workers build the same backend as the parent embedding service (name + dim).
+    - Results are written by the workers directly into one memory-mapped float32 array in
+      shared memory (/dev/shm when available), which is returned without copying.
+    - Batches below EMBEDDING_POOL_MIN_BATCH use the in-process embedding service (and its
+      cache); bulk batches bypass the text cache, which would only churn on one-off backfills.
+    - A backend or dimension change starts a new worker pool; the old one finishes the batches
+      already submitted to it and is shut down when its last caller is done.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_batch: Optional[int] = None, chunk_size: Optional[int] = None):
+        configured = settings.EMBEDDING_POOL_WORKERS if workers is None else workers
+        self.workers = int(configured) if configured and configured > 0 else (os.cpu_count() or 1)
+        self.min_batch = settings.EMBEDDING_POOL_MIN_BATCH if min_batch is None else int(min_batch)
+        self.chunk_size = max(1, settings.EMBEDDING_POOL_CHUNK_SIZE if chunk_size is None else int(chunk_size))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_key: Optional[tuple] = None
+        # Callers currently submitting to / waiting on each executor (current and replaced ones)
+        self._users: Dict[ProcessPoolExecutor, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _use_executor(self, backend_name: str, dim: int) -> Iterator[ProcessPoolExecutor]:
+        """The pool for (backend, dim), kept alive until the caller is done with it."""
+        key = (backend_name, dim)
+        with self._lock:
+            if self._executor is None or self._executor_key != key:
+                old = self._executor
+                if old is not None and not self._users.get(old):
+                    old.shutdown(wait=False)
+                # spawn: never fork a process holding server threads, sockets or ONNX sessions
+                ctx = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=ctx,
+                    initializer=_init_worker,
+                    initargs=(backend_name, dim, settings.EMBEDDING_TOKEN_CACHE_SIZE),
+                )
+                self._executor_key = key
+            executor = self._executor
+            self._users[executor] = self._users.get(executor, 0) + 1
+        try:
+            yield executor
+        finally:
+            with self._lock:
+                self._users[executor] -= 1
+                if not self._users[executor]:
+                    del self._users[executor]
+                    if executor is not self._executor:
+                        # Replaced while in use; its last caller has its results, so nothing is pending
+                        executor.shutdown(wait=False)
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        from app.services.embedding_service import embedding_service
+        texts = list(texts)
+        if len(texts) < max(self.min_batch, 1):
+            return embedding_service.embed_texts(texts)
+        if self.workers <= 1:
+            # Bulk backfills would only churn the text cache; embed directly
+            return embedding_service.backend.embed(texts)
+
+        dim = embedding_service.dim
+        fd, path = tempfile.mkstemp(prefix="jarvis-emb-", suffix=".f32", dir=_shared_tmp_dir())
+        os.close(fd)
+        try:
+            out = np.memmap(path, dtype=np.float32, mode="w+", shape=(len(texts), dim))
+            with self._use_executor(embedding_service.backend_name, dim) as executor:
+                futures = [
+                    executor.submit(_embed_shard, path, len(texts), dim, start, texts[start:start + self.chunk_size])
+                    for start in range(0, len(texts), self.chunk_size)
+                ]
+                for fut in futures:
+                    fut.result()
+            return out
+        finally:
+            # The mapping stays valid after unlink on POSIX; Windows keeps the file until it is closed
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                self._executor_key = None
+
+
+# Global instance
+embedding_pool = EmbeddingPool()
@@ -1,47 +1,87 @@
 from __future__ import annotations
 import numpy as np
-import hashlib
-from typing import List
+from typing import Dict, List, Optional
 from app.core.config import settings
+from app.services.embedding_backends import EmbeddingBackend, HashingEmbeddingBackend, create_backend
+from app.services.embedding_cache import EmbeddingCache
 
 
 class EmbeddingService:
     """
-    Lightweight, local-first embedding service using feature hashing.
-    - No external model downloads required.
-    - Produces deterministic fixed-size embeddings suitable for approximate semantic search.
+    Local-first embedding service with pluggable backends.
+    - "hashing" (default): feature hashing, no external model downloads required.
+    - "onnx": local sentence-embedding model at EMBEDDING_MODEL_PATH run with onnxruntime on CPU.
+    Falls back to hashing when the ONNX model or runtime is unavailable.
+    `dim` always reflects the active backend so callers size their indexes correctly.
+    Repeated texts are served from a content-addressed cache (memory LRU + SQLite) keyed by
+    backend and version; pass cache_size=0 and cache_path="" to disable it.
     """
 
-    def __init__(self, dim: int | None = None):
-        self.dim: int = dim or settings.EMBEDDING_DIM
+    def __init__(self, dim: int | None = None, token_cache_size: int | None = None,
+                 backend: Optional[EmbeddingBackend] = None, backend_name: Optional[str] = None,
+                 cache_size: int | None = None, cache_path: str | None = None):
+        self._hash_dim: int = dim or settings.EMBEDDING_DIM
+        self._token_cache_size = settings.EMBEDDING_TOKEN_CACHE_SIZE if token_cache_size is None else token_cache_size
+        self.backend: EmbeddingBackend = backend or self._create_backend(backend_name or settings.EMBEDDING_BACKEND)
+        cache_size = settings.EMBEDDING_CACHE_SIZE if cache_size is None else cache_size
+        cache_path = settings.EMBEDDING_CACHE_PATH if cache_path is None else cache_path
+        self.cache: Optional[EmbeddingCache] = None
+        if cache_size > 0 or cache_path:
+            namespace = f"{self.backend.name}:{self.backend.version}:{self.backend.dim}"
+            self.cache = EmbeddingCache(namespace, self.backend.dim, max_items=cache_size, path=cache_path or None,
+                                        max_disk_items=settings.EMBEDDING_CACHE_DISK_MAX_ITEMS)
 
-    def _tokenize(self, text: str) -> List[str]:
-        # Simple whitespace + punctuation split; lowercase for normalization
-        import re
-        return [t for t in re.split(r"[^a-z0-9]+", text.lower()) if t]
+    def _create_backend(self, name: str) -> EmbeddingBackend:
+        return create_backend(name, self._hash_dim, token_cache_size=self._token_cache_size)
 
-    def _hash_token(self, token: str) -> int:
-        # Use sha1 for stable hashing across runs/platforms
-        h = hashlib.sha1(token.encode("utf-8")).hexdigest()
-        # Map to integer and then to vector dimension range
-        return int(h, 16) % self.dim
+    @property
+    def dim(self) -> int:
+        return self.backend.dim
+
+    @property
+    def backend_name(self) -> str:
+        return self.backend.name
+
+    @property
+    def version(self) -> str:
+        """Identifies the vector space; persisted vectors from another version must be rebuilt."""
+        return self.backend.version
+
+    def token_cache_info(self):
+        """Return functools cache statistics for the hashing backend's token -> bucket LRU."""
+        if isinstance(self.backend, HashingEmbeddingBackend):
+            return self.backend.token_cache_info()
+        return None
+
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters of the content-addressed embedding cache."""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.stats()}
 
     def embed_texts(self, texts: List[str]) -> np.ndarray:
         """
         Returns a numpy array of shape (len(texts), dim) with L2-normalized embeddings
         """
-        mat = np.zeros((len(texts), self.dim), dtype=np.float32)
-        for i, text in enumerate(texts):
-            tokens = self._tokenize(text)
-            for tok in tokens:
-                idx = self._hash_token(tok)
-                mat[i, idx] += 1.0
-        # L2 normalize
-        norms = np.linalg.norm(mat, axis=1, keepdims=True)
-        norms[norms == 0] = 1.0
-        mat = mat / norms
-        return mat
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        texts = list(texts)
+        if self.cache is None:
+            return self.backend.embed(texts)
+        keys = [EmbeddingCache.key_for(t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+        # Embed each distinct uncached text once, even if repeated within the batch
+        todo: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in todo:
+                todo[key] = text
+        if todo:
+            vecs = self.backend.embed(list(todo.values()))
+            fresh = {key: vecs[i].copy() for i, key in enumerate(todo)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+        return np.vstack([found[k] for k in keys]).astype(np.float32, copy=False)
 
 
 # Global instance
-embedding_service = EmbeddingService()
\ No newline at end of file
+embedding_service = EmbeddingService()
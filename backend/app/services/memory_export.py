@@ -0,0 +1,149 @@
+from __future__ import annotations
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.database import MemoryDatabase
+
+FORMATS = ("json", "jsonl", "ndjson")
+COMPRESSIONS = ("none", "gzip", "zstd")
+# Output is handed to the response in pieces of about this size
+_CHUNK_BYTES = 64 * 1024
+
+
+def media_type(fmt: str, compression: str) -> str:
+    if compression == "gzip":
+        return "application/gzip"
+    if compression == "zstd":
+        return "application/zstd"
+    return "application/json" if fmt == "json" else "application/x-ndjson"
+
+
+def filename(fmt: str, compression: str) -> str:
+    ext = "json" if fmt == "json" else "ndjson"
+    return f"memory-export.{ext}" + {"gzip": ".gz", "zstd": ".zst"}.get(compression, "")
+
+
+def _compressor(compression: str):
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ValueError("zstd compression needs the optional 'zstandard' package") from e
+        return zstandard.ZstdCompressor().compressobj()
+    if compression != "none":
+        raise ValueError(f"unknown compression {compression!r} (expected one of {', '.join(COMPRESSIONS)})")
+    return None
+
+
+def _decompressor(compression: str):
+    if compression == "gzip":
+        return zlib.decompressobj(47)  # wbits 47: gzip or zlib header, detected
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ValueError("zstd compression needs the optional 'zstandard' package") from e
+        return zstandard.ZstdDecompressor().decompressobj()
+    if compression != "none":
+        raise ValueError(f"unknown compression {compression!r} (expected one of {', '.join(COMPRESSIONS)})")
+    return None
+
+
+def parse_record(line: bytes) -> Tuple[str, Any]:
+    """(type, record) of one NDJSON export line; ("invalid", None) when it is not one."""
+    try:
+        record = json.loads(line)
+        return record.pop("type"), record
+    except (ValueError, KeyError, AttributeError, TypeError):
+        return "invalid", None
+
+
+class NdjsonReader:
+    """
+    Incremental NDJSON decoder: feed() raw (optionally compressed) bytes, get complete records back.
+    A line longer than `max_line_bytes` (default MEMORY_IMPORT_MAX_LINE_BYTES, 0 = no limit)
+    raises ValueError, so a stream without newlines cannot buffer without bound.
+    """
+
+    def __init__(self, compression: str = "none", max_line_bytes: Optional[int] = None):
+        self._decompressor = _decompressor(compression)
+        self._partial = b""
+        self.max_line_bytes = settings.MEMORY_IMPORT_MAX_LINE_BYTES if max_line_bytes is None else max_line_bytes
+
+    def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+        if self._decompressor is not None:
+            data = self._decompressor.decompress(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        self._check(lines + [self._partial])
+        return [parse_record(line) for line in lines if line.strip()]
+
+    def close(self) -> List[Tuple[str, Any]]:
+        """Records left at the end of the stream (a last line without a newline)."""
+        tail = self._decompressor.flush() if self._decompressor is not None and hasattr(self._decompressor, "flush") else b""
+        line, self._partial = self._partial + tail, b""
+        lines = line.split(b"\n")
+        self._check(lines)
+        return [parse_record(part) for part in lines if part.strip()]
+
+    def _check(self, lines: List[bytes]) -> None:
+        if self.max_line_bytes and any(len(line) > self.max_line_bytes for line in lines):
+            raise ValueError(f"NDJSON line longer than {self.max_line_bytes} bytes")
+
+
+def _ndjson(records: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[str]:
+    for kind, record in records:
+        yield json.dumps({"type": kind, **record}) + "\n"
+
+
+def _json(records: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[str]:
+    # The same document export_all() returns, written one record at a time
+    yield '{"conversations": ['
+    section, first = "conversation", True
+    for kind, record in records:
+        if kind != section:
+            yield '], "messages": ['
+            section, first = kind, True
+        yield ("" if first else ", ") + json.dumps(record)
+        first = False
+    if section == "conversation":
+        yield '], "messages": ['
+    yield "]}"
+
+
+def stream_export(db: MemoryDatabase, fmt: str = "ndjson", compression: str = "none") -> Iterator[bytes]:
+    """
+    Memory export as a stream of byte chunks, optionally gzip/zstd-compressed on the fly.
+    fmt "json" is the export_all() document; "jsonl"/"ndjson" is one typed record per line.
+    Memory stays bounded by the DB batch size and the chunk size, not the export size.
+    Raises ValueError for an unknown format or compression before any DB work starts.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    compressor = _compressor(compression)
+    return _chunks(db, fmt, compressor)
+
+
+def _chunks(db: MemoryDatabase, fmt: str, compressor) -> Iterator[bytes]:
+    records = db.iter_export(batch_size=settings.MEMORY_EXPORT_BATCH_SIZE)
+    pieces = _json(records) if fmt == "json" else _ndjson(records)
+    buf, size = [], 0
+    for piece in pieces:
+        data = piece.encode("utf-8")
+        buf.append(data)
+        size += len(data)
+        if size >= _CHUNK_BYTES:
+            out = b"".join(buf)
+            buf, size = [], 0
+            out = compressor.compress(out) if compressor is not None else out
+            if out:
+                yield out
+    out = b"".join(buf)
+    if compressor is not None:
+        out = compressor.compress(out) + compressor.flush()
+    if out:
+        yield out
@@ -1,8 +1,99 @@
-from app.models.database import db, Conversation as DBConversation, Message as DBMessage
-from typing import List, Optional, Dict
+from app.models.database import db, BulkImport, Conversation as DBConversation, Message as DBMessage
+from typing import Any, Iterable, List, Optional, Dict, Iterator, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+import hashlib
+import logging
+import time
 from app.services.vector_store import vector_store
+from app.services.vector_filter import VectorFilter
+from app.services.memory_export import stream_export
 from app.services.cache_service import cache_service
+from app.services.embedding_service import embedding_service
+from app.services.embedding_pool import embedding_pool
+from app.core.config import settings
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def message_vector_meta(msg: DBMessage) -> Dict:
+    """Vector store metadata for a DB message."""
+    return {
+        "message_id": msg.id,
+        "conversation_id": msg.conversation_id,
+        "role": msg.role,
+        "mode": msg.mode,
+        "timestamp": msg.timestamp.isoformat()
+    }
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, rrf_k: int = 60,
+                           weights: Optional[List[float]] = None) -> List[str]:
+    """
+    Merge ranked ID lists: an ID at (0-based) rank r in list i scores weights[i] / (rrf_k + r + 1),
+    summed over lists. Returns the k best IDs; ties keep first-seen order.
+    """
+    scores: Dict[str, float] = {}
+    for i, ranking in enumerate(rankings):
+        weight = weights[i] if weights is not None else 1.0
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + weight / (rrf_k + rank + 1)
+    return sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+
+
+class MemoryImport:
+    """
+    A running bulk import: chunks go into the database (BulkImport) while the previous chunk's
+    messages are embedded and indexed on a background thread, straight from the imported
+    plaintext. At most two index batches are in flight, so a fast reader cannot queue up the
+    whole input. finish() waits for indexing and reports counts and rows/sec.
+    """
+
+    def __init__(self, bulk: BulkImport):
+        self.bulk = bulk
+        self.chunk_size = bulk.chunk_size
+        self.records = 0
+        self.indexed = 0
+        self._started = time.perf_counter()
+        self._indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-import-index")
+        self._pending: List[Future] = []
+
+    def add(self, records: List[Tuple[str, Any]]) -> None:
+        imported = self.bulk.add(records)
+        self.records += len(records)
+        if imported:
+            while len(self._pending) >= 2:
+                self._collect(self._pending.pop(0))
+            self._pending.append(self._indexer.submit(self._index, imported))
+
+    @staticmethod
+    def _index(msgs: List[DBMessage]) -> int:
+        vecs = embedding_pool.embed_texts([m.content for m in msgs])
+        vector_store.add_vectors(vecs, [message_vector_meta(m) for m in msgs])
+        return len(msgs)
+
+    def _collect(self, future: Future) -> None:
+        # Imported messages are searchable like ones added through chat (best-effort)
+        try:
+            self.indexed += future.result()
+        except Exception:
+            logger.warning("Indexing imported messages failed", exc_info=True)
+
+    def finish(self) -> Dict:
+        for future in self._pending:
+            self._collect(future)
+        self._pending = []
+        self._indexer.shutdown(wait=True)
+        self.bulk.close()
+        elapsed = time.perf_counter() - self._started
+        result = self.bulk.result()
+        result.update({
+            "indexed_messages": self.indexed,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(self.records / elapsed, 1) if elapsed > 0 else 0.0,
+        })
+        return result
 
 
 class MemoryService:
@@ -24,12 +115,101 @@ class MemoryService:
     def filter_conversations_by_tags(self, tags: List[str]) -> List[DBConversation]:
         return self.db.filter_conversations_by_tags(tags)
 
+    def list_conversations(self, limit: Optional[int], cursor: Optional[str] = None, tags: Optional[List[str]] = None,
+                           include_messages: bool = True) -> Tuple[List[Tuple[DBConversation, List[DBMessage], int]], Optional[str]]:
+        return self.db.list_conversations(limit, cursor=cursor, tags=tags, include_messages=include_messages)
+
+    def conversation_page(self, limit: Optional[int], cursor: Optional[str] = None, tags: Optional[List[str]] = None,
+                          include_messages: bool = True) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of the conversation listing as plain dicts, plus the next page's cursor.
+        `limit` defaults to CONVERSATION_PAGE_SIZE (0 = everything in one page) and is capped
+        at CONVERSATION_PAGE_MAX; a malformed cursor raises ValueError.
+        """
+        limit = limit or settings.CONVERSATION_PAGE_SIZE or None
+        if limit is not None:
+            limit = min(limit, settings.CONVERSATION_PAGE_MAX)
+        rows, next_cursor = self.list_conversations(limit, cursor=cursor, tags=tags, include_messages=include_messages)
+        page = [
+            {
+                "id": conv.id,
+                "title": conv.title,
+                "created_at": conv.created_at,
+                "updated_at": conv.updated_at,
+                "messages": [
+                    {
+                        "id": msg.id,
+                        "role": msg.role,
+                        "content": msg.content,
+                        "timestamp": msg.timestamp,
+                        "tokens": msg.tokens,
+                        "mode": msg.mode,
+                    }
+                    for msg in messages
+                ],
+                "tags": conv.tags.split(",") if conv.tags else [],
+                "message_count": count,
+            }
+            for conv, messages, count in rows
+        ]
+        return page, next_cursor
+
     # Export/Import
     def export_all(self) -> Dict:
         return self.db.export_all()
 
+    def stream_export(self, fmt: str = "ndjson", compression: str = "none") -> Iterator[bytes]:
+        return stream_export(self.db, fmt, compression)
+
     def import_data(self, data: Dict, merge: bool = True) -> Dict:
-        return self.db.import_data(data, merge)
+        records = [("conversation", c) for c in data.get("conversations", [])]
+        records += [("message", m) for m in data.get("messages", [])]
+        return self.import_records(records, merge)
+
+    def import_records(self, records: Iterable[Tuple[str, Any]], merge: bool = True) -> Dict:
+        """Import (type, record) pairs, e.g. parsed NDJSON export lines, in chunks."""
+        job = self.begin_import(merge)
+        chunk: List[Tuple[str, Any]] = []
+        try:
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= job.chunk_size:
+                    job.add(chunk)
+                    chunk = []
+            if chunk:
+                job.add(chunk)
+        finally:
+            result = job.finish()
+        return result
+
+    def begin_import(self, merge: bool = True) -> MemoryImport:
+        """Incremental import for streamed input: add() chunks, then finish()."""
+        return MemoryImport(self.db.bulk_import(merge))
+
+    def index_messages(self, message_ids: List[str]) -> int:
+        """Embed and index existing DB messages in pages; returns how many were indexed."""
+        indexed = 0
+        page_size = max(1, settings.VECTOR_REINDEX_BATCH_SIZE)
+        for i in range(0, len(message_ids), page_size):
+            msgs = self.db.get_messages_by_ids(message_ids[i:i + page_size])
+            if not msgs:
+                continue
+            vecs = embedding_pool.embed_texts([m.content for m in msgs])
+            vector_store.add_vectors(vecs, [message_vector_meta(m) for m in msgs])
+            indexed += len(msgs)
+        return indexed
+
+    # Embeddings
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts; large batches are sharded across worker processes."""
+        return embedding_pool.embed_texts(texts)
+
+    def embedding_info(self) -> Dict:
+        return {
+            "backend": embedding_service.backend_name,
+            "version": embedding_service.version,
+            "dim": embedding_service.dim,
+        }
 
     def get_conversation_stats(self, conversation_id: str) -> dict:
         """Return conversation statistics (messages count and token sum)."""
@@ -61,14 +241,11 @@ class MemoryService:
         msg = self.db.add_message(conversation_id, role, content, tokens, mode)
         # Index message content into vector store for semantic search (best-effort)
         try:
-            meta = {
-                "message_id": msg.id,
-                "conversation_id": msg.conversation_id,
-                "role": msg.role,
-                "mode": msg.mode,
-                "timestamp": msg.timestamp.isoformat()
-            }
-            vector_store.add_texts([content], [meta])
+            meta = message_vector_meta(msg)
+            if settings.VECTOR_WRITE_BEHIND:
+                vector_store.enqueue_texts([content], [meta])
+            else:
+                vector_store.add_texts([content], [meta])
         except Exception:
             # Fail silently; semantic search remains available for other items
             pass
@@ -80,77 +257,116 @@ class MemoryService:
         """
         return self.db.get_messages(conversation_id)
     
-    def semantic_search(self, query: str) -> List[DBMessage]:
+    def delete_message(self, message_id: str) -> bool:
+        """
+        Delete a message and its vector
+        """
+        deleted = self.db.delete_message(message_id)
+        try:
+            vector_store.remove_where("message_id", [message_id])
+        except Exception:
+            logger.exception("Removing vectors for message %s failed", message_id)
+        return deleted
+
+    def delete_conversation(self, conversation_id: str) -> bool:
+        """
+        Delete a conversation, its messages and their vectors
+        """
+        deleted = self.db.delete_conversation(conversation_id)
+        try:
+            vector_store.remove_where("conversation_id", [conversation_id])
+        except Exception:
+            logger.exception("Removing vectors for conversation %s failed", conversation_id)
+        return deleted
+    
+    def search_batch(self, queries: List[str], k: int = 5, read_your_writes: bool = False,
+                     conversation_id: Optional[str] = None, role: Optional[str] = None,
+                     mode: Optional[str] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None) -> List[List[DBMessage]]:
+        """
+        Semantic search for many queries: one embedding batch, one vector search and one
+        DB fetch for all hits. Returns one list of DB messages per query, in order.
+        """
+        filters = VectorFilter(conversation_id=conversation_id, role=role, mode=mode, since=since, until=until)
+        try:
+            batch_hits = vector_store.search_batch(queries, k=self._candidates(k), read_your_writes=read_your_writes,
+                                                   filters=filters)
+        except Exception:
+            batch_hits = [[] for _ in queries]
+        hit_ids = [self._hybrid_rank(query, self._hit_ids(hits), filters, k) for query, hits in zip(queries, batch_hits)]
+        by_id = {m.id: m for m in self.db.get_messages_by_ids([mid for ids in hit_ids for mid in ids])}
+        return [[by_id[mid] for mid in ids if mid in by_id] for ids in hit_ids]
+
+    def semantic_search(self, query: str, read_your_writes: bool = False,
+                        conversation_id: Optional[str] = None, role: Optional[str] = None,
+                        mode: Optional[str] = None, since: Optional[datetime] = None,
+                        until: Optional[datetime] = None) -> List[DBMessage]:
         """
         Perform semantic search across memory. Returns matching DB messages.
         Uses Redis-backed caching for query results when available.
+        read_your_writes waits for queued (write-behind) inserts to be indexed first.
+        conversation_id/role/mode/since/until restrict the candidates before ranking.
         """
-        # Attempt cache lookup
+        filters = VectorFilter(conversation_id=conversation_id, role=role, mode=mode, since=since, until=until)
+        cache_input = query if filters.is_empty else f"{query}\x00{filters.cache_key()}"
+        key = f"memsearch:{hashlib.sha256(cache_input.encode('utf-8')).hexdigest()[:16]}"
+        # Only the ranked IDs are cached. Hits are re-read from the database, so messages
+        # deleted (or purged by retention) since drop out instead of being served from the cache.
         try:
-            if cache_service.healthy():
-                import hashlib
-                key = f"memsearch:{hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]}"
+            if cache_service.healthy() and not read_your_writes:
                 cached = cache_service.get_json(key)
                 if cached:
-                    # Reconstruct DBMessage objects from cached dicts
-                    results: List[DBMessage] = []
-                    for item in cached:
-                        try:
-                            ts = datetime.fromisoformat(item["timestamp"]) if isinstance(item.get("timestamp"), str) else item.get("timestamp")
-                            results.append(DBMessage(
-                                id=item["id"],
-                                conversation_id=item["conversation_id"],
-                                role=item["role"],
-                                content=item["content"],
-                                timestamp=ts,
-                                tokens=item.get("tokens"),
-                                mode=item.get("mode", "chat"),
-                            ))
-                        except Exception:
-                            continue
-                    if results:
-                        return results
+                    matches = self.db.get_messages_by_ids([mid for mid in cached if isinstance(mid, str)])
+                    if matches:
+                        return matches
         except Exception:
             # Ignore cache failures and proceed with live search
             pass
         
-        # Live search via vector index
+        # Live search: vector index, fused with lexical (FTS5) matches
         try:
-            vector_hits = vector_store.search(query, k=5)
+            vector_hits = vector_store.search(query, k=self._candidates(5), read_your_writes=read_your_writes,
+                                              filters=filters)
         except Exception:
             vector_hits = []
-        matches: List[DBMessage] = []
-        for _score, meta in vector_hits:
-            msg_id = meta.get("message_id") if isinstance(meta, dict) else None
-            if not msg_id:
-                continue
-            db_msg = self.db.get_message(msg_id)
-            if db_msg:
-                matches.append(db_msg)
+        ranked_ids = self._hybrid_rank(query, self._hit_ids(vector_hits), filters, 5)
+        # One IN query for all hits, in rank order (IDs no longer in the DB are dropped)
+        matches: List[DBMessage] = self.db.get_messages_by_ids(ranked_ids)
         
-        # Cache the results (store minimal fields)
         try:
             if cache_service.healthy():
-                import hashlib
-                key = f"memsearch:{hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]}"
-                payload = [
-                    {
-                        "id": m.id,
-                        "conversation_id": m.conversation_id,
-                        "role": m.role,
-                        "content": m.content,
-                        "timestamp": m.timestamp.isoformat(),
-                        "tokens": m.tokens,
-                        "mode": m.mode,
-                    }
-                    for m in matches
-                ]
-                cache_service.set_json(key, payload, ttl_seconds=300)
+                cache_service.set_json(key, [m.id for m in matches], ttl_seconds=300)
         except Exception:
             pass
         
         return matches
 
+    @staticmethod
+    def _hit_ids(hits: List) -> List[str]:
+        return [meta.get("message_id") for _score, meta in hits if isinstance(meta, dict) and meta.get("message_id")]
+
+    @staticmethod
+    def _candidates(k: int) -> int:
+        """Vector hits to fetch for a top-k result; fusion needs a deeper list to rerank."""
+        return max(k, settings.MEMORY_HYBRID_CANDIDATES) if settings.MEMORY_HYBRID_SEARCH else k
+
+    def _hybrid_rank(self, query: str, vector_ids: List[str], filters: VectorFilter, k: int) -> List[str]:
+        """Top-k message IDs by reciprocal rank fusion of vector hits and BM25 lexical matches."""
+        if not settings.MEMORY_HYBRID_SEARCH or not query:
+            return vector_ids[:k]
+        try:
+            lexical_ids = self.db.search_lexical(
+                query, k=max(k, settings.MEMORY_HYBRID_CANDIDATES), conversation_id=filters.conversation_id,
+                role=filters.role, mode=filters.mode, since=filters.since, until=filters.until,
+            )
+        except Exception:
+            # Lexical search is an enhancement; fall back to vector-only ranking
+            lexical_ids = []
+        if not lexical_ids:
+            return vector_ids[:k]
+        return reciprocal_rank_fusion([vector_ids, lexical_ids], k, settings.MEMORY_RRF_K,
+                                      [1.0, settings.MEMORY_LEXICAL_WEIGHT])
+
 
 # Initialize the global memory service instance
 memory_service = MemoryService()
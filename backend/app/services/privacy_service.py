@@ -2,6 +2,7 @@ import base64
 from Crypto.Cipher import AES
 from Crypto.Protocol.KDF import PBKDF2
 import hashlib
+import logging
 import re
 from typing import Dict, List, Optional
 from enum import Enum
@@ -11,6 +12,8 @@ from datetime import datetime, timedelta
 from app.core.config import settings
 from app.models.database import db
 
+logger = logging.getLogger(__name__)
+
 
 class DataClassification(Enum):
     PUBLIC = "public"
@@ -212,7 +215,16 @@ class PrivacyService:
         """Delete messages older than N days from the database."""
         cutoff = datetime.utcnow() - timedelta(days=days)
         # Implement using database layer
-        return db.delete_messages_older_than(cutoff)
+        deleted_ids = db.purge_messages_older_than(cutoff)
+        # Purge their vectors too, or retention cleanup would leave them searchable
+        try:
+            from app.services.vector_store import vector_store
+            # Whole expired time shards are dropped at once; stragglers are removed by ID
+            vector_store.drop_older_than(cutoff)
+            vector_store.remove_where("message_id", deleted_ids)
+        except Exception:
+            logger.exception("Purging vectors of %d expired messages failed", len(deleted_ids))
+        return len(deleted_ids)
 
 # Global privacy service instance
 privacy_service = PrivacyService()
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import io
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+SPARSE_INDEX_MAGIC = "jarvis-sparse-v1"
+
+
+class SparseInvertedIndex:
+    """
+    Inner-product index for sparse vectors (e.g. hashed bag-of-words embeddings).
+    - Stores only non-zero entries as posting lists keyed by dimension (bucket):
+      int64 vector id + float32 weight, i.e. 12 bytes per non-zero instead of 4*d per vector.
+    - Scores a query with a sparse dot product over the posting lists of its non-zero buckets.
+    Mirrors the subset of the FAISS index API used by VectorStore (d, ntotal, add, search,
+    reconstruct_n) so it can be swapped in for IndexFlatIP.
+    """
+
+    def __init__(self, d: int):
+        self.d = int(d)
+        self.ntotal = 0
+        # Per-bucket chunks appended by add(); merged lazily into one array per bucket
+        self._ids: List[List[np.ndarray]] = [[] for _ in range(self.d)]
+        self._vals: List[List[np.ndarray]] = [[] for _ in range(self.d)]
+
+    @property
+    def nnz(self) -> int:
+        return int(sum(c.shape[0] for chunks in self._ids for c in chunks))
+
+    def memory_bytes(self) -> int:
+        return int(sum(c.nbytes for chunks in self._ids for c in chunks) + sum(c.nbytes for chunks in self._vals for c in chunks))
+
+    def add(self, x: np.ndarray) -> None:
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.ndim != 2 or x.shape[1] != self.d:
+            raise ValueError(f"expected shape (n, {self.d}), got {x.shape}")
+        rows, cols = np.nonzero(x)
+        vals = x[rows, cols]
+        ids = rows.astype(np.int64) + self.ntotal
+        # Group the batch by bucket in one sort, then append one chunk per touched bucket
+        order = np.argsort(cols, kind="stable")
+        cols, ids, vals = cols[order], ids[order], vals[order]
+        touched, starts = np.unique(cols, return_index=True)
+        ends = np.append(starts[1:], cols.shape[0])
+        for b, s, e in zip(touched.tolist(), starts.tolist(), ends.tolist()):
+            self._ids[b].append(ids[s:e].copy())
+            self._vals[b].append(vals[s:e].copy())
+        self.ntotal += x.shape[0]
+
+    def _postings(self, b: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids, vals = self._ids[b], self._vals[b]
+        if len(ids) > 1:
+            # Concurrent searches may merge the same bucket; each returns its own merged pair
+            ids, vals = [np.concatenate(ids)], [np.concatenate(vals)]
+            self._ids[b], self._vals[b] = ids, vals
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return ids[0], vals[0]
+
+    def search(self, x: np.ndarray, k: int, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (scores, ids) shaped (nq, k); missing slots are padded with id -1 like FAISS.
+        `allowed` is an optional boolean mask over ids restricting the candidates.
+        """
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        nq = x.shape[0]
+        scores_out = np.full((nq, k), -np.inf, dtype=np.float32)
+        ids_out = np.full((nq, k), -1, dtype=np.int64)
+        if self.ntotal == 0 or k <= 0:
+            return scores_out, ids_out
+        for qi in range(nq):
+            q = x[qi]
+            buckets = np.flatnonzero(q)
+            id_parts, w_parts = [], []
+            for b in buckets.tolist():
+                ids, vals = self._postings(b)
+                if ids.shape[0]:
+                    id_parts.append(ids)
+                    w_parts.append(vals * q[b])
+            if not id_parts:
+                continue
+            ids = np.concatenate(id_parts)
+            weights = np.concatenate(w_parts)
+            # Dense accumulator is O(ntotal) but a single vectorized pass; cheaper than sorting
+            # when common buckets (stopwords) touch most vectors.
+            acc = np.bincount(ids, weights=weights, minlength=self.ntotal)
+            if allowed is not None:
+                acc[~allowed[:acc.shape[0]]] = 0.0
+            cand = np.flatnonzero(acc)
+            if cand.shape[0] > k:
+                cand = cand[np.argpartition(-acc[cand], k - 1)[:k]]
+            cand = cand[np.argsort(-acc[cand], kind="stable")]
+            n = cand.shape[0]
+            scores_out[qi, :n] = acc[cand]
+            ids_out[qi, :n] = cand
+        return scores_out, ids_out
+
+    def reconstruct_n(self, i0: int, n: int) -> np.ndarray:
+        out = np.zeros((n, self.d), dtype=np.float32)
+        for b in range(self.d):
+            ids, vals = self._postings(b)
+            if not ids.shape[0]:
+                continue
+            mask = (ids >= i0) & (ids < i0 + n)
+            out[ids[mask] - i0, b] = vals[mask]
+        return out
+
+    def serialize(self) -> bytes:
+        indptr = np.zeros(self.d + 1, dtype=np.int64)
+        id_parts, val_parts = [], []
+        for b in range(self.d):
+            ids, vals = self._postings(b)
+            indptr[b + 1] = indptr[b] + ids.shape[0]
+            id_parts.append(ids)
+            val_parts.append(vals)
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            magic=np.array(SPARSE_INDEX_MAGIC),
+            shape=np.array([self.d, self.ntotal], dtype=np.int64),
+            indptr=indptr,
+            ids=np.concatenate(id_parts) if id_parts else np.empty(0, dtype=np.int64),
+            vals=np.concatenate(val_parts) if val_parts else np.empty(0, dtype=np.float32),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "SparseInvertedIndex":
+        with np.load(io.BytesIO(data), allow_pickle=False) as z:
+            if str(z["magic"]) != SPARSE_INDEX_MAGIC:
+                raise ValueError("not a sparse index file")
+            d, ntotal = (int(v) for v in z["shape"])
+            indptr, ids, vals = z["indptr"], z["ids"], z["vals"]
+        index = cls(d)
+        index.ntotal = ntotal
+        for b in range(d):
+            s, e = int(indptr[b]), int(indptr[b + 1])
+            if e > s:
+                index._ids[b] = [ids[s:e]]
+                index._vals[b] = [vals[s:e]]
+        return index
+
+    def write(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.serialize())
+
+    @classmethod
+    def read(cls, path: str) -> "SparseInvertedIndex":
+        with open(path, "rb") as f:
+            return cls.deserialize(f.read())
+
+    @staticmethod
+    def is_sparse_file(path: str) -> bool:
+        # np.savez output is a zip archive; FAISS index files never start with "PK"
+        with open(path, "rb") as f:
+            return f.read(2) == b"PK"
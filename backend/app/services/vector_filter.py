@@ -0,0 +1,46 @@
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import numpy as np
+
+# Timestamp column value for metadata without a (parseable) timestamp
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def to_epoch_us(value: Any) -> int:
+    """ISO string or datetime -> microseconds since the epoch (naive values are UTC, like the DB)."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return int(NO_TIMESTAMP)
+    if not isinstance(value, datetime):
+        return int(NO_TIMESTAMP)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class VectorFilter:
+    """Metadata predicate for filtered vector search; unset fields match everything."""
+    __slots__ = ("conversation_id", "role", "mode", "since", "until")
+
+    def __init__(self, conversation_id: Optional[str] = None, role: Optional[str] = None, mode: Optional[str] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.conversation_id = conversation_id
+        self.role = role
+        self.mode = mode
+        self.since = since
+        self.until = until
+
+    @property
+    def is_empty(self) -> bool:
+        return all(getattr(self, f) is None for f in self.__slots__)
+
+    def cache_key(self) -> str:
+        return "|".join(
+            f"{f}={getattr(self, f).isoformat() if isinstance(getattr(self, f), datetime) else getattr(self, f)}"
+            for f in self.__slots__ if getattr(self, f) is not None
+        )
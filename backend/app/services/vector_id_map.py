@@ -0,0 +1,134 @@
+from __future__ import annotations
+import io
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Stable ID reported for an empty or removed (tombstoned) result slot
+TOMBSTONE = -1
+
+
+class VectorIdMap:
+    """
+    Stable 64-bit IDs for the vectors of a positional index (like faiss.IndexIDMap2).
+    - Slot i (position in the underlying index) maps to ids[i]; removed vectors keep their
+      slot but are tombstoned until the index is rebuilt without them.
+    - IDs are handed out from a monotonic counter and never reused, so metadata, log records
+      and callers can refer to a vector across rebuilds and migrations. Slots are only ever
+      appended or compacted in order, so `ids` stays sorted and ID -> slot is a binary search.
+    """
+
+    def __init__(self, ids: Optional[np.ndarray] = None, next_id: Optional[int] = None,
+                 dead: Optional[np.ndarray] = None):
+        ids = np.asarray(ids if ids is not None else [], dtype=np.int64)
+        dead = np.zeros(ids.shape[0], dtype=bool) if dead is None else np.asarray(dead, dtype=bool)
+        # Growable buffers; only the first `_n` entries are in use
+        self._ids = ids.copy()
+        self._dead = dead.copy()
+        self._n = int(ids.shape[0])
+        self.tombstones = int(np.count_nonzero(dead))
+        live_max = int(ids.max()) + 1 if self._n else 0
+        self.next_id = max(int(next_id or 0), live_max)
+
+    @classmethod
+    def positional(cls, n: int) -> "VectorIdMap":
+        """ID map for stores written before stable IDs existed (id == position)."""
+        return cls(np.arange(n, dtype=np.int64))
+
+    @property
+    def ntotal(self) -> int:
+        return self._n
+
+    @property
+    def live(self) -> int:
+        return self._n - self.tombstones
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._n]
+
+    @property
+    def live_mask(self) -> np.ndarray:
+        return ~self._dead[:self._n]
+
+    def allocate(self, n: int) -> np.ndarray:
+        start = self.next_id
+        self.next_id += n
+        return np.arange(start, start + n, dtype=np.int64)
+
+    def append(self, ids: Iterable[int]) -> None:
+        ids = np.asarray(list(ids) if not isinstance(ids, np.ndarray) else ids, dtype=np.int64)
+        need = self._n + ids.shape[0]
+        if need > self._ids.shape[0]:
+            cap = max(need, 2 * self._ids.shape[0], 1024)
+            grown_ids = np.empty(cap, dtype=np.int64)
+            grown_ids[:self._n] = self._ids[:self._n]
+            grown_dead = np.zeros(cap, dtype=bool)
+            grown_dead[:self._n] = self._dead[:self._n]
+            self._ids, self._dead = grown_ids, grown_dead
+        self._ids[self._n:need] = ids
+        self._dead[self._n:need] = False
+        self._n = need
+        if ids.shape[0]:
+            self.next_id = max(self.next_id, int(ids.max()) + 1)
+
+    def ids_for_slots(self, slots: np.ndarray) -> np.ndarray:
+        """Map index result positions to stable IDs; -1 (no result) and tombstones map to -1."""
+        slots = np.asarray(slots, dtype=np.int64)
+        out = np.full(slots.shape, TOMBSTONE, dtype=np.int64)
+        valid = (slots >= 0) & (slots < self._n)
+        valid[valid] &= ~self._dead[slots[valid]]
+        out[valid] = self._ids[slots[valid]]
+        return out
+
+    def slots_for_ids(self, ids: Iterable[int]) -> np.ndarray:
+        """Slots of the live vectors among `ids` (unknown or removed IDs are skipped)."""
+        wanted = np.unique(np.asarray(list(ids) if not isinstance(ids, np.ndarray) else ids, dtype=np.int64))
+        if not wanted.shape[0] or not self._n:
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self.ids, wanted)
+        pos = pos[pos < self._n]
+        found = pos[np.isin(self._ids[pos], wanted)]
+        return found[~self._dead[found]]
+
+    def slot_for_id(self, vector_id: int) -> int:
+        slots = self.slots_for_ids([vector_id])
+        return int(slots[0]) if slots.shape[0] else -1
+
+    def remove(self, ids: Iterable[int]) -> np.ndarray:
+        """Tombstone `ids`; returns the IDs that were actually live."""
+        slots = self.slots_for_ids(ids)
+        self._dead[slots] = True
+        self.tombstones += int(slots.shape[0])
+        return self._ids[slots].copy()
+
+    def live_slots(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        end = self._n if end is None else end
+        return np.flatnonzero(~self._dead[start:end]) + start
+
+    def serialize(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez(buf, ids=self.ids, dead=self._dead[:self._n], next_id=np.array(self.next_id, dtype=np.int64))
+        return buf.getvalue()
+
+    @classmethod
+    def deserialize(cls, data: bytes) -> "VectorIdMap":
+        with np.load(io.BytesIO(data), allow_pickle=False) as z:
+            ids, next_id = z["ids"], int(z["next_id"])
+            if "dead" in z.files:
+                return cls(ids, next_id=next_id, dead=z["dead"])
+        # Earlier format marked removed slots with id -1 in place; keep ids sorted for lookups
+        dead = ids == TOMBSTONE
+        return cls(np.maximum.accumulate(ids) if ids.shape[0] else ids, next_id=next_id, dead=dead)
+
+    def write(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.serialize())
+
+    @classmethod
+    def read(cls, path: str) -> Optional["VectorIdMap"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return cls.deserialize(f.read())
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+# magic, kind, count, dim, meta_len, crc32(payload)
+_HEADER = struct.Struct("<4sBIIII")
+_MAGIC = b"VLOG"
+
+KIND_ADD = 1
+KIND_REMOVE = 2
+
+
+class LogRecord:
+    __slots__ = ("kind", "ids", "vectors", "metas")
+
+    def __init__(self, kind: int, ids: np.ndarray, vectors: np.ndarray, metas: List[Dict[str, Any]]):
+        self.kind = kind
+        self.ids = ids
+        self.vectors = vectors
+        self.metas = metas
+
+
+class VectorLog:
+    """
+    Append-only write-ahead log for VectorStore.
+    Each record holds one add batch (int64 ids, float32 vectors and the metadata journal
+    entries (JSON) for those ids) or one remove batch (ids only), guarded by a CRC32 so a
+    torn tail write is detected and dropped on replay. Appending costs O(batch) I/O
+    regardless of store size.
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    @property
+    def size_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append_add(self, ids: List[int], vectors: np.ndarray, metas: List[Dict[str, Any]]) -> None:
+        self._append(KIND_ADD, ids, vectors, metas)
+
+    def append_remove(self, ids: List[int]) -> None:
+        self._append(KIND_REMOVE, ids, np.zeros((len(ids), 0), dtype=np.float32), [])
+
+    def _append(self, kind: int, ids: List[int], vectors: np.ndarray, metas: List[Dict[str, Any]]) -> None:
+        vecs = np.ascontiguousarray(vectors, dtype="<f4")
+        id_bytes = np.asarray(ids, dtype="<i8").tobytes()
+        meta_bytes = json.dumps(metas).encode("utf-8")
+        payload = id_bytes + vecs.tobytes() + meta_bytes
+        header = _HEADER.pack(_MAGIC, kind, vecs.shape[0], vecs.shape[1], len(meta_bytes), zlib.crc32(payload))
+        with open(self.path, "ab") as f:
+            f.write(header + payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+    def replay(self) -> Iterator[LogRecord]:
+        """Yield intact records in order; a corrupt or partial tail is truncated away."""
+        if not os.path.exists(self.path):
+            return
+        good_offset = 0
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                magic, kind, count, dim, meta_len, crc = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    break
+                payload = f.read(count * 8 + count * dim * 4 + meta_len)
+                if len(payload) != count * 8 + count * dim * 4 + meta_len or zlib.crc32(payload) != crc:
+                    break
+                ids = np.frombuffer(payload, dtype="<i8", count=count)
+                vecs = np.frombuffer(payload, dtype="<f4", count=count * dim, offset=count * 8).reshape(count, dim)
+                metas = json.loads(payload[count * 8 + count * dim * 4:].decode("utf-8"))
+                good_offset = f.tell()
+                yield LogRecord(kind=kind, ids=ids, vectors=vecs, metas=metas)
+        if good_offset < self.size_bytes:
+            with open(self.path, "r+b") as f:
+                f.truncate(good_offset)
+
+    def truncate(self) -> None:
+        with open(self.path, "wb") as f:
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.vector_filter import NO_TIMESTAMP, VectorFilter, to_epoch_us
+
+# Code column value for a missing field
+NO_CODE = -1
+_EPOCH = datetime(1970, 1, 1)
+_NIL_UUID = bytes(16)
+
+
+def _uuid_bytes(value: Any) -> Optional[bytes]:
+    """16 raw bytes for a canonical (lowercase, dashed) UUID string; None for anything else."""
+    if not isinstance(value, str) or len(value) != 36:
+        return None
+    try:
+        u = uuid.UUID(value)
+    except ValueError:
+        return None
+    return u.bytes if str(u) == value and u.bytes != _NIL_UUID else None
+
+
+def _from_epoch_us(us: int) -> str:
+    return (_EPOCH + timedelta(microseconds=int(us))).isoformat()
+
+
+def _timestamp_us(value: Any) -> Optional[int]:
+    """Epoch microseconds for a naive ISO timestamp that converts back to the same string."""
+    if not isinstance(value, str):
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None or dt.isoformat() != value:
+        return None
+    delta = dt - _EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class VectorMetaStore:
+    """
+    Columnar metadata for VectorStore, aligned with index slots.
+    - message_id: UUID as 16 fixed bytes; conversation_id/role/mode: int codes into small
+      string tables; timestamp: int64 microseconds (naive UTC, like the DB).
+    - Values that do not fit a column exactly (extra keys, non-UUID ids, tz-aware timestamps)
+      go to a small per-vector-ID overflow dict, so any metadata dict round-trips unchanged.
+    - Persisted as one .npy file per column plus JSON code tables; loading memory-maps the
+      columns, so startup cost does not grow with the number of vectors.
+    """
+    CODED = ("conversation_id", "role", "mode")
+    _DTYPES = {
+        "present": np.bool_,
+        "message_id": np.dtype("S16"),
+        "conversation_id": np.int32,
+        "role": np.int16,
+        "mode": np.int16,
+        "timestamp": np.int64,
+    }
+
+    def __init__(self):
+        self._n = 0
+        self._cols: Dict[str, np.ndarray] = {f: np.empty(0, dtype=dt) for f, dt in self._DTYPES.items()}
+        self._codes: Dict[str, Dict[str, int]] = {f: {} for f in self.CODED}
+        self._values: Dict[str, List[str]] = {f: [] for f in self.CODED}
+        self._extras: Dict[int, Dict[str, Any]] = {}
+
+    @property
+    def ntotal(self) -> int:
+        return self._n
+
+    def col(self, field: str) -> np.ndarray:
+        return self._cols[field][:self._n]
+
+    def _code(self, field: str, value: str) -> int:
+        code = self._codes[field].get(value)
+        if code is None:
+            code = self._codes[field][value] = len(self._values[field])
+            self._values[field].append(value)
+        return code
+
+    def _grow(self, need: int) -> None:
+        for f, col in self._cols.items():
+            if need > col.shape[0]:
+                # Also copies memory-mapped columns into writable memory on the first append
+                grown = np.zeros(max(need, 2 * col.shape[0], 1024), dtype=col.dtype)
+                grown[:self._n] = col[:self._n]
+                self._cols[f] = grown
+
+    def append(self, ids: Iterable[int], metas: List[Optional[Dict[str, Any]]]) -> None:
+        ids = list(ids)
+        start, need = self._n, self._n + len(metas)
+        self._grow(need)
+        present: List[bool] = []
+        message_ids: List[bytes] = []
+        coded: Dict[str, List[int]] = {f: [] for f in self.CODED}
+        stamps: List[int] = []
+        for vid, meta in zip(ids, metas):
+            present.append(isinstance(meta, dict))
+            mid, codes, ts = _NIL_UUID, dict.fromkeys(self.CODED, NO_CODE), int(NO_TIMESTAMP)
+            if isinstance(meta, dict):
+                extra: Dict[str, Any] = {}
+                for key, value in meta.items():
+                    if key == "message_id" and mid == _NIL_UUID and (b := _uuid_bytes(value)) is not None:
+                        mid = b
+                    elif key in codes and isinstance(value, str):
+                        codes[key] = self._code(key, value)
+                    elif key == "timestamp" and (us := _timestamp_us(value)) is not None:
+                        ts = us
+                    else:
+                        extra[key] = value
+                if extra:
+                    self._extras[int(vid)] = extra
+            message_ids.append(mid)
+            for f in self.CODED:
+                coded[f].append(codes[f])
+            stamps.append(ts)
+        self._cols["present"][start:need] = present
+        self._cols["message_id"][start:need] = message_ids
+        for f in self.CODED:
+            self._cols[f][start:need] = coded[f]
+        self._cols["timestamp"][start:need] = stamps
+        self._n = need
+
+    def get(self, slot: int, vector_id: int) -> Optional[Dict[str, Any]]:
+        """Metadata dict for one slot, O(1)."""
+        if slot < 0 or slot >= self._n or not self._cols["present"][slot]:
+            return None
+        cols = self._cols
+        meta: Dict[str, Any] = {}
+        mid = bytes(cols["message_id"][slot]).ljust(16, b"\0")
+        if mid != _NIL_UUID:
+            meta["message_id"] = str(uuid.UUID(bytes=mid))
+        for f in self.CODED:
+            code = int(cols[f][slot])
+            if code != NO_CODE:
+                meta[f] = self._values[f][code]
+        ts = int(cols["timestamp"][slot])
+        if ts != NO_TIMESTAMP:
+            meta["timestamp"] = _from_epoch_us(ts)
+        meta.update(self._extras.get(int(vector_id), {}))
+        return meta
+
+    def drop(self, ids: Iterable[int]) -> None:
+        for vid in ids:
+            self._extras.pop(int(vid), None)
+
+    def take(self, slots: np.ndarray) -> "VectorMetaStore":
+        """Columns for `slots` in order (used when the index is rebuilt without dead slots)."""
+        out = VectorMetaStore()
+        out._codes, out._values, out._extras = self._codes, self._values, self._extras
+        out._cols = {f: np.array(col[:self._n][slots]) for f, col in self._cols.items()}
+        out._n = int(len(slots))
+        return out
+
+    def mask(self, flt: VectorFilter) -> np.ndarray:
+        """Boolean mask over slots matching `flt`."""
+        out = np.ones(self._n, dtype=bool)
+        for f in self.CODED:
+            value = getattr(flt, f)
+            if value is not None:
+                code = self._codes[f].get(value)
+                if code is None:
+                    return np.zeros(self._n, dtype=bool)
+                out &= self.col(f) == code
+        ts = self.col("timestamp")
+        if flt.since is not None:
+            out &= ts >= to_epoch_us(flt.since)
+        if flt.until is not None:
+            out &= (ts < to_epoch_us(flt.until)) & (ts != NO_TIMESTAMP)
+        return out
+
+    def match(self, field: str, values: List[Any], ids: np.ndarray) -> np.ndarray:
+        """Boolean mask over slots whose `field` is one of `values` (`ids` = slot -> vector ID)."""
+        out = np.zeros(self._n, dtype=bool)
+        if field == "message_id":
+            keys = [b for b in (_uuid_bytes(v) for v in values) if b is not None]
+            if keys:
+                out |= np.isin(self.col("message_id"), np.array(keys, dtype="S16"))
+        elif field in self.CODED:
+            codes = [self._codes[field][v] for v in values if isinstance(v, str) and v in self._codes[field]]
+            if codes:
+                out |= np.isin(self.col(field), codes)
+        wanted = set(values)
+        extra_ids = [vid for vid, extra in self._extras.items() if field in extra and extra[field] in wanted]
+        if extra_ids:
+            out |= np.isin(ids[:self._n], extra_ids)
+        return out
+
+    def write(self, path: str) -> None:
+        """Write all columns into directory `path` (replaced as a whole)."""
+        tmp = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for f in self._cols:
+            np.save(os.path.join(tmp, f"{f}.npy"), self.col(f))
+        with open(os.path.join(tmp, "tables.json"), "w", encoding="utf-8") as fh:
+            json.dump({"values": self._values, "extras": {str(k): v for k, v in self._extras.items()}}, fh)
+        old = f"{path}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def read(cls, path: str) -> Optional["VectorMetaStore"]:
+        if not os.path.isdir(path):
+            return None
+        store = cls()
+        for f in cls._DTYPES:
+            store._cols[f] = np.load(os.path.join(path, f"{f}.npy"), mmap_mode="r")
+        store._n = int(store._cols["present"].shape[0])
+        with open(os.path.join(path, "tables.json"), "r", encoding="utf-8") as fh:
+            tables = json.load(fh)
+        store._values = {f: list(tables["values"].get(f, [])) for f in cls.CODED}
+        store._codes = {f: {v: i for i, v in enumerate(store._values[f])} for f in cls.CODED}
+        store._extras = {int(k): v for k, v in tables.get("extras", {}).items()}
+        return store
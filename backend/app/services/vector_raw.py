@@ -0,0 +1,94 @@
+from __future__ import annotations
+import glob
+import os
+import uuid
+from typing import Optional
+
+import numpy as np
+
+
+class RawVectors:
+    """
+    Full-precision float32 copies of the vectors of a lossy (quantized) index, one row per
+    index slot, in a headerless file next to the index.
+    - Rows are appended as vectors are added and read back through a memory map, so exact
+      reranking touches only the candidate rows (page cache, not process memory).
+    - A replacement file (after a rebuild) is written under a temporary name and committed
+      under the name of the snapshot version that first includes it (raw-<version>.f32).
+      The previous file is never overwritten: older snapshots keep referencing it and
+      searches still running on the previous index keep their mapping, until no retained
+      snapshot names it and pruning deletes it.
+    """
+
+    def __init__(self, path: str, d: int, rows: int):
+        self.path = path
+        self.d = int(d)
+        self._rows = int(rows)
+        self._map: Optional[np.memmap] = None
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def nbytes(self) -> int:
+        return self._rows * self.d * 4
+
+    @classmethod
+    def create(cls, path: str, vectors: np.ndarray) -> "RawVectors":
+        """Write `vectors` to a new file beside `path`; commit(path) moves it into place."""
+        new_path = f"{path}.new-{uuid.uuid4().hex[:12]}"
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with open(new_path, "wb") as f:
+            f.write(vectors.tobytes())
+        return cls(new_path, vectors.shape[1], vectors.shape[0])
+
+    @classmethod
+    def open(cls, path: str, d: int) -> Optional["RawVectors"]:
+        if not os.path.isfile(path):
+            return None
+        size = os.path.getsize(path)
+        return cls(path, d, size // (4 * d))
+
+    def append(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not vectors.shape[0]:
+            return
+        with open(self.path, "ab") as f:
+            f.write(vectors.tobytes())
+        self._rows += vectors.shape[0]
+
+    def truncate(self, rows: int) -> None:
+        """Drop rows past `rows` (appended after the last snapshot); only safe while nothing maps the file."""
+        with open(self.path, "r+b") as f:
+            f.truncate(rows * self.d * 4)
+        self._rows = rows
+        self._map = None
+
+    def take(self, slots: np.ndarray) -> np.ndarray:
+        slots = np.asarray(slots, dtype=np.int64)
+        if not slots.shape[0]:
+            return np.zeros((0, self.d), dtype=np.float32)
+        mapped = self._map
+        if mapped is None or int(slots.max()) >= mapped.shape[0]:
+            # Remap to cover rows appended since the last read
+            mapped = self._map = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self._rows, self.d))
+        return np.asarray(mapped[slots], dtype=np.float32)
+
+    @staticmethod
+    def remove_uncommitted(path: str) -> None:
+        """Delete replacement files for `path` left behind by an interrupted rebuild."""
+        for stale in glob.glob(f"{glob.escape(path)}.new-*"):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+    @property
+    def committed(self) -> bool:
+        return ".new-" not in os.path.basename(self.path)
+
+    def commit(self, path: str) -> None:
+        if self.path != path:
+            os.replace(self.path, path)
+            self.path = path
@@ -0,0 +1,191 @@
+"""
+Full rebuild of the vector index from the messages in the database.
+
+Usage (from backend/, with the server stopped; a running server rebuilds through
+POST /api/v1/memory/index/rebuild instead):
+  python -m app.services.vector_reindex [--batch-size 2048]
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.database import db, Message as DBMessage
+from app.services.embedding_pool import embedding_pool
+from app.services.memory_service import message_vector_meta
+from app.services.vector_store import vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class VectorReindexer:
+    """
+    Rebuilds the vector store from the database, e.g. after the index was lost or corrupted
+    or the embedding backend changed dimension.
+    - Messages are read in keyset-paginated pages (VECTOR_REINDEX_BATCH_SIZE) and decrypted
+      on a prefetch thread while the previous page is embedded by the worker pool.
+    - The new index is built side-by-side via store.rebuild(); the old one keeps serving
+      searches and writes, and changes made meanwhile are carried over at the swap.
+    - One rebuild at a time; progress and throughput are available from status().
+    """
+
+    def __init__(self, store=None, database=None, batch_size: Optional[int] = None):
+        self.store = store if store is not None else vector_store
+        self.db = database if database is not None else db
+        self.batch_size = max(1, settings.VECTOR_REINDEX_BATCH_SIZE if batch_size is None else int(batch_size))
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self._status.get("state") == "running"
+
+    def status(self) -> Dict[str, Any]:
+        status = dict(self._status)
+        if status.get("state") == "running":
+            elapsed = time.perf_counter() - status.pop("_t0")
+            status["elapsed_sec"] = round(elapsed, 3)
+            status["messages_per_sec"] = round(status["indexed"] / elapsed, 1) if elapsed > 0 else 0.0
+        status.pop("_t0", None)
+        return status
+
+    def needed(self) -> Optional[str]:
+        """Reason the index should be rebuilt from the database, or None."""
+        reason = getattr(self.store, "rebuild_reason", None)
+        if reason:
+            return reason
+        if self.store.stats()["live"] == 0 and self.db.count_messages() > 0:
+            return "missing"
+        return None
+
+    def start(self) -> bool:
+        """Run in a background thread; False if a rebuild is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self._begin()
+            self._thread = threading.Thread(target=self._run, name="vector-reindex", daemon=True)
+            self._thread.start()
+            return True
+
+    def start_if_needed(self) -> Optional[str]:
+        reason = self.needed()
+        if reason:
+            logger.warning("Rebuilding vector index from the database (%s)", reason)
+            self.start()
+        return reason
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.status()
+
+    def run(self) -> Dict[str, Any]:
+        """Rebuild synchronously and return the final status."""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("a vector index rebuild is already running")
+            self._begin()
+        self._run()
+        return self.status()
+
+    def _begin(self) -> None:
+        self._status = {
+            "state": "running",
+            "started_at": datetime.utcnow().isoformat(),
+            "total": None,
+            "indexed": 0,
+            "_t0": time.perf_counter(),
+        }
+
+    def _run(self) -> None:
+        t0 = self._status["_t0"]
+        try:
+            self._status["total"] = self.db.count_messages()
+            live = self.store.rebuild(self._batches(), self._catch_up)
+            elapsed = time.perf_counter() - t0
+            self._status = {
+                "state": "done",
+                "started_at": self._status["started_at"],
+                "finished_at": datetime.utcnow().isoformat(),
+                "total": self._status["total"],
+                "indexed": self._status["indexed"],
+                "live": live,
+                "elapsed_sec": round(elapsed, 3),
+                "messages_per_sec": round(self._status["indexed"] / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+            logger.info("Vector index rebuilt: %d messages in %.1fs", self._status["indexed"], elapsed)
+        except Exception as e:
+            logger.exception("Vector index rebuild failed")
+            self._status = {
+                "state": "failed",
+                "started_at": self._status["started_at"],
+                "finished_at": datetime.utcnow().isoformat(),
+                "total": self._status["total"],
+                "indexed": self._status["indexed"],
+                "error": str(e),
+            }
+
+    def _pages(self) -> Iterator[List[DBMessage]]:
+        # Fetch and decrypt the next page while the current one is being embedded
+        pages = self.db.iter_messages(self.batch_size)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-reindex-read") as reader:
+            pending = reader.submit(next, pages, None)
+            while True:
+                page = pending.result()
+                if page is None:
+                    return
+                pending = reader.submit(next, pages, None)
+                yield page
+
+    def _embed(self, msgs: List[DBMessage]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        return embedding_pool.embed_texts([m.content or "" for m in msgs]), [message_vector_meta(m) for m in msgs]
+
+    def _batches(self) -> Iterator[Tuple[np.ndarray, List[Dict[str, Any]]]]:
+        for page in self._pages():
+            vecs, metas = self._embed(page)
+            yield vecs, metas
+            self._status["indexed"] += len(metas)
+
+    def _catch_up(self, metas: List[Dict[str, Any]]) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """Re-embed messages indexed while the rebuild ran; ones no longer in the database are dropped."""
+        ids = [m.get("message_id") for m in metas if m.get("message_id")]
+        msgs = self.db.get_messages_by_ids(ids)
+        if not msgs:
+            return np.zeros((0, 0), dtype=np.float32), []
+        vecs, fresh = self._embed(msgs)
+        self._status["indexed"] += len(fresh)
+        return vecs, fresh
+
+
+# Global instance
+vector_reindexer = VectorReindexer()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Rebuild the vector index from the message database")
+    ap.add_argument("--batch-size", type=int, default=None, help="messages per page (default VECTOR_REINDEX_BATCH_SIZE)")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    reindexer = VectorReindexer(batch_size=args.batch_size)
+    reindexer.start()
+    while reindexer.running:
+        reindexer.wait(timeout=5.0)
+        status = reindexer.status()
+        if status["state"] == "running":
+            print(f"indexed {status['indexed']}/{status['total']} ({status['messages_per_sec']} msg/s)", flush=True)
+    print(json.dumps(reindexer.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+from __future__ import annotations
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_service import embedding_service
+from app.services.vector_filter import VectorFilter
+from app.services.vector_store import VectorStore, _WriteBehindQueue, meta_matcher, older_than
+
+# Vector IDs are (month key << SHARD_ID_BITS) | per-shard counter, so an ID names its shard
+SHARD_ID_BITS = 40
+_SHARD_DIR_RE = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+def month_key(ts: Any) -> int:
+    """year * 12 + month - 1 for an ISO string or datetime (naive = UTC); current month otherwise."""
+    if isinstance(ts, str):
+        try:
+            ts = datetime.fromisoformat(ts)
+        except ValueError:
+            ts = None
+    if not isinstance(ts, datetime):
+        ts = datetime.utcnow()
+    elif ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.year * 12 + ts.month - 1
+
+
+def month_start(key: int) -> datetime:
+    return datetime(key // 12, key % 12 + 1, 1)
+
+
+def shard_name(key: int) -> str:
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+
+class ShardedVectorStore:
+    """
+    VectorStore partitioned into monthly shards (VECTOR_SHARD_BY="month").
+    - Each shard is a self-contained VectorStore (index, ID map, metadata columns, log) in
+      its own directory under VECTOR_SHARD_DIR; vectors go to the shard of their metadata
+      timestamp, so live traffic only writes the current month. Older shards are never
+      written, stay memory-mapped and are never rebuilt or re-persisted.
+    - Queries are embedded once and fanned out over the shards in a thread pool (FAISS
+      releases the GIL), then merged by score. Time filters skip shards outside the range.
+    - Retention drops whole shards older than the cutoff by deleting their directory.
+    Exposes the same interface as VectorStore.
+    """
+
+    def __init__(self, root: Optional[str] = None, index_type: Optional[str] = None, threads: Optional[int] = None,
+                 dim: Optional[int] = None):
+        self.root = root or settings.VECTOR_SHARD_DIR or f"{settings.VECTOR_INDEX_PATH}.shards"
+        self.index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+        self.dim = dim or embedding_service.dim
+        configured = settings.VECTOR_SHARD_SEARCH_THREADS if threads is None else threads
+        self.threads = int(configured) if configured and configured > 0 else min(8, os.cpu_count() or 1)
+        # Replaced (never mutated) under _lock, so readers can iterate it without locking
+        self._shards: Dict[int, VectorStore] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._write_queue = _WriteBehindQueue(self.add_texts, settings.VECTOR_WRITE_BATCH_SIZE, settings.VECTOR_WRITE_FLUSH_MS,
+                                              settings.VECTOR_WRITE_ATTEMPTS, settings.VECTOR_WRITE_RETRY_MS,
+                                              remove=self.remove_ids)
+        os.makedirs(self.root, exist_ok=True)
+        for name in sorted(os.listdir(self.root)):
+            m = _SHARD_DIR_RE.match(name)
+            if m and os.path.isdir(os.path.join(self.root, name)):
+                self._open_shard(int(m.group(1)) * 12 + int(m.group(2)) - 1)
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def rebuild_reason(self) -> Optional[str]:
+        return next((shard.rebuild_reason for _, shard in self.shards() if shard.rebuild_reason), None)
+
+    def _open_shard(self, key: int) -> VectorStore:
+        path = os.path.join(self.root, shard_name(key))
+        os.makedirs(path, exist_ok=True)
+        shard = VectorStore(
+            dim=self.dim,
+            index_path=os.path.join(path, "vector.index"),
+            meta_path=os.path.join(path, "vector_meta.json"),
+            index_type=self.index_type,
+            first_id=key << SHARD_ID_BITS,
+        )
+        self._shards = {**self._shards, key: shard}
+        return shard
+
+    def _shard(self, key: int) -> VectorStore:
+        shard = self._shards.get(key)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.get(key) or self._open_shard(key)
+        return shard
+
+    def shards(self) -> List[Tuple[int, VectorStore]]:
+        return sorted(self._shards.items())
+
+    def _shard_for_id(self, vector_id: int) -> Optional[VectorStore]:
+        return self._shards.get(int(vector_id) >> SHARD_ID_BITS)
+
+    # Writes
+
+    def enqueue_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Queue texts for background embedding and indexing; returns immediately."""
+        assert len(texts) == len(metadatas)
+        if texts:
+            self._write_queue.put(list(texts), list(metadatas))
+
+    @property
+    def pending_writes(self) -> int:
+        return self._write_queue.pending
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued inserts to be indexed."""
+        return self._write_queue.flush(timeout)
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> List[int]:
+        assert len(texts) == len(metadatas)
+        if not texts:
+            return []
+        return self.add_vectors(embedding_service.embed_texts(texts), metadatas)
+
+    def add_vectors(self, vecs: np.ndarray, metadatas: List[Dict[str, Any]]) -> List[int]:
+        """Route rows to the shard of their timestamp; returns IDs in input order."""
+        groups: Dict[int, List[int]] = {}
+        for row, meta in enumerate(metadatas):
+            ts = meta.get("timestamp") if isinstance(meta, dict) else None
+            groups.setdefault(month_key(ts), []).append(row)
+        assigned: List[int] = [0] * len(metadatas)
+        for key, rows in groups.items():
+            ids = self._shard(key).add_vectors(vecs[rows], [metadatas[r] for r in rows])
+            for row, vid in zip(rows, ids):
+                assigned[row] = vid
+        return assigned
+
+    def remove_ids(self, ids: List[int]) -> int:
+        by_shard: Dict[int, List[int]] = {}
+        for vid in ids:
+            by_shard.setdefault(int(vid) >> SHARD_ID_BITS, []).append(int(vid))
+        return sum(self._shards[key].remove_ids(group) for key, group in by_shard.items() if key in self._shards)
+
+    def ids_where(self, field: str, values: List[Any]) -> List[int]:
+        return [vid for _, shard in self.shards() for vid in shard.ids_where(field, values)]
+
+    def remove_where(self, field: str, values: List[Any]) -> int:
+        if not values:
+            return 0
+        # Inserts still queued for these rows would otherwise outlive the delete
+        self._write_queue.discard(meta_matcher(field, values))
+        return sum(shard.remove_where(field, values) for _, shard in self.shards())
+
+    def drop_older_than(self, cutoff: datetime) -> int:
+        """Delete shards entirely before `cutoff` (O(1) each) and trim the boundary shard."""
+        self._write_queue.discard(older_than(cutoff))
+        if cutoff.tzinfo is not None:
+            cutoff = cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+        removed = 0
+        for key, shard in self.shards():
+            if month_start(key + 1) <= cutoff:
+                with self._lock:
+                    self._shards = {k: s for k, s in self._shards.items() if k != key}
+                removed += shard.stats()["live"]
+                shard.flush()
+                shutil.rmtree(os.path.join(self.root, shard_name(key)), ignore_errors=True)
+            elif month_start(key) < cutoff:
+                removed += shard.drop_older_than(cutoff)
+        return removed
+
+    def get_meta(self, vector_id: int) -> Optional[Dict[str, Any]]:
+        shard = self._shard_for_id(vector_id)
+        return shard.get_meta(vector_id) if shard is not None else None
+
+    # Reads
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="vector-shard")
+        return self._pool
+
+    def _candidate_shards(self, filters: Optional[VectorFilter]) -> List[VectorStore]:
+        shards = []
+        for key, shard in self.shards():
+            if filters is not None and filters.since is not None and month_start(key + 1) <= _naive_utc(filters.since):
+                continue
+            if filters is not None and filters.until is not None and month_start(key) >= _naive_utc(filters.until):
+                continue
+            shards.append(shard)
+        return shards
+
+    def search(self, query: str, k: int = 5, read_your_writes: bool = False,
+               filters: Optional[VectorFilter] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        return self.search_batch([query], k=k, read_your_writes=read_your_writes, filters=filters)[0]
+
+    def search_batch(self, queries: List[str], k: int = 5, read_your_writes: bool = False,
+                     filters: Optional[VectorFilter] = None) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        if read_your_writes:
+            self.flush(timeout=settings.VECTOR_READ_YOUR_WRITES_TIMEOUT_SEC)
+        results: List[List[Tuple[float, Dict[str, Any]]]] = [[] for _ in queries]
+        rows = [i for i, q in enumerate(queries) if q]
+        shards = self._candidate_shards(filters)
+        if not rows or not shards:
+            return results
+        qvecs = embedding_service.embed_texts([queries[i] for i in rows])
+        for row, hits in zip(rows, self._search_shards(shards, qvecs, k, filters)):
+            results[row] = hits
+        return results
+
+    def search_vectors(self, qvecs: np.ndarray, k: int = 5,
+                       filters: Optional[VectorFilter] = None) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """Top-k (score, meta) per row of an already-embedded query matrix."""
+        shards = self._candidate_shards(filters)
+        if not shards:
+            return [[] for _ in range(qvecs.shape[0])]
+        return self._search_shards(shards, qvecs, k, filters)
+
+    def _search_shards(self, shards: List[VectorStore], qvecs: np.ndarray, k: int,
+                       filters: Optional[VectorFilter]) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        if len(shards) == 1:
+            per_shard = [shards[0].search_vectors(qvecs, k=k, filters=filters)]
+        else:
+            per_shard = list(self._executor().map(lambda s: s.search_vectors(qvecs, k=k, filters=filters), shards))
+        results = []
+        for qi in range(qvecs.shape[0]):
+            merged = [hit for hits in per_shard for hit in hits[qi]]
+            merged.sort(key=lambda h: h[0], reverse=True)
+            results.append(merged[:k])
+        return results
+
+    # Maintenance
+
+    def rebuild(self, batches: Iterable[Tuple[np.ndarray, List[Dict[str, Any]]]],
+                catch_up: Callable[[List[Dict[str, Any]]], Tuple[np.ndarray, List[Dict[str, Any]]]]) -> int:
+        """VectorStore.rebuild() across shards: rows are routed by timestamp and every shard is swapped."""
+        builds = {key: (shard, shard.begin_rebuild()) for key, shard in self.shards()}
+        try:
+            for vecs, metadatas in batches:
+                groups: Dict[int, List[int]] = {}
+                for row, meta in enumerate(metadatas):
+                    groups.setdefault(month_key(meta.get("timestamp")), []).append(row)
+                for key, rows in groups.items():
+                    if key not in builds:
+                        # Everything in a shard opened after the start counts as a concurrent add
+                        shard = self._shard(key)
+                        builds[key] = (shard, shard.begin_rebuild(since_id=key << SHARD_ID_BITS))
+                    shard, rebuild = builds[key]
+                    shard.rebuild_add(rebuild, vecs[rows], [metadatas[r] for r in rows])
+        except BaseException:
+            for shard, _ in builds.values():
+                shard.abort_rebuild()
+            raise
+        current = dict(self.shards())
+        for key, shard in current.items():
+            if key not in builds:
+                builds[key] = (shard, shard.begin_rebuild(since_id=key << SHARD_ID_BITS))
+        live = 0
+        for key, (shard, rebuild) in builds.items():
+            if current.get(key) is shard:
+                live += shard.finish_rebuild(rebuild, catch_up)
+            else:
+                # Dropped by retention in the meantime
+                shard.abort_rebuild()
+        return live
+
+    def compact(self) -> None:
+        for _, shard in self.shards():
+            shard.compact()
+
+    def compact_if_dirty(self) -> bool:
+        return any([shard.compact_if_dirty() for _, shard in self.shards()])
+
+    def migrate(self, kind: Optional[str] = None, background: bool = False) -> None:
+        for _, shard in self.shards():
+            shard.migrate(kind, background=background)
+
+    def recall_check(self, n_queries: int = 100, k: int = 10) -> Dict[str, Any]:
+        checks = [(shard_name(key), shard.recall_check(n_queries=n_queries, k=k)) for key, shard in self.shards()]
+        total = sum(c["ntotal"] for _, c in checks)
+        recall = sum(c["recall"] * c["ntotal"] for _, c in checks) / total if total else 1.0
+        return {"k": k, "ntotal": total, "recall": recall, "shards": {name: c for name, c in checks}}
+
+    def stats(self) -> Dict[str, Any]:
+        per_shard = {shard_name(key): shard.stats() for key, shard in self.shards()}
+        return {
+            "configured_type": self.index_type,
+            "sharding": "month",
+            "shards": per_shard,
+            "ntotal": sum(s["ntotal"] for s in per_shard.values()),
+            "live": sum(s["live"] for s in per_shard.values()),
+            "tombstones": sum(s["tombstones"] for s in per_shard.values()),
+            "dim": self.dim,
+            "pending_writes": self.pending_writes,
+            "write_errors": self._write_queue.errors,
+            "write_dropped": self._write_queue.dropped,
+            "rebuild_reason": self.rebuild_reason,
+        }
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo is not None else dt
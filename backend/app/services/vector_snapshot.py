@@ -0,0 +1,173 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import re
+import shutil
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "MANIFEST.json"
+FORMAT = 1
+_VERSION_DIR = re.compile(r"^\d{8}$")
+_CHUNK = 1 << 20
+
+
+def file_crc32(path: str, sync: bool = False) -> Tuple[int, int]:
+    """(size, CRC32) of a file; `sync` also fsyncs it through the same descriptor."""
+    crc = size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+        if sync:
+            os.fsync(f.fileno())
+    return size, crc
+
+
+def fsync_path(path: str) -> None:
+    """fsync a file, or a directory so renames inside it are durable (not supported on Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class VectorSnapshots:
+    """
+    Versioned snapshots of a VectorStore under one directory:
+      root/00000007/{index, ids, meta/, MANIFEST.json}
+    - A snapshot is written into "<version>.tmp" and every file is fsynced. The manifest
+      (sizes and CRC32s of all files, plus whatever the store adds: dimension, embedding
+      version, counts) is written last, and the directory is renamed into place. The rename
+      is the commit point, so a crash leaves either the previous or the new snapshot, never
+      a mix.
+    - candidates() yields committed snapshots newest first, checked against their manifest,
+      so a damaged newest snapshot falls back to the one before it.
+    - The newest `keep` snapshots are retained; other files directly in root (such as the
+      store's full-precision vector files) are kept only while a retained manifest lists them.
+    """
+
+    def __init__(self, root: str, keep: int = 2, verify_checksums: bool = True, fsync: bool = True):
+        self.root = root
+        self.keep = max(1, int(keep))
+        self.verify_checksums = verify_checksums
+        self.fsync = fsync
+
+    def versions(self) -> List[int]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name) for name in os.listdir(self.root)
+                      if _VERSION_DIR.match(name) and os.path.isdir(os.path.join(self.root, name)))
+
+    def path(self, version: int) -> str:
+        return os.path.join(self.root, f"{version:08d}")
+
+    def next_version(self) -> int:
+        versions = self.versions()
+        return versions[-1] + 1 if versions else 1
+
+    def begin(self, version: int) -> str:
+        """Empty staging directory for `version`."""
+        tmp = f"{self.path(version)}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        return tmp
+
+    def commit(self, tmp: str, version: int, info: Dict[str, Any]) -> Dict[str, Any]:
+        """Checksum and fsync the files in `tmp`, write its manifest and move it into place."""
+        files: Dict[str, Dict[str, int]] = {}
+        for rel in self._files(tmp):
+            size, crc = file_crc32(os.path.join(tmp, rel), sync=self.fsync)
+            files[rel] = {"size": size, "crc32": crc}
+        manifest = {"format": FORMAT, "version": version, "created_at": datetime.utcnow().isoformat(),
+                    **info, "files": files}
+        with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if self.fsync:
+            for rel in {os.path.dirname(r) for r in files}:
+                fsync_path(os.path.join(tmp, rel))
+        final = self.path(version)
+        os.replace(tmp, final)
+        if self.fsync:
+            fsync_path(self.root)
+        return manifest
+
+    def read_manifest(self, version: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path(version), MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if isinstance(manifest, dict) and manifest.get("format") == FORMAT else None
+
+    def validate(self, version: int, manifest: Dict[str, Any]) -> Optional[str]:
+        """Why the files of `version` do not match its manifest, or None when they do."""
+        base = self.path(version)
+        for rel, expected in manifest.get("files", {}).items():
+            full = os.path.join(base, rel)
+            if not os.path.isfile(full):
+                return f"{rel} is missing"
+            if os.path.getsize(full) != expected["size"]:
+                return f"{rel} has the wrong size"
+            if self.verify_checksums and file_crc32(full)[1] != expected["crc32"]:
+                return f"{rel} fails its checksum"
+        return None
+
+    def candidates(self) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """(version, path, manifest) of intact snapshots, newest first."""
+        for version in reversed(self.versions()):
+            manifest = self.read_manifest(version)
+            problem = "manifest is missing or unreadable" if manifest is None else self.validate(version, manifest)
+            if problem:
+                logger.warning("Vector snapshot %s is damaged (%s); skipping it", self.path(version), problem)
+                continue
+            yield version, self.path(version), manifest
+
+    def prune(self, referenced: Iterable[str] = ()) -> None:
+        """
+        Drop all but the newest `keep` snapshots, leftover staging directories, and root-level
+        files that neither a retained manifest ("extra_files") nor `referenced` names.
+        Best effort: files still open elsewhere (e.g. mapped on Windows) go on a later prune.
+        """
+        versions = self.versions()
+        retained = versions[-self.keep:]
+        keep_files = set(referenced)
+        for version in retained:
+            keep_files.update((self.read_manifest(version) or {}).get("extra_files", []))
+        for name in os.listdir(self.root):
+            full = os.path.join(self.root, name)
+            try:
+                if _VERSION_DIR.match(name) and os.path.isdir(full):
+                    if int(name) not in retained:
+                        shutil.rmtree(full)
+                elif name.endswith(".tmp") and os.path.isdir(full):
+                    shutil.rmtree(full)
+                elif os.path.isfile(full) and name not in keep_files and ".new-" not in name:
+                    # ".new-" files belong to a migration still being built
+                    os.remove(full)
+            except OSError as e:
+                logger.debug("Could not prune %s: %s", full, e)
+
+    @staticmethod
+    def _files(base: str) -> List[str]:
+        out = []
+        for dirpath, _dirs, names in os.walk(base):
+            for name in names:
+                out.append(os.path.relpath(os.path.join(dirpath, name), base))
+        return sorted(out)
@@ -1,97 +1,1061 @@
 from __future__ import annotations
 import json
+import logging
 import os
-from typing import List, Dict, Any, Optional, Tuple
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 import faiss
 import numpy as np
 from app.core.config import settings
 from app.services.embedding_service import embedding_service
+from app.services.sparse_index import SparseInvertedIndex
+from app.services.vector_log import VectorLog, KIND_ADD, KIND_REMOVE
+from app.services.vector_id_map import VectorIdMap, TOMBSTONE
+from app.services.vector_filter import NO_TIMESTAMP, VectorFilter, to_epoch_us
+from app.services.vector_meta import VectorMetaStore, _NIL_UUID
+from app.services.vector_raw import RawVectors
+from app.services.vector_snapshot import VectorSnapshots, fsync_path
+from app.services import ann_index
+
+logger = logging.getLogger(__name__)
+
+
+class _WriteBehindQueue:
+    """
+    Background flusher for VectorStore inserts.
+    Items are acknowledged on enqueue; a daemon thread drains them in batches of up to
+    `batch_size`, waiting at most `flush_ms` for a batch to fill. A batch whose sink call
+    fails is put back at the head of the queue and retried after `retry_ms`, up to
+    `attempts` tries per item; only then are its items dropped (and counted).
+    discard() cancels queued items matching a metadata predicate; items already handed to
+    the sink are removed through `remove` (called with their IDs) once the sink returns.
+    """
+
+    def __init__(self, sink, batch_size: int, flush_ms: float, attempts: int = 3, retry_ms: float = 1000.0,
+                 remove: Optional[Callable[[List[int]], Any]] = None):
+        self._sink = sink
+        self._remove = remove
+        self.batch_size = max(1, int(batch_size))
+        self.flush_sec = max(0.0, float(flush_ms)) / 1000.0
+        self.attempts = max(1, int(attempts))
+        self.retry_sec = max(0.0, float(retry_ms)) / 1000.0
+        self._cond = threading.Condition()
+        # (text, metadata, failed attempts so far)
+        self._items: List[Tuple[str, Dict[str, Any], int]] = []
+        self._in_flight = 0
+        # Metadata of the batch the sink is working on, and discard() predicates that matched it
+        self._batch: List[Dict[str, Any]] = []
+        self._late: List[Callable[[Dict[str, Any]], bool]] = []
+        self._flush_waiters = 0
+        self._thread: Optional[threading.Thread] = None
+        self.batches_flushed = 0
+        self.items_flushed = 0
+        self.errors = 0
+        self.dropped = 0
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._items) + self._in_flight
+
+    def put(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            self._items.extend((t, m, 0) for t, m in zip(texts, metadatas))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="vector-write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._items:
+                    self._cond.wait()
+                # Give the batch a chance to fill up, bounded by the flush interval
+                deadline = time.monotonic() + self.flush_sec
+                while len(self._items) < self.batch_size and not self._flush_waiters:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._items[:self.batch_size]
+                del self._items[:self.batch_size]
+                self._in_flight = len(batch)
+                self._batch = [m for _, m, _ in batch]
+            retry: List[Tuple[str, Dict[str, Any], int]] = []
+            ids: List[int] = []
+            try:
+                ids = list(self._sink([t for t, _, _ in batch], self._batch) or [])
+                self.items_flushed += len(batch)
+                self.batches_flushed += 1
+            except Exception:
+                # Callers were already told the items are accepted: retry before giving up on them
+                self.errors += 1
+                retry = [(t, m, tries + 1) for t, m, tries in batch if tries + 1 < self.attempts]
+                dropped = len(batch) - len(retry)
+                self.dropped += dropped
+                logger.exception("Write-behind indexing of %d vectors failed (%d requeued, %d dropped)",
+                                 len(batch), len(retry), dropped)
+            while True:
+                with self._cond:
+                    late, self._late = self._late, []
+                    if not late:
+                        self._items[:0] = retry
+                        self._in_flight = 0
+                        self._batch = []
+                        self._cond.notify_all()
+                        break
+                    retry = [item for item in retry if not any(pred(item[1]) for pred in late)]
+                # Deleted while the sink was indexing them: remove what it just added
+                self._remove_late(ids, late)
+            if retry:
+                time.sleep(self.retry_sec)
+
+    def _remove_late(self, ids: List[int], late: List[Callable[[Dict[str, Any]], bool]]) -> None:
+        doomed = [vid for vid, m in zip(ids, self._batch) if any(pred(m) for pred in late)]
+        if not doomed or self._remove is None:
+            return
+        try:
+            self._remove(doomed)
+        except Exception:
+            logger.exception("Removing %d vectors deleted while being indexed failed", len(doomed))
+
+    def discard(self, pred: Callable[[Dict[str, Any]], bool]) -> int:
+        """
+        Cancel pending inserts whose metadata matches `pred`; returns how many were still queued.
+        Matching items of the batch being indexed right now are removed as soon as it lands.
+        """
+        with self._cond:
+            kept = [item for item in self._items if not pred(item[1])]
+            discarded = len(self._items) - len(kept)
+            self._items[:] = kept
+            if any(pred(m) for m in self._batch):
+                self._late.append(pred)
+        return discarded
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything enqueued so far is indexed; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Makes the worker skip the rest of its batching window
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._items or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._flush_waiters -= 1
+        return True
+
+
+def meta_matcher(field: str, values: List[Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate over pending-insert metadata: `field` is one of `values`."""
+    wanted = set(values)
+    return lambda meta: isinstance(meta, dict) and meta.get(field) in wanted
+
+
+def older_than(cutoff: datetime) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate over pending-insert metadata: timestamp set and before `cutoff`."""
+    limit = to_epoch_us(cutoff)
+
+    def pred(meta: Dict[str, Any]) -> bool:
+        stamp = to_epoch_us(meta.get("timestamp")) if isinstance(meta, dict) else NO_TIMESTAMP
+        return stamp != NO_TIMESTAMP and stamp < limit
+    return pred
+
+
+class _ReadWriteLock:
+    """
+    Shared/exclusive lock: any number of concurrent readers, or one writer.
+    A waiting writer blocks new readers, so a steady stream of searches cannot starve
+    inserts. Not reentrant: a thread must not take read() while already holding it.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class _Rebuild:
+    """Index, ID map and metadata built side-by-side by VectorStore.rebuild() until the swap."""
+
+    def __init__(self, since_id: int):
+        # Live vectors with IDs from here on were added during the rebuild and are caught up at the swap
+        self.since_id = since_id
+        self.index = None
+        self.ids = VectorIdMap()
+        self.meta = VectorMetaStore()
+
+    def add(self, index_factory, ids: np.ndarray, vecs: np.ndarray, metadatas: List[Dict[str, Any]]) -> None:
+        if self.index is None:
+            self.index = index_factory(vecs.shape[1])
+        elif self.index.d != vecs.shape[1]:
+            raise ValueError(f"rebuild batch has dimension {vecs.shape[1]}, expected {self.index.d}")
+        self.index.add(np.ascontiguousarray(vecs, dtype=np.float32))
+        self.ids.append(ids)
+        self.meta.append(ids.tolist(), metadatas)
 
 
 class VectorStore:
     """
     FAISS-based vector store for semantic search over messages.
     - Persists index to disk (settings.VECTOR_INDEX_PATH)
-    - Persists metadata mapping (vector_id -> dict) to disk (settings.VECTOR_META_PATH)
+    - Persists metadata (vector_id -> dict) as memory-mapped columns (VectorMetaStore) in
+      f"{settings.VECTOR_META_PATH}.cols"; a legacy JSON file at VECTOR_META_PATH is read
+      once and converted on the next snapshot
+    - Vectors have stable 64-bit IDs (VectorIdMap, persisted next to the index); removals
+      tombstone the ID and the index is rebuilt without dead vectors once they exceed
+      VECTOR_TOMBSTONE_PURGE_RATIO of the store.
+    - search(filters=...) pre-filters the index scan with a slot bitmap computed from the
+      conversation/role/mode/timestamp columns.
+    - Index type (settings.VECTOR_INDEX_TYPE):
+      "flat": dense faiss.IndexFlatIP (exact, brute force)
+      "sparse": SparseInvertedIndex posting lists; suited to hashed embeddings, which touch
+      only a few dozen of the `dim` buckets per message
+      "hnsw" | "ivf" | "ivfpq": FAISS ANN indexes (IVF variants stay flat until there is
+      enough data to train them)
+      "fp16" | "sq8" | "pq" | "opq": compressed flat scans (half floats, int8 scalar
+      quantization, (optimized) product quantization), 2x/4x/~50x smaller than "flat"
+      "auto": flat, then HNSW past VECTOR_AUTO_HNSW_AT vectors, then IVF past VECTOR_AUTO_IVF_AT;
+      with VECTOR_MEMORY_BUDGET_MB set, the least lossy compression that fits the budget
+      A sparse/dense mismatch is converted on load; other type changes are rebuilt in the
+      background (trained on a sample) and swapped in, keeping vector IDs.
+    - Dense snapshots are memory-mapped on load (VECTOR_INDEX_MMAP, FAISS IO_FLAG_MMAP_IFC
+      for flat/HNSW storage), so startup does not read the index and processes on one host
+      share page cache; the mapping is copied into private memory on the first write.
+    - Lossy (quantized) indexes keep full-precision copies of their vectors on disk
+      (RawVectors, next to the snapshots); searches fetch VECTOR_RERANK_FACTOR * k
+      candidates from the codes and rescore them exactly from those rows.
+    - Adds and removes are appended to a write-ahead log (vectors + metadata journal) in
+      O(batch) I/O; the log is folded into a fresh index/meta snapshot once it exceeds
+      VECTOR_LOG_COMPACT_BYTES. Startup loads the snapshot and replays the log.
+    - Snapshots are versioned directories committed by an atomic rename, with a manifest of
+      checksums, dimension and embedding version (VectorSnapshots, f"{VECTOR_INDEX_PATH}.snapshots").
+      Startup loads the newest intact one, so a damaged snapshot falls back to the previous
+      version instead of requiring a rebuild.
+    - enqueue_texts() acknowledges inserts immediately and indexes them in the background
+      (write-behind); search(read_your_writes=True) flushes pending inserts first.
+    - rebuild() builds a replacement index side-by-side (e.g. re-embedded from the database)
+      while the current one keeps serving, then catches up on concurrent changes and swaps it
+      in atomically. An unreadable snapshot or a changed embedding dimension is reported as
+      `rebuild_reason` instead of failing startup.
+    - Thread safety: writers (request threads, the write-behind flusher, migrations) are
+      serialized by `_write_lock`. The in-memory index, ID map and metadata are only mutated
+      or swapped under the exclusive side of `_rw`, which searches and lookups hold shared;
+      log appends and snapshot writes happen outside it, so reads never wait on disk I/O.
     """
-    def __init__(self, dim: Optional[int] = None, index_path: Optional[str] = None, meta_path: Optional[str] = None):
-        self.dim = dim or settings.EMBEDDING_DIM
+    def __init__(self, dim: Optional[int] = None, index_path: Optional[str] = None, meta_path: Optional[str] = None,
+                 index_type: Optional[str] = None, log_path: Optional[str] = None, first_id: int = 0):
+        # Follow the active embedding backend so ONNX models get correctly sized indexes
+        self.dim = dim or embedding_service.dim
         self.index_path = index_path or settings.VECTOR_INDEX_PATH
         self.meta_path = meta_path or settings.VECTOR_META_PATH
-        self._index = None  # type: Optional[faiss.IndexFlatIP]
-        self._meta: Dict[int, Dict[str, Any]] = {}
+        # Unversioned snapshot files written by earlier releases; loaded once, then replaced
+        # (index_path itself, meta_dir, ids_path, legacy_raw_path)
+        self.meta_dir = f"{self.meta_path}.cols"
+        self.ids_path = f"{self.index_path}.ids"
+        self.legacy_raw_path = f"{self.index_path}.f32"
+        self.snapshot_dir = f"{self.index_path}.snapshots"
+        # New full-precision vector files start here and are renamed per snapshot on commit
+        self.raw_path = os.path.join(self.snapshot_dir, "raw.f32")
+        self._snapshots = VectorSnapshots(self.snapshot_dir, keep=settings.VECTOR_SNAPSHOT_KEEP,
+                                          verify_checksums=settings.VECTOR_SNAPSHOT_VERIFY_CHECKSUMS,
+                                          fsync=settings.VECTOR_SNAPSHOT_FSYNC)
+        self.snapshot_version: Optional[int] = None
+        self.index_type = (index_type or settings.VECTOR_INDEX_TYPE).lower()
+        # Start of this store's ID range (shards of a ShardedVectorStore use disjoint ranges)
+        self.first_id = int(first_id)
+        self._index = None  # type: Optional[faiss.Index | SparseInvertedIndex]
+        # True while self._index is a read-only mmap view of the snapshot file
+        self._index_mapped = False
+        self._ids = VectorIdMap()
+        self._meta = VectorMetaStore()
+        # Full-precision rows for reranking; set exactly when the index is lossy
+        self._raw: Optional[RawVectors] = None
+        self._log = VectorLog(log_path or settings.VECTOR_LOG_PATH or f"{self.index_path}.log", fsync=settings.VECTOR_LOG_FSYNC)
+        self.compact_bytes = settings.VECTOR_LOG_COMPACT_BYTES
+        # Serializes writers (request threads and the write-behind flusher)
+        self._write_lock = threading.Lock()
+        # Shared for searches, exclusive while a writer changes the in-memory state
+        self._rw = _ReadWriteLock()
+        self._write_queue = _WriteBehindQueue(self.add_texts, settings.VECTOR_WRITE_BATCH_SIZE, settings.VECTOR_WRITE_FLUSH_MS,
+                                              settings.VECTOR_WRITE_ATTEMPTS, settings.VECTOR_WRITE_RETRY_MS,
+                                              remove=self.remove_ids)
+        self._migration: Optional[threading.Thread] = None
+        self.migrations_completed = 0
+        self.migration_failures = 0
+        self.migrations_aborted = 0
+        # monotonic time of the last failed migration; automatic retries wait VECTOR_MIGRATION_RETRY_SEC
+        self._migration_failed_at: Optional[float] = None
+        # message_id column values of vectors removed while a rebuild is running
+        self._rebuild_removed: Optional[List[np.ndarray]] = None
+        # Why the persisted index cannot serve searches and needs a rebuild (None when fine)
+        self.rebuild_reason: Optional[str] = None
+        # (query dim, index dim) pairs already reported by _search_vectors
+        self._dim_mismatches_logged: set = set()
         self._load()
+        self._maybe_migrate()
 
     @property
     def available(self) -> bool:
         return self._index is not None
 
-    def _create_index(self) -> faiss.IndexFlatIP:
-        index = faiss.IndexFlatIP(self.dim)
-        return index
+    def _create_index(self):
+        return self._create_index_for_dim(self.dim)
     
-    def _create_index_for_dim(self, dim: int) -> faiss.IndexFlatIP:
-        """Create a new index for a specific dimension."""
-        return faiss.IndexFlatIP(dim)
+    def _create_index_for_dim(self, dim: int):
+        """Create a new, empty index of the configured type for a specific dimension."""
+        kind = self._target_kind(0)
+        # Trained (IVF, quantized) indexes start out flat and are migrated once there is data
+        return ann_index.create_empty(kind if kind in ("sparse", "hnsw") else "flat", dim)
+
+    def _reset_index(self, dim: int) -> None:
+        # Vectors of another dimension are unusable; drop them together with their IDs and meta
+        self._index = self._create_index_for_dim(dim)
+        self._index_mapped = False
+        self._ids = VectorIdMap(next_id=self._ids.next_id)
+        self._meta = VectorMetaStore()
+        self._raw = None
+
+    def _target_kind(self, n: int) -> str:
+        """Index kind the store should use when holding `n` vectors."""
+        kind = self.index_type
+        if kind == "auto":
+            if n >= settings.VECTOR_AUTO_IVF_AT:
+                kind = "ivf"
+            elif n >= settings.VECTOR_AUTO_HNSW_AT:
+                kind = "hnsw"
+            else:
+                kind = "flat"
+            if settings.VECTOR_MEMORY_BUDGET_MB > 0:
+                dim = self._index.d if self._index is not None else self.dim
+                kind = ann_index.fit_memory_budget(kind, n, dim, settings.VECTOR_MEMORY_BUDGET_MB * 1024 * 1024)
+        if n < ann_index.min_train_size(kind, n):
+            return "flat"
+        if kind not in ann_index.DENSE_KINDS and kind != "sparse":
+            return "flat"
+        return kind
+
+    @property
+    def index_kind(self) -> str:
+        return ann_index.index_kind(self._index)
+
+    @property
+    def migrating(self) -> bool:
+        return self._migration is not None and self._migration.is_alive()
+
+    def _needs_purge(self) -> bool:
+        dead = self._ids.tombstones
+        return dead >= settings.VECTOR_TOMBSTONE_PURGE_MIN and dead >= settings.VECTOR_TOMBSTONE_PURGE_RATIO * max(self._ids.ntotal, 1)
+
+    def _maybe_migrate(self) -> None:
+        if self._index is None or self.migrating:
+            return
+        if self._migration_failed_at is not None and \
+                time.monotonic() - self._migration_failed_at < settings.VECTOR_MIGRATION_RETRY_SEC:
+            return
+        current = ann_index.index_kind(self._index)
+        if current == "sparse" or self.index_type == "sparse":
+            target = current
+        else:
+            target = self._target_kind(self._ids.live)
+        if target != current or self._needs_purge():
+            self.migrate(target, background=True)
+
+    def migrate(self, kind: Optional[str] = None, background: bool = False) -> None:
+        """
+        Rebuild the index as `kind` (default: the target for the current size) without
+        tombstoned vectors and swap it in.
+        """
+        kind = kind or self._target_kind(self._ids.live)
+        if background:
+            if self.migrating:
+                return
+            self._migration = threading.Thread(target=self._migrate, args=(kind,), name="vector-index-migrate", daemon=True)
+            self._migration.start()
+        else:
+            self._migrate(kind)
+
+    def _migrate(self, kind: str) -> None:
+        try:
+            with self._write_lock:
+                old, old_ids, old_meta, old_raw = self._index, self._ids, self._meta, self._raw
+                if old is None:
+                    return
+                snap_n = old.ntotal
+                live = old_ids.live_slots(0, snap_n)
+                vectors = self._exact_vectors(old, old_raw, live)
+                new_ids = VectorIdMap(old_ids.ids[live], next_id=old_ids.next_id)
+            # Training and bulk add run without the lock; searches and writes keep using `old`
+            new = ann_index.build(kind, vectors)
+            new_raw = RawVectors.create(self.raw_path, vectors) if kind in ann_index.LOSSY_KINDS else None
+            with self._write_lock:
+                current = self._index
+                if current is None or self._ids is not old_ids or self._meta is not old_meta or self._raw is not old_raw:
+                    # A rebuild or a dimension change replaced the contents; `new` is built from stale data
+                    self.migrations_aborted += 1
+                    logger.warning("Vector index migration to %s abandoned: the index was replaced while it was built", kind)
+                    return
+                # Replay removals and adds that happened while the new index was being built. Adds
+                # may have gone to a private copy of a mapped `old` (_writable_index), so read them
+                # from the current index, which has the same slots.
+                new_ids.remove(new_ids.ids[~old_ids.live_mask[live]])
+                tail = old_ids.live_slots(snap_n)
+                if tail.shape[0]:
+                    tail_vectors = self._exact_vectors(current, old_raw, tail)
+                    new.add(tail_vectors)
+                    new_ids.append(old_ids.ids[tail])
+                    if new_raw is not None:
+                        new_raw.append(tail_vectors)
+                new_ids.next_id = old_ids.next_id
+                new_meta = old_meta.take(np.concatenate([live, tail]))
+                with self._rw.write():
+                    self._index, self._ids, self._meta, self._raw = new, new_ids, new_meta, new_raw
+                    self._index_mapped = False
+                self.compact()
+                self.migrations_completed += 1
+                self._migration_failed_at = None
+        except Exception:
+            # Keep serving from the existing index; writes retry the migration after the back-off
+            self.migration_failures += 1
+            self._migration_failed_at = time.monotonic()
+            logger.exception("Vector index migration to %s failed; retrying in %.0fs at the earliest",
+                             kind, settings.VECTOR_MIGRATION_RETRY_SEC)
+
+    @staticmethod
+    def _exact_vectors(index, raw: Optional[RawVectors], slots: np.ndarray) -> np.ndarray:
+        """Vectors at `slots`, full precision when a lossy index has its raw copies."""
+        if raw is not None:
+            return raw.take(slots)
+        if not slots.shape[0]:
+            return np.zeros((0, index.d), dtype=np.float32)
+        start = int(slots.min())
+        return ann_index.reconstruct_all(index, start, int(slots.max()) + 1)[slots - start]
+
+    def _read_index(self, path: str):
+        self._index_mapped = False
+        if SparseInvertedIndex.is_sparse_file(path):
+            index = SparseInvertedIndex.read(path)
+        else:
+            index = self._read_faiss_index(path)
+        if (self.index_type == "sparse") != isinstance(index, SparseInvertedIndex):
+            # Configured type changed: rebuild from the stored vectors, keeping positional slots
+            converted = self._create_index_for_dim(index.d)
+            if index.ntotal:
+                converted.add(index.reconstruct_n(0, index.ntotal))
+            index = converted
+            self._index_mapped = False
+        ann_index.apply_search_params(index)
+        return index
+
+    def _read_faiss_index(self, path: str):
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if settings.VECTOR_INDEX_MMAP and mmap_flag is not None:
+            try:
+                index = faiss.read_index(path, mmap_flag | getattr(faiss, "IO_FLAG_READ_ONLY", 0))
+                self._index_mapped = True
+                return index
+            except Exception:
+                # Older FAISS or an index type without mmap support: read it into memory
+                pass
+        return faiss.read_index(path)
+
+    def _writable_index(self):
+        """
+        The mapped index is a view of the snapshot file and FAISS aborts the process on
+        resizing it, so it is copied into private memory before the first add. The copy has
+        the same contents, so it can be swapped in while searches still use the mapping.
+        """
+        if self._index_mapped and self._index is not None:
+            self._index = faiss.deserialize_index(faiss.serialize_index(self._index))
+            ann_index.apply_search_params(self._index)
+            self._index_mapped = False
+        return self._index
+
+    def _write_index(self, index, path: str) -> None:
+        if isinstance(index, SparseInvertedIndex):
+            index.write(path)
+        else:
+            faiss.write_index(index, path)
 
     def _load(self) -> None:
         # Ensure data directory exists
         os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
         os.makedirs(os.path.dirname(self.meta_path) or ".", exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        # Replacement vector files that were never committed belong to an interrupted migration
+        RawVectors.remove_uncommitted(self.raw_path)
+        RawVectors.remove_uncommitted(self.legacy_raw_path)
+        self._index = None
+        self._raw = None
+        self.snapshot_version = None
+        if self._snapshots.versions():
+            raw_path = self._load_snapshot()
+            if self._index is None:
+                # Every snapshot is damaged; start empty, the index can be rebuilt from the database
+                self.rebuild_reason = "unreadable"
+                self._index = self._create_index()
+                self._ids = VectorIdMap.positional(0)
+                self._ids.next_id = max(self._ids.next_id, self.first_id)
+                self._meta = VectorMetaStore()
+        else:
+            raw_path = self._load_legacy()
+        if self._index.ntotal and self._index.d != embedding_service.dim:
+            # Queries from the active embedding backend cannot be scored against these vectors
+            self.rebuild_reason = "dimension_changed"
+        if ann_index.index_kind(self._index) in ann_index.LOSSY_KINDS:
+            raw = RawVectors.open(raw_path, self._index.d) if raw_path else None
+            if raw is not None and raw.rows >= self._index.ntotal:
+                # Rows past the snapshot come back with the log replay
+                if raw.rows > self._index.ntotal:
+                    raw.truncate(self._index.ntotal)
+                self._raw = raw
+            else:
+                logger.warning("Full-precision vectors for %s are missing; searches are not reranked", self.index_path)
+        self._replay_log()
+
+    @property
+    def snapshot_path(self) -> Optional[str]:
+        """Directory of the snapshot the store was last loaded from or saved to."""
+        return self._snapshots.path(self.snapshot_version) if self.snapshot_version else None
+
+    def _load_snapshot(self) -> Optional[str]:
+        """Load the newest intact snapshot; returns the path of its full-precision vector file, if any."""
+        newest = self._snapshots.versions()[-1]
+        for version, path, manifest in self._snapshots.candidates():
+            try:
+                index = self._read_index(os.path.join(path, "index"))
+                ids = VectorIdMap.read(os.path.join(path, "ids"))
+                meta = VectorMetaStore.read(os.path.join(path, "meta"))
+                if ids is None or meta is None or not index.ntotal == ids.ntotal == meta.ntotal:
+                    raise ValueError("index, IDs and metadata disagree on the vector count")
+            except Exception as e:
+                logger.warning("Vector snapshot %s is unreadable (%s); skipping it", path, e)
+                continue
+            if version != newest:
+                # The log only holds changes since the newest snapshot; later ones are lost here
+                logger.warning("Loaded vector snapshot %s because newer ones are damaged; vectors indexed "
+                               "between it and the newest snapshot are missing", path)
+                # Never hand out IDs again that the damaged snapshots already used
+                for later in range(version + 1, newest + 1):
+                    ids.next_id = max(ids.next_id, int((self._snapshots.read_manifest(later) or {}).get("next_id", 0)))
+            self._index, self._ids, self._meta = index, ids, meta
+            self.snapshot_version = version
+            embedding_version = (manifest.get("embedding") or {}).get("version")
+            if index.ntotal and embedding_version not in (None, embedding_service.version):
+                # Same dimension, different vector space: scores against new queries are meaningless
+                self.rebuild_reason = "embedding_changed"
+            raw_files = manifest.get("extra_files") or []
+            return os.path.join(self.snapshot_dir, raw_files[0]) if raw_files else None
+        return None
+
+    def _load_legacy(self) -> Optional[str]:
         # Load index if exists
         if os.path.exists(self.index_path):
-            self._index = faiss.read_index(self.index_path)
-        else:
+            try:
+                self._index = self._read_index(self.index_path)
+            except Exception as e:
+                # Start empty rather than failing startup; the index can be rebuilt from the database
+                logger.warning("Vector index %s is unreadable (%s); starting empty", self.index_path, e)
+                self.rebuild_reason = "unreadable"
+        if self._index is None:
             self._index = self._create_index()
+        ids = VectorIdMap.read(self.ids_path)
+        if ids is None or ids.ntotal != self._index.ntotal:
+            # Stores written before stable IDs used the index position as the ID
+            ids = VectorIdMap.positional(self._index.ntotal)
+            ids.next_id = max(ids.next_id, self.first_id)
+        self._ids = ids
         # Load meta if exists
-        if os.path.exists(self.meta_path):
+        meta = None
+        try:
+            meta = VectorMetaStore.read(self.meta_dir)
+        except Exception:
+            meta = None
+        if meta is None or meta.ntotal != ids.ntotal:
+            meta = self._read_legacy_meta(ids)
+        self._meta = meta
+        return self.legacy_raw_path
+
+    def _read_legacy_meta(self, ids: VectorIdMap) -> VectorMetaStore:
+        # Earlier versions kept metadata as one JSON dict (vector_id -> meta) at meta_path
+        legacy: Dict[int, Dict[str, Any]] = {}
+        if os.path.isfile(self.meta_path):
             try:
                 with open(self.meta_path, "r", encoding="utf-8") as f:
-                    meta_loaded = json.load(f)
                     # keys are stored as strings in JSON
-                    self._meta = {int(k): v for k, v in meta_loaded.items()}
+                    legacy = {int(k): v for k, v in json.load(f).items()}
             except Exception:
-                self._meta = {}
+                legacy = {}
+        meta = VectorMetaStore()
+        meta.append(ids.ids.tolist(), [legacy.get(int(i)) for i in ids.ids.tolist()])
+        return meta
+
+    def _replay_log(self) -> None:
+        for rec in self._log.replay():
+            if not rec.ids.shape[0]:
+                continue
+            if rec.kind == KIND_REMOVE:
+                self._apply_remove(rec.ids)
+                continue
+            if rec.kind != KIND_ADD:
+                continue
+            if self._index is None or self._index.d != rec.vectors.shape[1]:
+                self._reset_index(rec.vectors.shape[1])
+            # IDs are monotonic: anything below next_id is already in the snapshot (crash
+            # before the log was reset) or was replayed from an earlier record
+            fresh = rec.ids >= self._ids.next_id
+            if fresh.any():
+                if self._raw is not None:
+                    self._raw.append(rec.vectors[fresh])
+                self._writable_index().add(np.ascontiguousarray(rec.vectors[fresh], dtype=np.float32))
+                self._ids.append(rec.ids[fresh])
+                self._meta.append(rec.ids[fresh].tolist(), [m for m, f in zip(rec.metas, fresh) if f])
+
+    def _write_snapshot(self) -> None:
+        """Write the current state as a new snapshot version and drop superseded ones (callers hold `_write_lock`)."""
+        index, ids, meta, raw = self._index, self._ids, self._meta, self._raw
+        version = self._snapshots.next_version()
+        tmp = self._snapshots.begin(version)
+        try:
+            self._write_index(index, os.path.join(tmp, "index"))
+            ids.write(os.path.join(tmp, "ids"))
+            meta.write(os.path.join(tmp, "meta"))
+            extra_files = []
+            if raw is not None:
+                # Vector files are append-only, so older snapshots share them until a migration
+                # writes a new one; give each its own name so those snapshots keep theirs
+                if not raw.committed or os.path.dirname(raw.path) != self.snapshot_dir:
+                    with self._rw.write():
+                        raw.commit(os.path.join(self.snapshot_dir, f"raw-{version:08d}.f32"))
+                if self._snapshots.fsync:
+                    fsync_path(raw.path)
+                extra_files.append(os.path.basename(raw.path))
+            self._snapshots.commit(tmp, version, {
+                "index_type": ann_index.index_kind(index),
+                "dim": int(index.d),
+                "ntotal": int(index.ntotal),
+                "live": ids.live,
+                "next_id": int(ids.next_id),
+                "embedding": {
+                    "backend": embedding_service.backend_name,
+                    "version": embedding_service.version,
+                    "dim": embedding_service.dim,
+                },
+                "extra_files": extra_files,
+            })
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.snapshot_version = version
+        self._snapshots.prune(extra_files)
+        self._remove_legacy_snapshot()
+
+    def _remove_legacy_snapshot(self) -> None:
+        for path in (self.index_path, self.ids_path, self.legacy_raw_path):
+            if os.path.isfile(path):
+                os.remove(path)
+        shutil.rmtree(self.meta_dir, ignore_errors=True)
+
+    def compact(self) -> None:
+        """Fold the log into a full snapshot and reset it."""
+        self._write_snapshot()
+        self._log.truncate()
+
+    def compact_if_dirty(self) -> bool:
+        """Compact only when the log holds records not yet in the snapshot."""
+        with self._write_lock:
+            if self._log.size_bytes == 0:
+                return False
+            self.compact()
+            return True
+
+    def _maybe_compact(self) -> None:
+        if self.compact_bytes > 0 and self._log.size_bytes >= self.compact_bytes:
+            self.compact()
+
+    def enqueue_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Queue texts for background embedding and indexing; returns immediately."""
+        assert len(texts) == len(metadatas)
+        if texts:
+            self._write_queue.put(list(texts), list(metadatas))
+
+    @property
+    def pending_writes(self) -> int:
+        return self._write_queue.pending
 
-    def _persist(self) -> None:
-        if self._index is not None:
-            faiss.write_index(self._index, self.index_path)
-        with open(self.meta_path, "w", encoding="utf-8") as f:
-            json.dump({str(k): v for k, v in self._meta.items()}, f)
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued inserts to be indexed."""
+        return self._write_queue.flush(timeout)
 
     def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> List[int]:
         assert len(texts) == len(metadatas)
         if not texts:
             return []
         vecs = embedding_service.embed_texts(texts)  # shape (n, dim)
-        
+        return self.add_vectors(vecs, metadatas)
+
+    def add_vectors(self, vecs: np.ndarray, metadatas: List[Dict[str, Any]]) -> List[int]:
+        """Index already-embedded vectors; returns their stable IDs."""
+        assert vecs.shape[0] == len(metadatas)
+        if not len(metadatas):
+            return []
+        with self._write_lock:
+            return self._add_vectors(np.ascontiguousarray(vecs, dtype=np.float32), metadatas)
+
+    def _add_vectors(self, vecs: np.ndarray, metadatas: List[Dict[str, Any]]) -> List[int]:
         # Ensure index is created if needed and matches the embedding dimension
-        if self._index is None or self._index.d != vecs.shape[1]:
-            self._index = self._create_index_for_dim(vecs.shape[1])
-        
-        # FAISS IndexFlatIP expects float32 and works best with normalized vectors
-        ids_start = self._index.ntotal if self._index is not None else 0
-        self._index.add(vecs)
-        assigned_ids = list(range(ids_start, ids_start + len(texts)))
-        for idx, meta in zip(assigned_ids, metadatas):
-            self._meta[idx] = meta
-        self._persist()
+        recreated = self._index is None or self._index.d != vecs.shape[1]
+        if not recreated:
+            self._writable_index()
+            if self._raw is not None:
+                # Rows past index.ntotal are invisible to searches until the index add below
+                self._raw.append(vecs)
+        with self._rw.write():
+            if recreated:
+                self._reset_index(vecs.shape[1])
+            # FAISS IndexFlatIP expects float32 and works best with normalized vectors
+            new_ids = self._ids.allocate(vecs.shape[0])
+            self._index.add(vecs)
+            self._ids.append(new_ids)
+            assigned_ids = new_ids.tolist()
+            self._meta.append(assigned_ids, metadatas)
+        if recreated:
+            # Old log records belong to the replaced index; start over from a snapshot
+            self.compact()
+        else:
+            self._log.append_add(assigned_ids, vecs, metadatas)
+            self._maybe_compact()
+        self._maybe_migrate()
         return assigned_ids
 
-    def search(self, query: str, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
-        if not query or self._index is None or self._index.ntotal == 0:
+    def _apply_remove(self, ids) -> List[int]:
+        if self._rebuild_removed is not None:
+            self._rebuild_removed.append(self._meta.col("message_id")[self._ids.slots_for_ids(ids)].copy())
+        removed = self._ids.remove(ids).tolist()
+        self._meta.drop(removed)
+        return removed
+
+    def remove_ids(self, ids: List[int]) -> int:
+        """Remove vectors by stable ID; returns how many were present."""
+        if not len(ids):
+            return 0
+        with self._write_lock:
+            with self._rw.write():
+                removed = self._apply_remove(ids)
+            if removed:
+                self._log.append_remove(removed)
+                self._maybe_compact()
+                self._maybe_migrate()
+        return len(removed)
+
+    def get_meta(self, vector_id: int) -> Optional[Dict[str, Any]]:
+        """Metadata for a live vector ID."""
+        with self._rw.read():
+            return self._meta.get(self._ids.slot_for_id(vector_id), vector_id)
+
+    def ids_where(self, field: str, values: List[Any]) -> List[int]:
+        """Stable IDs of live vectors whose metadata `field` is one of `values`."""
+        if not values:
             return []
-        qvec = embedding_service.embed_texts([query])  # (1, dim)
-        scores, indices = self._index.search(qvec, min(k, self._index.ntotal))  # scores inner product
-        result: List[Tuple[float, Dict[str, Any]]] = []
-        for score, idx in zip(scores[0], indices[0]):
-            if idx == -1:
-                continue
-            meta = self._meta.get(int(idx))
-            if meta is not None:
-                result.append((float(score), meta))
-        return result
+        with self._rw.read():
+            ids, meta = self._ids, self._meta
+            mask = meta.match(field, list(values), ids.ids) & ids.live_mask
+            return ids.ids[mask].tolist()
+
+    def remove_where(self, field: str, values: List[Any]) -> int:
+        """Remove every vector whose metadata `field` is one of `values` (e.g. message_id, conversation_id)."""
+        if not values:
+            return 0
+        # Inserts still queued for these rows would otherwise outlive the delete
+        self._write_queue.discard(meta_matcher(field, values))
+        return self.remove_ids(self.ids_where(field, values))
+
+    def drop_older_than(self, cutoff: datetime) -> int:
+        """Remove every vector whose metadata timestamp is before `cutoff`."""
+        self._write_queue.discard(older_than(cutoff))
+        with self._rw.read():
+            ids, meta = self._ids, self._meta
+            stamps = meta.col("timestamp")
+            old = ids.ids[(stamps != NO_TIMESTAMP) & (stamps < to_epoch_us(cutoff)) & ids.live_mask].tolist()
+        return self.remove_ids(old)
+
+    def rebuild(self, batches: Iterable[Tuple[np.ndarray, List[Dict[str, Any]]]],
+                catch_up: Callable[[List[Dict[str, Any]]], Tuple[np.ndarray, List[Dict[str, Any]]]]) -> int:
+        """
+        Replace the index with one built from `batches` of (vectors, metadatas), e.g. every
+        message re-embedded from the database. The current index keeps serving reads and
+        writes until the swap; see finish_rebuild() for how concurrent changes are carried
+        over. Returns the number of live vectors after the swap.
+        """
+        rebuild = self.begin_rebuild()
+        try:
+            for vecs, metadatas in batches:
+                self.rebuild_add(rebuild, vecs, metadatas)
+        except BaseException:
+            self.abort_rebuild()
+            raise
+        return self.finish_rebuild(rebuild, catch_up)
+
+    def begin_rebuild(self, since_id: Optional[int] = None) -> _Rebuild:
+        """
+        Start a side-by-side rebuild. Removals are recorded from now on; live vectors with
+        IDs >= `since_id` (default: the next ID to be assigned) count as added during it.
+        """
+        with self._write_lock:
+            self._rebuild_removed = []
+            return _Rebuild(self._ids.next_id if since_id is None else since_id)
+
+    def rebuild_add(self, rebuild: _Rebuild, vecs: np.ndarray, metadatas: List[Dict[str, Any]]) -> None:
+        assert vecs.shape[0] == len(metadatas)
+        if not len(metadatas):
+            return
+        # IDs come from the live counter, so they stay unique across the swap
+        with self._write_lock:
+            ids = self._ids.allocate(len(metadatas))
+        rebuild.add(self._create_index_for_dim, ids, vecs, metadatas)
+
+    def abort_rebuild(self) -> None:
+        with self._write_lock:
+            self._rebuild_removed = None
+
+    def finish_rebuild(self, rebuild: _Rebuild,
+                       catch_up: Callable[[List[Dict[str, Any]]], Tuple[np.ndarray, List[Dict[str, Any]]]]) -> int:
+        """
+        Swap in `rebuild`. Under the write lock, vectors removed since begin_rebuild() are
+        removed from it by message_id, and the metadata of live vectors added since (that it
+        does not already hold) is passed to `catch_up`, which returns freshly embedded
+        (vectors, metadatas) for them. The new state is then published in one swap and
+        snapshotted.
+        """
+        self.flush(timeout=settings.VECTOR_READ_YOUR_WRITES_TIMEOUT_SEC)
+        with self._write_lock:
+            removed = self._rebuild_removed or []
+            self._rebuild_removed = None
+            known = rebuild.meta.col("message_id")
+            if removed:
+                gone = np.concatenate(removed)
+                gone = gone[gone != _NIL_UUID]
+                if gone.shape[0]:
+                    rebuild.ids.remove(rebuild.ids.ids[np.isin(known, gone)])
+            start = int(np.searchsorted(self._ids.ids, rebuild.since_id))
+            tail = self._ids.live_slots(start)
+            tail_mids = self._meta.col("message_id")[tail]
+            tail = tail[(tail_mids == _NIL_UUID) | ~np.isin(tail_mids, known[rebuild.ids.live_mask])]
+            metas = [m for m in (self._meta.get(int(s), int(self._ids.ids[s])) for s in tail) if m is not None]
+            if metas:
+                vecs, metas = catch_up(metas)
+                if len(metas):
+                    rebuild.add(self._create_index_for_dim, self._ids.allocate(len(metas)), vecs, metas)
+            if rebuild.index is None:
+                rebuild.index = self._create_index_for_dim(embedding_service.dim)
+            rebuild.ids.next_id = self._ids.next_id
+            with self._rw.write():
+                self._index, self._ids, self._meta = rebuild.index, rebuild.ids, rebuild.meta
+                self._index_mapped = False
+                self._raw = None
+                self.dim = int(rebuild.index.d)
+                self.rebuild_reason = None
+            self.compact()
+            self._maybe_migrate()
+            return self._ids.live
+
+    def recall_check(self, n_queries: int = 100, k: int = 10) -> Dict[str, Any]:
+        """
+        Recall@k of the live index against an exact flat scan of its own vectors (the
+        full-precision copies for lossy indexes), with the memory it takes. For lossy
+        indexes `recall_reranked` is the recall searches actually get after reranking.
+        """
+        with self._rw.read():
+            index, raw = self._index, self._raw
+            if index is None:
+                return {"index_type": None, "ntotal": 0, "k": k, "recall": 1.0}
+            if raw is not None:
+                vectors = raw.take(np.arange(index.ntotal))
+            else:
+                vectors = ann_index.reconstruct_all(index)
+            kind = ann_index.index_kind(index)
+            report = {
+                "index_type": kind,
+                "ntotal": int(vectors.shape[0]),
+                "k": k,
+                "recall": ann_index.recall_at_k(index, vectors, n_queries=n_queries, k=k),
+                "bytes_per_vector": ann_index.bytes_per_vector(kind, index.d),
+                "index_bytes": ann_index.index_bytes(index),
+            }
+            if raw is not None and settings.VECTOR_RERANK_FACTOR > 0:
+                def reranked(queries: np.ndarray, k: int) -> np.ndarray:
+                    fetch = min(k * settings.VECTOR_RERANK_FACTOR, index.ntotal)
+                    scores, slots = index.search(queries, fetch)
+                    return self._rerank(raw, queries, scores, slots)[1][:, :k]
+
+                report["recall_reranked"] = ann_index.recall_at_k(index, vectors, n_queries=n_queries, k=k, search=reranked)
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        with self._rw.read():
+            index, ids = self._index, self._ids
+            return {
+                "configured_type": self.index_type,
+                "index_type": ann_index.index_kind(index) if index is not None else None,
+                "ntotal": int(index.ntotal) if index is not None else 0,
+                "live": ids.live,
+                "tombstones": ids.tombstones,
+                "dim": int(index.d) if index is not None else self.dim,
+                "index_bytes": ann_index.index_bytes(index) if index is not None else 0,
+                "rerank": self._raw is not None and settings.VECTOR_RERANK_FACTOR > 0,
+                "migrating": self.migrating,
+                "migration_failures": self.migration_failures,
+                "migrations_aborted": self.migrations_aborted,
+                "mmap": self._index_mapped,
+                "pending_writes": self.pending_writes,
+                "write_errors": self._write_queue.errors,
+                "write_dropped": self._write_queue.dropped,
+                "log_bytes": self._log.size_bytes,
+                "rebuild_reason": self.rebuild_reason,
+                "snapshot_version": self.snapshot_version,
+            }
+
+    def search(self, query: str, k: int = 5, read_your_writes: bool = False,
+               filters: Optional[VectorFilter] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Top-k (score, meta) for `query`; `filters` restricts candidates by metadata before
+        ranking, so a narrow filter still returns up to k matches.
+        """
+        return self.search_batch([query], k=k, read_your_writes=read_your_writes, filters=filters)[0]
+
+    def search_batch(self, queries: List[str], k: int = 5, read_your_writes: bool = False,
+                     filters: Optional[VectorFilter] = None) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """
+        search() for many queries at once: one embedding matrix and one index search for the
+        whole batch. Returns one result list per query, in order (empty queries get []).
+        """
+        if read_your_writes:
+            self.flush(timeout=settings.VECTOR_READ_YOUR_WRITES_TIMEOUT_SEC)
+        results: List[List[Tuple[float, Dict[str, Any]]]] = [[] for _ in queries]
+        rows = [i for i, q in enumerate(queries) if q]
+        if not rows or self._index is None or self._ids.live == 0:
+            return results
+        qvecs = embedding_service.embed_texts([queries[i] for i in rows])  # (nq, dim)
+        for row, hits in zip(rows, self.search_vectors(qvecs, k=k, filters=filters)):
+            results[row] = hits
+        return results
+
+    def search_vectors(self, qvecs: np.ndarray, k: int = 5,
+                       filters: Optional[VectorFilter] = None) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """Top-k (score, meta) per row of an already-embedded query matrix."""
+        with self._rw.read():
+            return self._search_vectors(qvecs, k, filters)
+
+    def _search_vectors(self, qvecs: np.ndarray, k: int,
+                        filters: Optional[VectorFilter]) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        results: List[List[Tuple[float, Dict[str, Any]]]] = [[] for _ in range(qvecs.shape[0])]
+        index, ids, meta, raw = self._index, self._ids, self._meta, self._raw
+        if k <= 0 or index is None or index.ntotal == 0 or ids.live == 0 or not qvecs.shape[0]:
+            return results
+        if qvecs.shape[1] != index.d:
+            # Index was built by a different embedding backend; it must be rebuilt before use
+            mismatch = (int(qvecs.shape[1]), int(index.d))
+            if mismatch not in self._dim_mismatches_logged:
+                self._dim_mismatches_logged.add(mismatch)
+                logger.warning("Vector index %s has dimension %d but queries have %d; searches return nothing "
+                               "until it is rebuilt for the current embedding backend", self.index_path, mismatch[1], mismatch[0])
+            return results
+        rerank = raw is not None and settings.VECTOR_RERANK_FACTOR > 0
+        # Lossy indexes only shortlist candidates; exact scores from the raw rows pick the top k
+        shortlist = k * settings.VECTOR_RERANK_FACTOR if rerank else k
+        if filters is not None and not filters.is_empty:
+            # Pre-filter: matching live slots only, so no over-fetching or post-filtering
+            allowed = meta.mask(filters) & ids.live_mask
+            scores, slots = ann_index.search_filtered(index, qvecs, min(shortlist, index.ntotal), allowed)
+        else:
+            # Tombstoned slots still occupy result positions; widen the search until every
+            # query has k live hits
+            fetch = min(shortlist + min(ids.tombstones, shortlist), index.ntotal)
+            while True:
+                scores, slots = index.search(qvecs, fetch)  # scores inner product
+                hit_ids = ids.ids_for_slots(slots)
+                if fetch >= index.ntotal or int(np.count_nonzero(hit_ids >= 0, axis=1).min()) >= k:
+                    break
+                fetch = min(fetch * 4, index.ntotal)
+        if rerank:
+            scores, slots = self._rerank(raw, qvecs, scores, slots)
+        hit_ids = ids.ids_for_slots(slots)
+        for result, q_scores, q_slots, q_ids in zip(results, scores, slots, hit_ids):
+            for score, slot, idx in zip(q_scores, q_slots, q_ids):
+                if idx == TOMBSTONE:
+                    continue
+                # Search hands back slots, so metadata is a direct column read
+                item = meta.get(int(slot), int(idx))
+                if item is not None:
+                    result.append((float(score), item))
+                if len(result) >= k:
+                    break
+        return results
+
+    @staticmethod
+    def _rerank(raw: RawVectors, qvecs: np.ndarray, scores: np.ndarray,
+                slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Rescore candidate slots with their full-precision vectors and reorder each row."""
+        valid = slots >= 0
+        if not valid.any():
+            return scores, slots
+        unique, inverse = np.unique(slots[valid], return_inverse=True)
+        vectors = raw.take(unique)
+        exact = np.full(slots.shape, -np.inf, dtype=np.float32)
+        rows = np.nonzero(valid)[0]
+        exact[valid] = np.einsum("ij,ij->i", qvecs[rows], vectors[inverse])
+        order = np.argsort(-exact, axis=1, kind="stable")
+        return np.take_along_axis(exact, order, axis=1), np.take_along_axis(slots, order, axis=1)
+
+
+def create_vector_store():
+    """VectorStore, or a month-sharded store when VECTOR_SHARD_BY is "month"."""
+    if (settings.VECTOR_SHARD_BY or "none").lower() == "month":
+        from app.services.vector_shards import ShardedVectorStore
+        return ShardedVectorStore()
+    return VectorStore()
 
 
 # Global instance
-vector_store = VectorStore()
\ No newline at end of file
+vector_store = create_vector_store()
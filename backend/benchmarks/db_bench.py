@@ -0,0 +1,216 @@
+"""
+SQLite write/read benchmark: SQLite's defaults versus the tuned profile from settings.
+
+Each profile gets a fresh database preloaded with --preload messages. The benchmark then measures:
+  - write: --writers threads each adding --writes messages through MemoryDatabase.add_message
+    (message + FTS row + conversation touch, one transaction each)
+  - mixed: the same writers running for --seconds next to --readers threads doing conversation
+    reads, ID lookups, listing pages and lexical searches
+It reports ops/sec, p50/p99 latency per operation and "database is locked" errors, plus
+tuned/baseline ratios. The baseline profile is SQLite's defaults (rollback journal,
+synchronous=FULL, ~2 MB cache, no mmap). Both profiles run without SQL echo; before this
+change echo also logged every statement.
+
+Usage (from backend/):
+  python -m benchmarks.db_bench --preload 20000 --writers 4 --readers 4 --seconds 5
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.database import MemoryDatabase
+from benchmarks.embedding_bench import make_corpus
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "baseline": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_CACHE_SIZE_MB": 2,
+        "SQLITE_MMAP_SIZE_MB": 0,
+    },
+    # Whatever the SQLITE_* / DATABASE_* settings currently are
+    "tuned": {},
+}
+
+
+@contextmanager
+def patched(overrides: Dict[str, Any]):
+    saved = {name: getattr(settings, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+class _Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def timed(self, op: str, fn: Callable[[], Any]) -> None:
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            with self._lock:
+                key = f"{op}: {'locked' if 'locked' in str(e) else type(e).__name__}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+            return
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.latencies.setdefault(op, []).append(elapsed)
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        ops = {}
+        for op, samples in sorted(self.latencies.items()):
+            ops[op] = {
+                "count": len(samples),
+                "per_sec": round(len(samples) / seconds, 1),
+                "p50_ms": round(float(np.percentile(samples, 50)) * 1000.0, 3),
+                "p99_ms": round(float(np.percentile(samples, 99)) * 1000.0, 3),
+            }
+        return {"seconds": round(seconds, 3), "ops": ops, "errors": self.errors}
+
+
+def _run_threads(targets: List[Callable[[], None]]) -> float:
+    threads = [threading.Thread(target=t) for t in targets]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - t0
+
+
+def bench_profile(name: str, workdir: str, preload: int, conversations: int, writers: int, writes: int,
+                  readers: int, seconds: float) -> Dict[str, Any]:
+    path = os.path.join(workdir, f"{name}.db")
+    with patched({**PROFILES[name], "DATABASE_URL": f"sqlite:///{path}"}):
+        db = MemoryDatabase()
+        with db.engine.connect() as conn:
+            journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        convo_ids = [db.create_conversation(f"conversation {i}").id for i in range(conversations)]
+        texts = make_corpus(preload + writers * writes, words_per_doc=20)
+        rng = random.Random(0)
+        t0 = time.perf_counter()
+        bulk = db.bulk_import()
+        records = [("message", {"conversation_id": rng.choice(convo_ids), "role": "user", "content": texts[i]})
+                   for i in range(preload)]
+        for i in range(0, len(records), bulk.chunk_size):
+            bulk.add(records[i:i + bulk.chunk_size])
+        bulk.close()
+        preload_sec = time.perf_counter() - t0
+        with db.engine.connect() as conn:
+            message_ids = [r[0] for r in conn.exec_driver_sql("SELECT id FROM message")]
+        words = [t.split()[0] for t in texts[:200]]
+
+        # Writers only
+        rec = _Recorder()
+
+        def writer(w: int) -> Callable[[], None]:
+            def run() -> None:
+                r = random.Random(w)
+                for j in range(writes):
+                    text = texts[preload + w * writes + j]
+                    rec.timed("add_message", lambda: db.add_message(r.choice(convo_ids), "user", text))
+            return run
+
+        write_sec = _run_threads([writer(w) for w in range(writers)])
+        write_report = rec.report(write_sec)
+
+        # Writers and readers together, for a fixed time
+        rec = _Recorder()
+        stop = time.perf_counter() + seconds
+
+        def mixed_writer(w: int) -> Callable[[], None]:
+            def run() -> None:
+                r = random.Random(100 + w)
+                while time.perf_counter() < stop:
+                    rec.timed("add_message", lambda: db.add_message(r.choice(convo_ids), "user", r.choice(texts)))
+            return run
+
+        def reader(i: int) -> Callable[[], None]:
+            def run() -> None:
+                r = random.Random(1000 + i)
+                ops = [
+                    ("get_messages", lambda: db.get_messages(r.choice(convo_ids))),
+                    ("get_messages_by_ids", lambda: db.get_messages_by_ids(r.sample(message_ids, 10))),
+                    ("list_conversations", lambda: db.list_conversations(20, include_messages=False)),
+                    ("search_lexical", lambda: db.search_lexical(r.choice(words), k=10)),
+                ]
+                while time.perf_counter() < stop:
+                    op, fn = r.choice(ops)
+                    rec.timed(op, fn)
+            return run
+
+        mixed_sec = _run_threads([mixed_writer(w) for w in range(writers)] + [reader(i) for i in range(readers)])
+        mixed_report = rec.report(mixed_sec)
+        db.engine.dispose()
+    return {
+        "journal_mode": journal,
+        "settings": {k: getattr(settings, k) for k in ("SQLITE_SYNCHRONOUS", "SQLITE_CACHE_SIZE_MB",
+                                                        "SQLITE_MMAP_SIZE_MB", "SQLITE_BUSY_TIMEOUT_MS",
+                                                        "DATABASE_POOL_SIZE")} | PROFILES[name],
+        "preload_sec": round(preload_sec, 3),
+        "write": write_report,
+        "mixed": mixed_report,
+    }
+
+
+def _ratio(tuned: Dict[str, Any], base: Dict[str, Any], phase: str, op: str) -> Any:
+    try:
+        return round(tuned[phase]["ops"][op]["per_sec"] / base[phase]["ops"][op]["per_sec"], 2)
+    except (KeyError, ZeroDivisionError):
+        return None
+
+
+def run(preload: int, conversations: int, writers: int, writes: int, readers: int, seconds: float,
+        profiles: List[str]) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "params": {"preload": preload, "conversations": conversations, "writers": writers, "writes": writes,
+                   "readers": readers, "seconds": seconds, "encrypt_at_rest": settings.PRIVACY_ENCRYPT_AT_REST},
+        "profiles": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in profiles:
+            report["profiles"][name] = bench_profile(name, tmp, preload, conversations, writers, writes, readers, seconds)
+    if {"baseline", "tuned"} <= set(report["profiles"]):
+        tuned, base = report["profiles"]["tuned"], report["profiles"]["baseline"]
+        report["speedup"] = {
+            "write_add_message": _ratio(tuned, base, "write", "add_message"),
+            **{f"mixed_{op}": _ratio(tuned, base, "mixed", op) for op in sorted(tuned["mixed"]["ops"])},
+        }
+    return report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="SQLite write/read benchmark: default vs tuned pragmas")
+    ap.add_argument("--preload", type=int, default=20000, help="messages in the database before measuring")
+    ap.add_argument("--conversations", type=int, default=200)
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--writes", type=int, default=250, help="add_message calls per writer in the write phase")
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--seconds", type=float, default=5.0, help="duration of the mixed phase")
+    ap.add_argument("--profiles", default="baseline,tuned")
+    args = ap.parse_args()
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    print(json.dumps(run(args.preload, args.conversations, args.writers, args.writes, args.readers,
+                         args.seconds, profiles), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compares faiss.IndexFlatIP with SparseInvertedIndex on hashed embeddings.
+
+Reports memory footprint, add time and per-query latency for both index types.
+
+Usage (from backend/):
+  python -m benchmarks.sparse_index_bench --docs 200000 --queries 200
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+
+import faiss
+
+from app.services.embedding_service import EmbeddingService
+from app.services.sparse_index import SparseInvertedIndex
+from benchmarks.embedding_bench import make_corpus
+
+
+def run(docs: int, queries: int, dim: int, k: int, batch: int) -> dict:
+    svc = EmbeddingService(dim=dim, cache_size=0, cache_path="")
+    corpus = make_corpus(docs, words_per_doc=20)
+    qtexts = make_corpus(queries, words_per_doc=4, seed=1)
+    qvecs = svc.embed_texts(qtexts)
+
+    flat = faiss.IndexFlatIP(dim)
+    sparse = SparseInvertedIndex(dim)
+    flat_add = sparse_add = 0.0
+    for i in range(0, docs, batch):
+        vecs = svc.embed_texts(corpus[i:i + batch])
+        t0 = time.perf_counter()
+        flat.add(vecs)
+        flat_add += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        sparse.add(vecs)
+        sparse_add += time.perf_counter() - t0
+
+    def per_query_ms(index) -> float:
+        index.search(qvecs[:1], k)  # warm-up (merges sparse posting chunks)
+        t0 = time.perf_counter()
+        for i in range(queries):
+            index.search(qvecs[i:i + 1], k)
+        return (time.perf_counter() - t0) * 1000.0 / queries
+
+    return {
+        "docs": docs,
+        "dim": dim,
+        "nnz_per_doc": round(sparse.nnz / max(1, docs), 1),
+        "flat": {"memory_bytes": docs * dim * 4, "add_sec": round(flat_add, 3), "query_ms": round(per_query_ms(flat), 3)},
+        "sparse": {"memory_bytes": sparse.memory_bytes(), "add_sec": round(sparse_add, 3), "query_ms": round(per_query_ms(sparse), 3)},
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Flat vs sparse index benchmark")
+    ap.add_argument("--docs", type=int, default=100000)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--batch", type=int, default=5000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.docs, args.queries, args.dim, args.k, args.batch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Recall versus memory of the compressed vector index types on hashed embeddings.
+
+For each kind reports index size, projected size at --project vectors, recall@k of the
+compressed scores alone and after exact reranking from full-precision vectors on disk,
+and per-query latency of the reranked search.
+
+Usage (from backend/):
+  python -m benchmarks.vector_compression_bench --docs 50000 --kinds flat,fp16,sq8,pq,opq
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.services import ann_index
+from app.services.embedding_service import EmbeddingService
+from app.services.vector_raw import RawVectors
+from app.services.vector_store import VectorStore
+from benchmarks.embedding_bench import make_corpus
+
+
+def run(docs: int, queries: int, dim: int, k: int, kinds: list, rerank_factor: int, project: int) -> dict:
+    svc = EmbeddingService(dim=dim, cache_size=0, cache_path="")
+    vectors = svc.embed_texts(make_corpus(docs, words_per_doc=20))
+    qvecs = svc.embed_texts(make_corpus(queries, words_per_doc=4, seed=1))
+    report = {"docs": docs, "dim": dim, "k": k, "rerank_factor": rerank_factor, "kinds": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = RawVectors.create(os.path.join(tmp, "bench.f32"), vectors)
+        for kind in kinds:
+            t0 = time.perf_counter()
+            index = ann_index.build(kind, vectors)
+            build_sec = time.perf_counter() - t0
+            fetch = min(k * rerank_factor, index.ntotal)
+
+            def reranked(q: np.ndarray, k: int) -> np.ndarray:
+                scores, slots = index.search(q, fetch)
+                return VectorStore._rerank(raw, q, scores, slots)[1][:, :k]
+
+            t0 = time.perf_counter()
+            for i in range(queries):
+                reranked(qvecs[i:i + 1], k)
+            query_ms = (time.perf_counter() - t0) * 1000.0 / queries
+            report["kinds"][kind] = {
+                "bytes_per_vector": ann_index.bytes_per_vector(kind, dim),
+                "index_bytes": ann_index.index_bytes(index),
+                "projected_bytes": int(ann_index.bytes_per_vector(kind, dim) * project),
+                "build_sec": round(build_sec, 3),
+                "recall": ann_index.recall_at_k(index, vectors, n_queries=queries, k=k),
+                "recall_reranked": ann_index.recall_at_k(index, vectors, n_queries=queries, k=k, search=reranked),
+                "query_ms": round(query_ms, 3),
+            }
+    report["projected_vectors"] = project
+    return report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compressed vector index recall/memory benchmark")
+    ap.add_argument("--docs", type=int, default=20000)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--kinds", default="flat,fp16,sq8,pq,opq")
+    ap.add_argument("--rerank-factor", type=int, default=4)
+    ap.add_argument("--project", type=int, default=1_000_000, help="report index size at this many vectors")
+    args = ap.parse_args()
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    print(json.dumps(run(args.docs, args.queries, args.dim, args.k, kinds, args.rerank_factor, args.project), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+End-to-end VectorStore benchmark across index types and settings.
+
+Embeds a synthetic corpus once through EmbeddingService (kept as a float32 file in the work
+directory, so every size and config, and reruns with --workdir, reuse it), then for each
+size x config reports:
+  - add throughput (add_vectors in --batch rows, log appends and automatic compaction included)
+  - build time until the configured index kind is in place (background migration/training)
+  - persist cost (compact into a snapshot) and the snapshot size on disk
+  - load time and first-query latency after reopening the store
+  - single-query p50/p99, the same with a conversation filter, batched queries/sec
+  - index memory and recall@k against exact search over the same vectors; a hit counts
+    when its exact score reaches the k-th best exact score, so ties between hashed
+    embeddings do not read as misses
+
+A config is "<index type>[:param=value...]", e.g. hnsw:ef=128, ivf:nprobe=32:nlist=1024,
+pq:pq_m=32:rerank=8, flat:mmap=0, or "sharded[:type=hnsw]" for monthly shards spread over
+--months. Params are applied to the matching settings for that run (see PARAMS).
+
+Usage (from backend/):
+  python -m benchmarks.vector_store_bench --sizes 10000,100000 --config flat --config hnsw:ef=128
+  python -m benchmarks.vector_store_bench --sizes 1000000,5000000 --config all --out report.json
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+import faiss
+import numpy as np
+
+from app.core.config import settings
+from app.services import ann_index
+from app.services.embedding_service import EmbeddingService
+from app.services.vector_filter import VectorFilter
+from app.services.vector_shards import ShardedVectorStore
+from app.services.vector_store import VectorStore
+from benchmarks.embedding_bench import make_corpus
+
+PARAMS = {
+    "ef": "VECTOR_HNSW_EF_SEARCH",
+    "efc": "VECTOR_HNSW_EF_CONSTRUCTION",
+    "hnsw_m": "VECTOR_HNSW_M",
+    "nlist": "VECTOR_IVF_NLIST",
+    "nprobe": "VECTOR_IVF_NPROBE",
+    "pq_m": "VECTOR_PQ_M",
+    "train": "VECTOR_ANN_TRAIN_SAMPLE",
+    "rerank": "VECTOR_RERANK_FACTOR",
+    "budget_mb": "VECTOR_MEMORY_BUDGET_MB",
+    "exact_max": "VECTOR_FILTER_EXACT_MAX",
+    "mmap": "VECTOR_INDEX_MMAP",
+    "fsync": "VECTOR_SNAPSHOT_FSYNC",
+    "log_mb": "VECTOR_LOG_COMPACT_BYTES",
+}
+ALL_CONFIGS = ["flat", "sparse", "hnsw", "ivf", "ivfpq", "fp16", "sq8", "pq", "opq", "sharded"]
+_EPOCH = datetime(2024, 1, 1)
+
+
+def parse_config(spec: str) -> Tuple[str, bool, Dict[str, Any]]:
+    """(index type, sharded, settings overrides) for "kind[:param=value...]"."""
+    kind, *params = spec.split(":")
+    sharded = kind == "sharded"
+    overrides: Dict[str, Any] = {}
+    for param in params:
+        key, _, value = param.partition("=")
+        if sharded and key == "type":
+            kind = value
+            continue
+        if key not in PARAMS:
+            raise ValueError(f"unknown parameter {key!r} in {spec!r} (known: type, {', '.join(PARAMS)})")
+        name = PARAMS[key]
+        current = getattr(settings, name)
+        if isinstance(current, bool):
+            overrides[name] = value.lower() in ("1", "true", "yes", "on")
+        elif key == "log_mb":
+            overrides[name] = int(float(value) * 1024 * 1024)
+        else:
+            overrides[name] = type(current)(value)
+    kind = "flat" if kind == "sharded" else kind
+    if kind not in ann_index.DENSE_KINDS + ("sparse", "auto"):
+        raise ValueError(f"unknown index type {kind!r} in {spec!r}")
+    return kind, sharded, overrides
+
+
+@contextmanager
+def patched(overrides: Dict[str, Any]):
+    saved = {name: getattr(settings, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(settings, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+def embed_corpus(workdir: str, n: int, dim: int, batch: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """Embeddings of n synthetic messages as a read-only memmap, computed once per (n, dim)."""
+    path = os.path.join(workdir, f"corpus-{n}x{dim}.f32")
+    svc = EmbeddingService(dim=dim, cache_size=0, cache_path="")
+    info: Dict[str, Any] = {"backend": getattr(svc, "backend_name", None), "docs": n, "dim": dim}
+    if not (os.path.isfile(path) and os.path.getsize(path) == n * dim * 4):
+        out = np.memmap(path + ".tmp", dtype=np.float32, mode="w+", shape=(n, dim))
+        t0 = time.perf_counter()
+        for start in range(0, n, batch):
+            stop = min(n, start + batch)
+            out[start:stop] = svc.embed_texts(make_corpus(stop - start, words_per_doc=24, seed=start))
+        elapsed = time.perf_counter() - t0
+        out.flush()
+        del out
+        os.replace(path + ".tmp", path)
+        info.update(embed_sec=round(elapsed, 3), embed_docs_per_sec=round(n / max(elapsed, 1e-9), 1))
+    else:
+        info["cached"] = True
+    return np.memmap(path, dtype=np.float32, mode="r", shape=(n, dim)), info
+
+
+def kth_best_scores(corpus: np.ndarray, n: int, qvecs: np.ndarray, k: int, chunk: int = 1 << 16) -> np.ndarray:
+    """Exact k-th best inner product of each query over the first n corpus rows (streamed)."""
+    best = np.full((qvecs.shape[0], 0), -np.inf, dtype=np.float32)
+    for start in range(0, n, chunk):
+        scores = qvecs @ np.asarray(corpus[start:min(n, start + chunk)]).T
+        both = np.concatenate([best, scores], axis=1)
+        keep = min(k, both.shape[1])
+        best = np.partition(both, both.shape[1] - keep, axis=1)[:, -keep:]
+    return best.min(axis=1)
+
+
+def metadata(start: int, stop: int, n: int, conversations: int, months: int) -> List[Dict[str, Any]]:
+    # message_id encodes the corpus row, so hits map back to their exact scores
+    span = months * 30 * 86_400
+    return [{
+        "message_id": str(uuid.UUID(int=i + 1)),
+        "conversation_id": f"c{i % conversations}",
+        "role": "user" if i % 2 else "assistant",
+        "timestamp": (_EPOCH + timedelta(seconds=i * span // n)).isoformat(),
+    } for i in range(start, stop)]
+
+
+def open_store(root: str, kind: str, sharded: bool, dim: int):
+    if sharded:
+        return ShardedVectorStore(root=root, index_type=kind, dim=dim)
+    return VectorStore(dim=dim, index_path=os.path.join(root, "vector.index"),
+                       meta_path=os.path.join(root, "vector_meta.json"), index_type=kind)
+
+
+def _parts(store) -> List[VectorStore]:
+    return [shard for _, shard in store.shards()] if isinstance(store, ShardedVectorStore) else [store]
+
+
+def _settle(store) -> None:
+    """Wait until background migrations finish and no further one is due."""
+    for part in _parts(store):
+        while True:
+            if part._migration is not None:
+                part._migration.join()
+            part._maybe_migrate()
+            if not part.migrating:
+                break
+
+
+def _disk_bytes(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+
+
+def _recall(hits, qvecs: np.ndarray, corpus: np.ndarray, kth: np.ndarray, k: int) -> float:
+    found = 0
+    for qi, row in enumerate(hits):
+        rows = [uuid.UUID(meta["message_id"]).int - 1 for _, meta in row[:k]]
+        if rows:
+            exact = np.asarray(corpus[np.sort(rows)]) @ qvecs[qi]
+            found += int((exact >= kth[qi] - 1e-5).sum())
+    return found / (len(hits) * min(k, corpus.shape[0]))
+
+
+def _ms(samples: List[float], q: float) -> float:
+    return round(float(np.percentile(samples, q)) * 1000.0, 3)
+
+
+def bench_one(corpus: np.ndarray, n: int, qvecs: np.ndarray, kth: np.ndarray, spec: str, root: str,
+              k: int, batch: int, conversations: int, months: int) -> Dict[str, Any]:
+    kind, sharded, overrides = parse_config(spec)
+    dim = corpus.shape[1]
+    result: Dict[str, Any] = {"size": n, "config": spec, "settings": overrides}
+    with patched(overrides):
+        store = open_store(root, kind, sharded, dim)
+        add_sec = 0.0
+        for start in range(0, n, batch):
+            stop = min(n, start + batch)
+            vecs, metas = np.asarray(corpus[start:stop]), metadata(start, stop, n, conversations, months)
+            t0 = time.perf_counter()
+            store.add_vectors(vecs, metas)
+            add_sec += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        _settle(store)
+        build_sec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.compact()
+        persist_sec = time.perf_counter() - t0
+        del store
+        gc.collect()
+
+        t0 = time.perf_counter()
+        store = open_store(root, kind, sharded, dim)
+        load_sec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.search_vectors(qvecs[:1], k=k)
+        first_query_sec = time.perf_counter() - t0
+
+        single: List[float] = []
+        for i in range(qvecs.shape[0]):
+            t0 = time.perf_counter()
+            store.search_vectors(qvecs[i:i + 1], k=k)
+            single.append(time.perf_counter() - t0)
+        filtered: List[float] = []
+        for i in range(qvecs.shape[0]):
+            flt = VectorFilter(conversation_id=f"c{i % conversations}")
+            t0 = time.perf_counter()
+            store.search_vectors(qvecs[i:i + 1], k=k, filters=flt)
+            filtered.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        hits = store.search_vectors(qvecs, k=k)
+        batch_sec = time.perf_counter() - t0
+
+        parts = [part.stats() for part in _parts(store)]
+        result.update({
+            "index_type": sorted({p["index_type"] for p in parts if p["index_type"]}),
+            "shards": len(parts),
+            "live": sum(p["live"] for p in parts),
+            "add_sec": round(add_sec, 3),
+            "add_vectors_per_sec": round(n / max(add_sec, 1e-9), 1),
+            "build_sec": round(build_sec, 3),
+            "persist_sec": round(persist_sec, 3),
+            "disk_bytes": _disk_bytes(root),
+            "index_bytes": sum(p["index_bytes"] for p in parts),
+            "load_sec": round(load_sec, 4),
+            "first_query_ms": round(first_query_sec * 1000.0, 3),
+            "query_p50_ms": _ms(single, 50),
+            "query_p99_ms": _ms(single, 99),
+            "filtered_p50_ms": _ms(filtered, 50),
+            "filtered_p99_ms": _ms(filtered, 99),
+            "batch_qps": round(qvecs.shape[0] / max(batch_sec, 1e-9), 1),
+            "recall_at_k": round(_recall(hits, qvecs, corpus, kth, k), 4),
+        })
+    return result
+
+
+def run(sizes: List[int], configs: List[str], queries: int = 100, k: int = 10, dim: int = 768,
+        batch: int = 10_000, conversations: int = 1000, months: int = 12, workdir: str = "",
+        keep: bool = False) -> Dict[str, Any]:
+    own_dir = not workdir
+    workdir = workdir or tempfile.mkdtemp(prefix="vector-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        corpus, embedding = embed_corpus(workdir, max(sizes), dim, batch)
+        svc = EmbeddingService(dim=dim, cache_size=0, cache_path="")
+        qvecs = svc.embed_texts(make_corpus(queries, words_per_doc=6, seed=-1))
+        report: Dict[str, Any] = {
+            "env": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "faiss": getattr(faiss, "__version__", None),
+                "numpy": np.__version__,
+            },
+            "params": {"sizes": sizes, "configs": configs, "queries": queries, "k": k, "dim": dim,
+                       "batch": batch, "conversations": conversations, "months": months},
+            "embedding": embedding,
+            "results": [],
+        }
+        for n in sizes:
+            kth = kth_best_scores(corpus, n, qvecs, k)
+            for spec in configs:
+                root = os.path.join(workdir, f"{n}-{re.sub(r'[^A-Za-z0-9_.=-]+', '_', spec)}")
+                shutil.rmtree(root, ignore_errors=True)
+                try:
+                    result = bench_one(corpus, n, qvecs, kth, spec, root, k, batch, conversations, months)
+                except Exception as e:
+                    # One failing config (e.g. out of memory at 5M) should not lose the rest of the report
+                    result = {"size": n, "config": spec, "error": f"{type(e).__name__}: {e}"}
+                report["results"].append(result)
+                print(json.dumps(result), file=sys.stderr, flush=True)
+                if not keep:
+                    shutil.rmtree(root, ignore_errors=True)
+        return report
+    finally:
+        if own_dir and not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="VectorStore add/persist/load/query/recall benchmark")
+    ap.add_argument("--sizes", default="10000,100000", help="comma-separated corpus sizes")
+    ap.add_argument("--config", action="append", default=None,
+                    help="index type with optional :param=value settings; repeatable; 'all' = every type")
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--batch", type=int, default=10_000, help="vectors per add_vectors call")
+    ap.add_argument("--conversations", type=int, default=1000, help="distinct conversation_ids (filter selectivity)")
+    ap.add_argument("--months", type=int, default=12, help="timestamp spread (shard count for 'sharded')")
+    ap.add_argument("--workdir", default="", help="keep the embedded corpus here between runs")
+    ap.add_argument("--keep", action="store_true", help="leave the built stores on disk")
+    ap.add_argument("--out", default="", help="also write the JSON report to this file")
+    args = ap.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    configs = []
+    for spec in args.config or ["all"]:
+        configs.extend(ALL_CONFIGS if spec == "all" else [spec])
+    for spec in configs:
+        parse_config(spec)
+    report = run(sizes, configs, queries=args.queries, k=args.k, dim=args.dim, batch=args.batch,
+                 conversations=args.conversations, months=args.months, workdir=args.workdir, keep=args.keep)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import pytest
+
+from app.core.config import settings
+from app.models.database import MemoryDatabase
+from app.services.vector_shards import ShardedVectorStore
+from app.services.vector_store import VectorStore
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """
+    Factory for a VectorStore whose files live in tmp_path; calling it again reopens them.
+    sharded=True builds a ShardedVectorStore rooted at tmp_path / "shards" instead.
+    """
+    def make(index_type=None, dim=64, sharded=False, **kw):
+        if sharded:
+            return ShardedVectorStore(root=str(tmp_path / "shards"), dim=dim, index_type=index_type, **kw)
+        return VectorStore(dim=dim, index_path=str(tmp_path / "v.index"), meta_path=str(tmp_path / "v_meta.json"),
+                           index_type=index_type, **kw)
+    return make
+
+
+@pytest.fixture
+def db_settings():
+    """Extra settings applied before `database` opens; override in a module to change them."""
+    return {}
+
+
+@pytest.fixture
+def database(request, tmp_path, monkeypatch, db_settings):
+    """
+    MemoryDatabase on a fresh SQLite file in tmp_path, encrypted at rest unless parametrized
+    indirectly with False.
+    """
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'memory.db'}")
+    monkeypatch.setattr(settings, "PRIVACY_ENCRYPT_AT_REST", getattr(request, "param", True))
+    for name, value in db_settings.items():
+        monkeypatch.setattr(settings, name, value)
+    return MemoryDatabase()
@@ -0,0 +1,99 @@
+import numpy as np
+
+from app.core.config import settings
+from app.services import ann_index
+
+
+def _vectors(n, d, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, d)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_ivf_target_stays_flat_until_trainable(monkeypatch, make_store):
+    monkeypatch.setattr(settings, "VECTOR_IVF_NLIST", 16)
+    vs = make_store("ivf")
+    assert vs.index_kind == "flat"
+    assert vs._target_kind(100) == "flat"
+    assert vs._target_kind(39 * 16) == "ivf"
+
+
+def test_migrate_keeps_ids_and_meta(monkeypatch, make_store):
+    monkeypatch.setattr(settings, "VECTOR_IVF_NLIST", 16)
+    monkeypatch.setattr(settings, "VECTOR_IVF_NPROBE", 16)
+    vs = make_store("flat")
+    vecs = _vectors(2000, 64)
+    with vs._write_lock:
+        vs._add_vectors(vecs, [{"id": f"m{i}"} for i in range(len(vecs))])
+
+    for kind in ("hnsw", "ivf"):
+        vs.migrate(kind, background=False)
+        assert vs.index_kind == kind
+        assert vs._index.ntotal == 2000
+        # Positional IDs survive: each stored vector is its own nearest neighbour
+        _, ids = vs._index.search(vecs[:50], 1)
+        assert ids[:, 0].tolist() == list(range(50))
+        assert vs.recall_check(n_queries=50, k=10)["recall"] > 0.9
+
+    # The migrated index is what a restart loads (configured type still "ivf")
+    reloaded = make_store("ivf")
+    assert reloaded.index_kind == "ivf"
+    assert reloaded.get_meta(1999) == {"id": "m1999"}
+    assert reloaded.stats()["ntotal"] == 2000
+
+
+def test_build_hnsw_recall():
+    vecs = _vectors(3000, 32, seed=1)
+    index = ann_index.build("hnsw", vecs)
+    assert ann_index.index_kind(index) == "hnsw"
+    assert ann_index.recall_at_k(index, vecs, n_queries=100, k=10) > 0.9
+
+
+def test_failed_migration_backs_off(monkeypatch, make_store):
+    monkeypatch.setattr(settings, "VECTOR_AUTO_HNSW_AT", 10)
+    calls = []
+
+    def failing_build(kind, vectors):
+        calls.append(kind)
+        raise MemoryError("no room for the new index")
+
+    monkeypatch.setattr(ann_index, "build", failing_build)
+    vs = make_store("auto")
+    vs.add_vectors(_vectors(20, 64), [{"id": i} for i in range(20)])
+    vs._migration.join()
+    assert calls == ["hnsw"] and vs.stats()["migration_failures"] == 1
+    assert vs.index_kind == "flat" and vs.stats()["live"] == 20
+
+    # The next write keeps the flat index instead of starting another full rebuild
+    vs.add_vectors(_vectors(5, 64, seed=1), [{"id": i} for i in range(20, 25)])
+    assert not vs.migrating and calls == ["hnsw"]
+
+    # Once the back-off has passed, a write tries again
+    monkeypatch.setattr(settings, "VECTOR_MIGRATION_RETRY_SEC", 0.0)
+    vs.add_vectors(_vectors(1, 64, seed=2), [{"id": 25}])
+    vs._migration.join()
+    assert calls == ["hnsw", "hnsw"]
+
+
+def test_migration_keeps_writes_made_while_it_builds(monkeypatch, make_store):
+    vs = make_store("flat")
+    vecs = _vectors(40, 64, seed=3)
+    vs.add_vectors(vecs[:30], [{"id": i} for i in range(30)])
+    real_build = ann_index.build
+
+    def build_during_writes(kind, vectors):
+        index = real_build(kind, vectors)
+        # As after loading a mapped snapshot: the next add swaps in a private copy of the index
+        vs._index_mapped = True
+        vs.add_vectors(vecs[30:], [{"id": i} for i in range(30, 40)])
+        vs.remove_ids([0, 35])
+        return index
+
+    monkeypatch.setattr(ann_index, "build", build_during_writes)
+    vs.migrate("hnsw", background=False)
+    assert vs.index_kind == "hnsw" and vs.stats()["migrations_aborted"] == 0
+    # The snapshot vector removed mid-build stays as a tombstone; the new one is never added
+    assert vs.stats()["live"] == 38 and vs._index.ntotal == 39 and vs.stats()["tombstones"] == 1
+    _, slots = vs._index.search(vecs[[1, 30, 39]], 1)
+    assert vs._ids.ids[slots[:, 0]].tolist() == [1, 30, 39]
+    assert vs.get_meta(0) is None and vs.get_meta(39) == {"id": 39}
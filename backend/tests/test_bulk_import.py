@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.memory_export import NdjsonReader
+from app.services.memory_service import memory_service
+
+
+@pytest.fixture
+def db_settings():
+    return {"MEMORY_IMPORT_CHUNK_SIZE": 3, "MEMORY_IMPORT_ENCRYPT_THREADS": 2}
+
+
+def test_chunked_import_keeps_import_data_semantics(database):
+    existing = database.create_conversation("already here")
+    taken = database.add_message(existing.id, "user", "old message")
+    data = {
+        "conversations": [{"id": existing.id, "title": "collides"}, {"id": "c-new", "title": "new", "tags": ["b", "a"]}],
+        "messages": [
+            {"id": taken.id, "conversation_id": existing.id, "content": "collides with an existing id"},
+            {"id": "m1", "conversation_id": "c-new", "content": "first ticket QX-11"},
+            {"id": "m1", "conversation_id": "c-new", "content": "same id twice in one import"},
+            {"id": "m2", "conversation_id": "nowhere", "content": "orphan"},
+            {"conversation_id": existing.id, "content": "no id"},
+        ],
+    }
+    bulk = database.bulk_import(merge=True)
+    imported = []
+    for kind in ("conversation", "message"):
+        records = [(kind, r) for r in data[f"{kind}s"]]
+        for i in range(0, len(records), bulk.chunk_size):
+            imported += [m.id for m in bulk.add(records[i:i + bulk.chunk_size])]
+    bulk.close()
+    result = bulk.result()
+    assert result == {"conversations": 2, "messages": 4, "skipped_messages": 1, "missing_conversations": ["nowhere"]}
+
+    # The colliding conversation got a fresh ID, and its messages followed it there
+    renamed = next(c for c in database.get_conversations() if c.title == "collides")
+    assert renamed.id != existing.id
+    assert sorted(m.content for m in database.get_messages(renamed.id)) == ["collides with an existing id", "no id"]
+    assert database.get_message(taken.id).content == "old message"
+    assert [m.content for m in database.get_messages_by_ids(["m1"])] == ["first ticket QX-11"]
+    assert len(set(imported)) == 4 and "m1" in imported
+    assert database.get_conversation("c-new").tags == "a,b"
+    assert database.search_lexical("QX-11") == ["m1"]
+
+
+def test_ndjson_upload_round_trips_an_export():
+    convo = memory_service.store_conversation("ndjson source")
+    for i in range(5):
+        memory_service.add_message(convo.id, "user", f"walrus migration log {i}")
+    exported = b"".join(memory_service.stream_export("ndjson", "gzip"))
+    lines = b"".join(memory_service.stream_export("ndjson")).splitlines()
+    conversations = sum(1 for line in lines if json.loads(line)["type"] == "conversation")
+
+    client = TestClient(app)
+    resp = client.post("/api/v1/memory/import/ndjson", params={"merge": False, "compress": "gzip"}, content=exported)
+    assert resp.status_code == 200
+    result = resp.json()
+    assert result["conversations"] == conversations and result["messages"] == len(lines) - conversations
+    assert result["indexed_messages"] == result["messages"] and result["rows_per_sec"] > 0
+
+    bad = b'{"type": "conversation", "id": "x1", "title": "ok"}\nnot json\n{"type": "message", "conversation_id": "x1", "content": "last line, no newline"}'
+    resp = client.post("/api/v1/memory/import/ndjson", content=bad)
+    assert resp.status_code == 200
+    assert resp.json()["invalid_records"] == 1 and resp.json()["messages"] == 1
+    assert client.post("/api/v1/memory/import/ndjson", params={"compress": "rar"}, content=b"").status_code == 400
+
+
+def test_overlong_ndjson_line_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "MEMORY_IMPORT_MAX_LINE_BYTES", 64)
+    reader = NdjsonReader()
+    assert reader.feed(b'{"type": "conversation", "id": "x1"}\n{"type": "mess') == [("conversation", {"id": "x1"})]
+    with pytest.raises(ValueError):
+        # No newline yet, but the buffered line is already over the limit
+        reader.feed(b"a" * 64)
+
+    client = TestClient(app)
+    resp = client.post("/api/v1/memory/import/ndjson", content=b'{"type": "conversation", "title": "' + b"x" * 100)
+    assert resp.status_code == 400
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.main import app
+from app.models.database import Conversation
+from app.services.memory_service import memory_service
+
+
+def _conversations(database, n):
+    stamp = datetime(2026, 1, 1)
+    ids = []
+    for i in range(n):
+        convo = database.create_conversation(f"c{i}")
+        for j in range(i % 3):
+            database.add_message(convo.id, "user", f"c{i} m{j}")
+        with Session(database.engine) as session:
+            row = session.get(Conversation, convo.id)
+            # Pairs share an updated_at, so the id tiebreak is exercised
+            row.updated_at = stamp + timedelta(minutes=i // 2)
+            session.add(row)
+            session.commit()
+        ids.append(convo.id)
+    return ids
+
+
+def test_pages_cover_every_conversation_once(database):
+    _conversations(database, 7)
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = database.list_conversations(3, cursor=cursor)
+        pages += 1
+        seen.extend(rows)
+        if cursor is None:
+            break
+    assert pages == 3 and len({c.id for c, _, _ in seen}) == 7
+    keys = [(c.updated_at, c.id) for c, _, _ in seen]
+    assert keys == sorted(keys, reverse=True)
+    for c, messages, count in seen:
+        # Messages arrive decrypted and in order from the joined query
+        assert count == len(messages) == int(c.title[1:]) % 3
+        assert [m.content for m in messages] == [f"{c.title} m{j}" for j in range(count)]
+
+    summaries, _ = database.list_conversations(10, include_messages=False)
+    assert [(c.id, n) for c, _, n in summaries] == [(c.id, n) for c, _, n in seen]
+    assert all(messages == [] for _, messages, _ in summaries)
+
+    with pytest.raises(ValueError):
+        database.list_conversations(3, cursor="not-a-cursor")
+
+
+def test_tag_filter_runs_in_sql(database):
+    ids = _conversations(database, 4)
+    database.set_conversation_tags(ids[0], ["work", "urgent"])
+    database.set_conversation_tags(ids[1], ["work"])
+    database.set_conversation_tags(ids[2], ["workshop", "urgent"])
+    rows, cursor = database.list_conversations(10, tags=["urgent", "work"])
+    assert [c.id for c, _, _ in rows] == [ids[0]] and cursor is None
+    assert {c.id for c, _, _ in database.list_conversations(10, tags=["work"])[0]} == {ids[0], ids[1]}
+
+
+def test_listing_endpoints_page_with_header():
+    for i in range(3):
+        memory_service.store_conversation(f"paged {i}")
+    client = TestClient(app)
+    for path in ("/api/v1/memory/conversations", "/api/v1/chat/conversations"):
+        first = client.get(path, params={"limit": 2, "include_messages": False})
+        assert first.status_code == 200 and len(first.json()) == 2
+        assert all(c["messages"] == [] and c["message_count"] is not None for c in first.json())
+        second = client.get(path, params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+        assert second.status_code == 200
+        assert not {c["id"] for c in first.json()} & {c["id"] for c in second.json()}
+        assert client.get(path, params={"cursor": "%%%"}).status_code == 400
+    # Both routers serve the same listing; only the memory one carries tags
+    memory_page = client.get("/api/v1/memory/conversations", params={"limit": 3}).json()
+    chat_page = client.get("/api/v1/chat/conversations", params={"limit": 3}).json()
+    assert [c["id"] for c in chat_page] == [c["id"] for c in memory_page]
+    assert "tags" in memory_page[0] and "tags" not in chat_page[0]
+
+
+def test_listing_without_limit_is_unpaginated_and_cursor_is_exposed():
+    for i in range(3):
+        memory_service.store_conversation(f"unpaged {i}")
+    client = TestClient(app)
+    everything = client.get("/api/v1/memory/conversations", params={"include_messages": False})
+    assert everything.status_code == 200 and "X-Next-Cursor" not in everything.headers
+    assert len(everything.json()) == len(memory_service.list_conversations(None, include_messages=False)[0])
+
+    # A browser on another origin may only read headers listed in Access-Control-Expose-Headers
+    origin = settings.BACKEND_CORS_ORIGINS[0]
+    resp = client.get("/api/v1/chat/conversations", params={"limit": 1}, headers={"Origin": origin})
+    assert resp.headers["access-control-allow-origin"] == origin
+    assert "x-next-cursor" in resp.headers["access-control-expose-headers"].lower()
+    assert resp.headers["X-Next-Cursor"]
@@ -0,0 +1,45 @@
+import logging
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.models.database import MemoryDatabase, create_database_engine
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_file_database_gets_tuned_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'engine.db'}")
+    monkeypatch.setattr(settings, "SQLITE_CACHE_SIZE_MB", 16)
+    engine = MemoryDatabase().engine
+    assert engine.echo is False
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+    assert _pragma(engine, "cache_size") == -16 * 1024
+    assert _pragma(engine, "temp_store") == 2  # MEMORY
+    engine.dispose()
+
+
+def test_in_memory_database_skips_file_only_pragmas():
+    engine = create_database_engine("sqlite://")
+    assert _pragma(engine, "journal_mode") == "memory"
+    assert _pragma(engine, "busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_sql_logging_follows_log_level(monkeypatch):
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    try:
+        monkeypatch.setenv("LOG_LEVEL", "INFO")
+        setup_logging()
+        assert logging.getLogger("sqlalchemy.engine").level == logging.WARNING
+        monkeypatch.setenv("LOG_LEVEL", "DEBUG")
+        setup_logging()
+        assert logging.getLogger("sqlalchemy.engine").level == logging.INFO
+    finally:
+        root.handlers[:] = handlers
+        root.setLevel(level)
+        logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
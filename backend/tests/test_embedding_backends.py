@@ -0,0 +1,95 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.embedding_backends import DynamicBatcher, EmbeddingBackend
+from app.services.embedding_service import EmbeddingService
+
+
+def test_dynamic_batcher_merges_concurrent_calls():
+    calls = []
+
+    def fn(texts):
+        calls.append(list(texts))
+        return np.asarray([[float(len(t))] for t in texts], dtype=np.float32)
+
+    batcher = DynamicBatcher(fn, window_ms=50, max_batch_size=1000)
+    results = {}
+    start = threading.Barrier(8)
+
+    def worker(i):
+        start.wait()
+        results[i] = batcher.submit(["x" * i, "y" * (i + 1)])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Every caller gets exactly its own rows back
+    for i in range(8):
+        assert results[i][:, 0].tolist() == [float(i), float(i + 1)]
+    # Far fewer forward passes than callers
+    assert len(calls) < 8
+    assert sum(len(c) for c in calls) == 16
+
+
+def test_onnx_backend_falls_back_to_hashing_when_model_missing(monkeypatch, tmp_path):
+    from app.core import config as config_module
+    monkeypatch.setattr(config_module.settings, "EMBEDDING_MODEL_PATH", str(tmp_path / "missing.onnx"))
+    svc = EmbeddingService(dim=32, backend_name="onnx")
+    assert svc.backend_name == "hashing"
+    assert svc.embed_texts(["hello"]).shape == (1, 32)
+
+
+def test_onnx_backend_mean_pools_and_reports_dim(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+    from app.services.embedding_backends import OnnxEmbeddingBackend
+
+    # Tiny "model": a 5-token x 4-dim embedding table gathered per token
+    table = np.eye(5, 4, dtype=np.float32) + 0.1
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["hidden"])],
+        "tiny",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["b", "s"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["b", "s"]),
+        ],
+        [helper.make_tensor_value_info("hidden", TensorProto.FLOAT, ["b", "s", 4])],
+        initializer=[helper.make_tensor("table", TensorProto.FLOAT, table.shape, table.flatten())],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    model_path = tmp_path / "embedding.onnx"
+    onnx.save(model, str(model_path))
+
+    tok = Tokenizer(WordLevel({"[PAD]": 0, "[UNK]": 1, "alpha": 2, "beta": 3, "gamma": 4}, unk_token="[UNK]"))
+    tok.pre_tokenizer = Whitespace()
+    tok.save(str(tmp_path / "tokenizer.json"))
+
+    backend = OnnxEmbeddingBackend(str(model_path), batch_window_ms=0)
+    assert backend.dim == 4
+    out = backend.embed(["alpha", "alpha beta gamma"])
+    assert out.shape == (2, 4)
+    np.testing.assert_allclose(np.linalg.norm(out, axis=1), 1.0, rtol=1e-5)
+    # Padding must not leak into the pooled vector of the shorter text
+    expected = table[2] / np.linalg.norm(table[2])
+    np.testing.assert_allclose(out[0], expected, rtol=1e-5)
+
+
+def test_backends_must_implement_embed():
+    with pytest.raises(TypeError):
+        EmbeddingBackend()
+
+    class Incomplete(EmbeddingBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
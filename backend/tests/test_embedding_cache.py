@@ -0,0 +1,75 @@
+import numpy as np
+
+from app.services.embedding_backends import HashingEmbeddingBackend
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+
+
+class CountingBackend(HashingEmbeddingBackend):
+    def __init__(self, dim):
+        super().__init__(dim)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+def test_repeated_texts_skip_backend_and_survive_restart(tmp_path):
+    path = str(tmp_path / "emb_cache.db")
+    backend = CountingBackend(32)
+    svc = EmbeddingService(backend=backend, cache_size=100, cache_path=path)
+
+    first = svc.embed_texts(["hello world", "hello world", "other"])
+    assert backend.embedded == ["hello world", "other"]
+    again = svc.embed_texts(["other", "hello world"])
+    assert backend.embedded == ["hello world", "other"]
+    assert again.tobytes() == first[[2, 0]].tobytes()
+    assert svc.cache_stats()["memory_hits"] == 2
+
+    # A fresh process-level cache is served from disk
+    backend2 = CountingBackend(32)
+    svc2 = EmbeddingService(backend=backend2, cache_size=100, cache_path=path)
+    out = svc2.embed_texts(["hello world"])
+    assert backend2.embedded == []
+    assert np.array_equal(out[0], first[0])
+    stats = svc2.cache_stats()
+    assert stats["disk_hits"] == 1 and stats["hit_rate"] == 1.0
+
+
+def test_cache_is_namespaced_by_backend_dim(tmp_path):
+    path = str(tmp_path / "emb_cache.db")
+    EmbeddingService(backend=CountingBackend(32), cache_size=0, cache_path=path).embed_texts(["hello"])
+    backend = CountingBackend(64)
+    out = EmbeddingService(backend=backend, cache_size=0, cache_path=path).embed_texts(["hello"])
+    assert backend.embedded == ["hello"]
+    assert out.shape == (1, 64)
+
+
+def test_disk_store_opens_lazily_and_evicts_least_recently_used(tmp_path):
+    path = tmp_path / "cache" / "emb_cache.db"
+    cache = EmbeddingCache("ns", 4, max_items=0, path=str(path), max_disk_items=10)
+    assert not path.exists()
+
+    vec = np.ones(4, dtype=np.float32)
+    keys = [EmbeddingCache.key_for(f"text {i}") for i in range(12)]
+    cache.put_many({k: vec for k in keys[:10]})
+    assert path.exists() and cache.stats()["disk_items"] == 10
+    # Reading the oldest row makes it recently used
+    assert keys[0] in cache.get_many([keys[0]])
+    cache.put_many({k: vec for k in keys[10:]})
+    stats = cache.stats()
+    assert stats["disk_items"] <= 10 and stats["disk_evictions"] >= 2
+    survivors = cache.get_many(keys)
+    assert keys[0] in survivors and keys[1] not in survivors and keys[11] in survivors
+
+
+def test_unusable_disk_store_is_logged_and_skipped(tmp_path, caplog):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    cache = EmbeddingCache("ns", 4, max_items=10, path=str(blocker / "emb_cache.db"))
+    key = EmbeddingCache.key_for("hello")
+    with caplog.at_level("ERROR", logger="app.services.embedding_cache"):
+        cache.put_many({key: np.ones(4, dtype=np.float32)})
+    assert "could not be opened" in caplog.text
+    assert key in cache.get_many([key]) and cache.stats()["disk_enabled"] is False
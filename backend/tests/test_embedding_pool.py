@@ -0,0 +1,52 @@
+import base64
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.embedding_pool import EmbeddingPool
+from app.services.embedding_service import embedding_service
+
+
+def test_pool_shards_across_processes_and_matches_in_process():
+    texts = [f"message {i} about topic {i % 7}" for i in range(250)]
+    pool = EmbeddingPool(workers=2, min_batch=10, chunk_size=64)
+    try:
+        out = pool.embed_texts(texts)
+    finally:
+        pool.shutdown()
+    assert isinstance(out, np.memmap)
+    assert out.shape == (250, embedding_service.dim)
+    np.testing.assert_array_equal(np.asarray(out), embedding_service.embed_texts(texts))
+
+
+def test_embed_endpoint_returns_vectors():
+    client = TestClient(app)
+    r = client.post("/api/v1/memory/embed", json={"texts": ["hello world", "second text"]})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["count"] == 2 and data["dim"] == embedding_service.dim
+    assert len(data["embeddings"][0]) == data["dim"]
+
+    r = client.post("/api/v1/memory/embed", json={"texts": ["hello world"], "encoding": "base64"})
+    raw = np.frombuffer(base64.b64decode(r.json()["embeddings_b64"]), dtype="<f4")
+    np.testing.assert_allclose(raw, data["embeddings"][0], rtol=1e-6)
+
+
+def test_replaced_pool_stays_up_for_callers_still_using_it():
+    pool = EmbeddingPool(workers=2)
+    try:
+        with pool._use_executor("hashing", 32) as first:
+            # Another caller switches backend while this one still has work on `first`
+            with pool._use_executor("hashing", 64) as second:
+                assert second is not first
+            assert first.submit(int, "7").result() == 7
+        # The last caller is done with the replaced pool, so it is shut down
+        assert first not in pool._users
+        with pytest.raises(RuntimeError):
+            first.submit(int, "7")
+        with pool._use_executor("hashing", 64) as again:
+            assert again is second
+    finally:
+        pool.shutdown()
@@ -0,0 +1,36 @@
+import hashlib
+import re
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService
+
+
+def _reference_embed(texts, dim):
+    # Original per-token sha1 loop; persisted indexes were built with this
+    mat = np.zeros((len(texts), dim), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for tok in [t for t in re.split(r"[^a-z0-9]+", text.lower()) if t]:
+            mat[i, int(hashlib.sha1(tok.encode("utf-8")).hexdigest(), 16) % dim] += 1.0
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def test_embeddings_bit_identical_to_reference():
+    texts = ["Hello hello WORLD", "", "error E1234 at line 42; error again", "ünïcode ok"]
+    for dim in (64, 768):
+        svc = EmbeddingService(dim=dim, cache_size=0, cache_path="")
+        out = svc.embed_texts(texts)
+        assert out.shape == (len(texts), dim)
+        assert out.dtype == np.float32
+        assert out.tobytes() == _reference_embed(texts, dim).tobytes()
+
+
+def test_token_bucket_cache_is_bounded_and_reused():
+    svc = EmbeddingService(dim=32, token_cache_size=4, cache_size=0, cache_path="")
+    svc.embed_texts(["a b c d e f", "a b"])
+    info = svc.token_cache_info()
+    assert info.maxsize == 4
+    assert info.currsize <= 4
+    assert info.hits + info.misses == 8
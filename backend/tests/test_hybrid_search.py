@@ -0,0 +1,96 @@
+from datetime import timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.models.database import MemoryDatabase
+from app.services.memory_service import memory_service, message_vector_meta, reciprocal_rank_fusion
+from app.services.vector_filter import VectorFilter
+from app.services.vector_meta import VectorMetaStore
+
+
+plaintext_and_encrypted = pytest.mark.parametrize("database", [False, True], ids=["plaintext", "encrypted"],
+                                                  indirect=True)
+
+
+def _fts_bodies(database):
+    with database.engine.connect() as conn:
+        return [r[0] for r in conn.execute(text(f"SELECT body FROM {database._fts_table}"))]
+
+
+@plaintext_and_encrypted
+def test_lexical_search_tracks_inserts_and_deletes(database):
+    convo = database.create_conversation("errors")
+    other = database.create_conversation("other")
+    hit = database.add_message(convo.id, "user", "The proxy fails with ERR_CONN_RESET on upload")
+    near = database.add_message(convo.id, "assistant", "Upload through the proxy again")
+    elsewhere = database.add_message(other.id, "user", "proxy settings for the lab")
+
+    assert database.search_lexical("ERR_CONN_RESET") == [hit.id]
+    assert database.search_lexical("err_conn_reset upload")[0] == hit.id
+    assert set(database.search_lexical("proxy")) == {hit.id, near.id, elsewhere.id}
+    assert database.search_lexical("proxy", conversation_id=convo.id, role="assistant") == [near.id]
+    assert database.search_lexical("proxy", since=elsewhere.timestamp) == [elsewhere.id]
+    assert database.search_lexical("?! --") == []
+
+    database.delete_message(hit.id)
+    assert database.search_lexical("ERR_CONN_RESET") == []
+    database.delete_conversation(other.id)
+    assert database.search_lexical("proxy") == [near.id]
+    if database._encrypt_enabled:
+        # Only keyed word digests are stored next to the encrypted content
+        assert "proxy" not in " ".join(_fts_bodies(database)).lower()
+
+
+def test_existing_messages_are_backfilled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'backfill.db'}")
+    monkeypatch.setattr(settings, "MEMORY_HYBRID_SEARCH", False)
+    old = MemoryDatabase()
+    convo = old.create_conversation("before")
+    msg = old.add_message(convo.id, "user", "ticket JIRA-4521 is blocked")
+    assert old.search_lexical("JIRA-4521") == []
+
+    monkeypatch.setattr(settings, "MEMORY_HYBRID_SEARCH", True)
+    upgraded = MemoryDatabase()
+    assert upgraded.search_lexical("JIRA-4521") == [msg.id]
+    bulk = upgraded.bulk_import()
+    imported = bulk.add([("message", {"conversation_id": convo.id, "role": "user", "content": "see JIRA-9000"})])
+    bulk.close()
+    assert upgraded.search_lexical("JIRA-9000") == [m.id for m in imported]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=3)
+    assert fused[0] == "c" and fused[1:] == ["a", "b"]
+    assert reciprocal_rank_fusion([["a", "b"], ["b"]], k=1, weights=[1.0, 0.0]) == ["a"]
+
+
+def test_lexical_match_surfaces_when_vectors_miss():
+    convo = memory_service.store_conversation("hybrid")
+    exact = memory_service.add_message(convo.id, "user", "deploy failed: error code 0x80070005")
+    filters = VectorFilter(conversation_id=convo.id)
+    # Vector hits that missed the identifier entirely still get fused with the exact match
+    ranked = memory_service._hybrid_rank("0x80070005", ["v1", "v2", "v3"], filters, k=3)
+    assert ranked[0] in ("v1", exact.id) and exact.id in ranked
+    hits = memory_service.semantic_search("0x80070005", read_your_writes=True, conversation_id=convo.id)
+    assert hits and hits[0].id == exact.id
+
+
+@plaintext_and_encrypted
+def test_lexical_time_window_matches_vector_filter(database):
+    convo = database.create_conversation("window")
+    msgs = [database.add_message(convo.id, "user", f"boundary note {i}") for i in range(3)]
+    meta = VectorMetaStore()
+    meta.append(list(range(3)), [message_vector_meta(m) for m in msgs])
+
+    # The same instant as an aware datetime in another zone
+    plus2 = timezone(timedelta(hours=2))
+    since = msgs[0].timestamp.replace(tzinfo=timezone.utc).astimezone(plus2)
+    until = msgs[2].timestamp.replace(tzinfo=timezone.utc).astimezone(plus2)
+    lexical = database.search_lexical("boundary", since=since, until=until)
+    vector = [msgs[i].id for i in meta.mask(VectorFilter(since=since, until=until)).nonzero()[0]]
+    # until is exclusive on both sides
+    expected = [m.id for m in msgs if msgs[0].timestamp <= m.timestamp < msgs[2].timestamp]
+    assert msgs[0].id in expected and msgs[2].id not in expected
+    assert sorted(lexical) == sorted(vector) == sorted(expected)
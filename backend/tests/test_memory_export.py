@@ -0,0 +1,58 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import memory_export
+from app.services.memory_service import memory_service
+
+
+@pytest.fixture
+def db_settings():
+    return {"MEMORY_EXPORT_BATCH_SIZE": 3}
+
+
+def _body(db, fmt, compression="none"):
+    return b"".join(memory_export.stream_export(db, fmt, compression))
+
+
+def test_streamed_formats_match_export_all(database, monkeypatch):
+    assert json.loads(_body(database, "json")) == {"conversations": [], "messages": []}
+    for i in range(4):
+        convo = database.create_conversation(f"conversation {i}")
+        for j in range(5):
+            database.add_message(convo.id, "user", f"secret note {i}.{j} " + "x" * 200)
+    expected = database.export_all()
+    assert expected["messages"][0]["content"].startswith("secret note")
+
+    # Small chunks: the output arrives in many pieces and still parses as one document
+    monkeypatch.setattr(memory_export, "_CHUNK_BYTES", 512)
+    assert len(list(memory_export.stream_export(database, "json"))) > 5
+    assert json.loads(_body(database, "json")) == expected
+
+    lines = [json.loads(line) for line in _body(database, "ndjson").decode("utf-8").splitlines()]
+    assert [r.pop("type") for r in lines] == ["conversation"] * 4 + ["message"] * 20
+    assert lines == expected["conversations"] + expected["messages"]
+    assert gzip.decompress(_body(database, "jsonl", "gzip")) == _body(database, "jsonl")
+
+
+def test_unknown_options_are_rejected(database):
+    with pytest.raises(ValueError):
+        memory_export.stream_export(database, "xml")
+    with pytest.raises(ValueError):
+        memory_export.stream_export(database, "json", "brotli")
+
+
+def test_export_endpoint_streams_ndjson():
+    convo = memory_service.store_conversation("export endpoint")
+    memory_service.add_message(convo.id, "user", "exported line")
+    client = TestClient(app)
+    resp = client.get("/api/v1/memory/export", params={"format": "ndjson", "compress": "gzip"})
+    assert resp.status_code == 200 and resp.headers["content-type"] == "application/gzip"
+    assert "memory-export.ndjson.gz" in resp.headers["content-disposition"]
+    records = [json.loads(line) for line in gzip.decompress(resp.content).splitlines()]
+    assert {"type": "conversation", "id": convo.id}.items() <= next(r for r in records if r["id"] == convo.id).items()
+    assert any(r["type"] == "message" and r["content"] == "exported line" for r in records)
+    assert client.get("/api/v1/memory/export", params={"compress": "lz4"}).status_code == 400
@@ -0,0 +1,39 @@
+import pytest
+
+from app.services.memory_service import memory_service
+
+
+@pytest.mark.parametrize("database", [False, True], ids=["plaintext", "encrypted"], indirect=True)
+def test_get_messages_by_ids_keeps_order(database):
+    convo = database.create_conversation("hydrate")
+    ids = [database.add_message(convo.id, "user", f"message {i}").id for i in range(5)]
+
+    wanted = [ids[3], "missing", ids[0], ids[3], ids[4]]
+    assert [m.content for m in database.get_messages_by_ids(wanted)] == ["message 3", "message 0", "message 3", "message 4"]
+    assert database.get_messages_by_ids([]) == []
+
+
+def test_semantic_search_hydrates_in_one_query(monkeypatch):
+    convo = memory_service.store_conversation("hydration")
+    for word in ("narwhal", "narwhal tusk", "narwhal pod"):
+        memory_service.add_message(convo.id, "user", word)
+
+    def per_hit(_message_id):
+        raise AssertionError("semantic_search should not fetch hits one by one")
+
+    monkeypatch.setattr(memory_service.db, "get_message", per_hit)
+    hits = memory_service.semantic_search("narwhal", read_your_writes=True, conversation_id=convo.id)
+    assert {m.content for m in hits} == {"narwhal", "narwhal tusk", "narwhal pod"}
+
+
+def test_cached_search_drops_deleted_messages():
+    convo = memory_service.store_conversation("cached search")
+    keep = memory_service.add_message(convo.id, "user", "okapi sighting at dawn")
+    gone = memory_service.add_message(convo.id, "user", "okapi sighting at dusk")
+    # Also fills the query cache (read_your_writes only skips the lookup)
+    first = memory_service.semantic_search("okapi sighting", read_your_writes=True, conversation_id=convo.id)
+    assert {m.id for m in first} == {keep.id, gone.id}
+
+    memory_service.delete_message(gone.id)
+    again = memory_service.semantic_search("okapi sighting", conversation_id=convo.id)
+    assert [m.id for m in again] == [keep.id]
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.memory_service import memory_service
+from app.services.vector_store import VectorStore
+
+
+def test_search_batch_matches_single_searches(tmp_path):
+    vs = VectorStore(dim=64, index_path=str(tmp_path / "v.index"), meta_path=str(tmp_path / "v_meta.json"))
+    texts = ["red apples and pears", "green pears", "blue ocean waves", "ocean tides and moon", "stock market news"]
+    vs.add_texts(texts, [{"id": i} for i in range(len(texts))])
+    vs.remove_ids([1])
+    queries = ["pears", "", "ocean", "market"]
+    batch = vs.search_batch(queries, k=2)
+    assert batch[1] == []
+    for q, hits in zip(queries, batch):
+        assert hits == (vs.search(q, k=2) if q else [])
+    assert all(meta["id"] != 1 for hits in batch for _, meta in hits)
+
+
+def test_batch_endpoint_returns_one_list_per_query():
+    conv = memory_service.store_conversation("batch")
+    memory_service.add_message(conv.id, "user", "walrus tusk ivory")
+    memory_service.add_message(conv.id, "user", "penguin colony ice")
+    client = TestClient(app)
+    resp = client.post("/api/v1/search/semantic/batch", json={
+        "queries": ["walrus tusk", "penguin colony"], "k": 1, "conversation_id": conv.id, "read_your_writes": True,
+    })
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r[0]["content"] for r in results] == ["walrus tusk ivory", "penguin colony ice"]
+    assert client.post("/api/v1/search/semantic/batch", json={"queries": ["x"], "k": 0}).status_code == 422
@@ -0,0 +1,50 @@
+import os
+
+import faiss
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService
+from app.services.sparse_index import SparseInvertedIndex
+from app.services.vector_store import VectorStore
+
+TEXTS = [
+    "The quick brown fox jumps over the lazy dog",
+    "A fast auburn fox leaps above a sleepy canine",
+    "Quantum mechanics deals with the behavior of particles",
+    "error E1234 raised by the database driver",
+]
+
+
+def test_sparse_index_matches_flat_scores():
+    vecs = EmbeddingService(dim=256, cache_size=0, cache_path="").embed_texts(TEXTS)
+    flat = faiss.IndexFlatIP(256)
+    flat.add(vecs)
+    sparse = SparseInvertedIndex(256)
+    sparse.add(vecs[:2])
+    sparse.add(vecs[2:])
+    q = EmbeddingService(dim=256, cache_size=0, cache_path="").embed_texts(["fox dog database"])
+    fs, fi = flat.search(q, 3)
+    ss, si = sparse.search(q, 3)
+    assert si[0].tolist() == fi[0].tolist()
+    np.testing.assert_allclose(ss, fs, rtol=1e-5)
+    assert sparse.memory_bytes() < vecs.nbytes
+    # Round-trip through the on-disk format
+    restored = SparseInvertedIndex.deserialize(sparse.serialize())
+    np.testing.assert_array_equal(restored.reconstruct_n(0, 4), vecs)
+
+
+def test_vector_store_sparse_mode_and_conversion(tmp_path):
+    index_path = str(tmp_path / "v.index")
+    meta_path = str(tmp_path / "v_meta.json")
+    vs = VectorStore(index_path=index_path, meta_path=meta_path, index_type="sparse")
+    vs.add_texts(TEXTS, [{"id": f"t{i}"} for i in range(len(TEXTS))])
+    vs.compact()
+    assert SparseInvertedIndex.is_sparse_file(os.path.join(vs.snapshot_path, "index"))
+    top = vs.search("database driver error", k=2)
+    assert top[0][1]["id"] == "t3"
+
+    # Reopening as flat converts the stored vectors and keeps IDs aligned with metadata
+    flat = VectorStore(index_path=index_path, meta_path=meta_path, index_type="flat")
+    assert isinstance(flat._index, faiss.IndexFlatIP)
+    assert flat._index.ntotal == len(TEXTS)
+    assert flat.search("database driver error", k=1)[0][1]["id"] == "t3"
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services import ann_index
+from app.services.vector_filter import VectorFilter
+
+
+def _vectors(n, d, seed=0):
+    # Clustered data, so quantization error actually reorders close neighbours
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((32, d)).astype(np.float32)
+    x = centers[rng.integers(0, 32, n)] + 0.3 * rng.standard_normal((n, d)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _filled(make_store, index_type, vecs):
+    vs = make_store("flat")
+    with vs._write_lock:
+        vs._add_vectors(vecs, [{"id": f"m{i}", "conversation_id": f"c{i % 10}"} for i in range(len(vecs))])
+    vs.index_type = index_type
+    vs.migrate(index_type, background=False)
+    return vs
+
+
+@pytest.mark.parametrize("kind", ["fp16", "sq8", "pq", "opq"])
+def test_build_compressed_kinds(monkeypatch, kind):
+    monkeypatch.setattr(settings, "VECTOR_PQ_M", 4)
+    vecs = _vectors(600, 16)
+    index = ann_index.build(kind, vecs)
+    assert ann_index.index_kind(index) == kind and index.ntotal == len(vecs)
+    assert ann_index.index_bytes(index) < 4 * 16 * len(vecs)
+    assert ann_index.recall_at_k(index, vecs, n_queries=50, k=10) > (0.9 if kind in ("fp16", "sq8") else 0.2)
+
+    # PQ searches reject selectors and post-filter instead; every kind still returns k matches
+    allowed = np.zeros(len(vecs), dtype=bool)
+    allowed[::20] = True
+    _, slots = ann_index.search_filtered(index, vecs[:3], 10, allowed)
+    assert slots.shape == (3, 10) and allowed[slots].all()
+
+
+def test_rerank_restores_recall_and_survives_restart(make_store):
+    vecs = _vectors(2000, 64)
+    vs = _filled(make_store, "sq8", vecs)
+    report = vs.recall_check(n_queries=100, k=10)
+    assert report["index_type"] == "sq8" and report["bytes_per_vector"] == 64
+    assert report["recall_reranked"] >= report["recall"] and report["recall_reranked"] > 0.98
+    assert vs.stats()["rerank"] and os.path.isfile(vs._raw.path)
+
+    # Exact scores: each stored vector comes back first with score ~1
+    hits = vs.search_vectors(vecs[:20], k=1)
+    assert [h[0][1]["id"] for h in hits] == [f"m{i}" for i in range(20)]
+    assert all(abs(h[0][0] - 1.0) < 1e-4 for h in hits)
+
+    # Vectors added after the snapshot are appended to the raw file and replayed from the log
+    extra = _vectors(5, 64, seed=7)
+    vs.add_vectors(extra, [{"id": f"x{i}", "conversation_id": "cx"} for i in range(5)])
+    reloaded = make_store("sq8")
+    assert reloaded.index_kind == "sq8" and reloaded.stats()["rerank"]
+    assert reloaded._raw.rows == reloaded._index.ntotal == 2005
+    assert reloaded.search_vectors(extra[3:4], k=1)[0][0][1]["id"] == "x3"
+
+    got = reloaded.search_vectors(vecs[:1], k=5, filters=VectorFilter(conversation_id="c3"))[0]
+    assert len(got) == 5 and all(m["conversation_id"] == "c3" for _, m in got)
+    scores = [s for s, _ in got]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_missing_raw_file_disables_rerank(make_store):
+    vecs = _vectors(1000, 64, seed=2)
+    vs = _filled(make_store, "sq8", vecs)
+    assert vs.index_kind == "sq8" and vs.stats()["rerank"]
+    os.remove(vs._raw.path)
+    reloaded = make_store("sq8")
+    assert reloaded.index_kind == "sq8" and not reloaded.stats()["rerank"]
+    assert reloaded.search_vectors(vecs[:1], k=1)[0][0][1]["id"] == "m0"
+
+    # Migrating back to an exact index drops the raw copies once no kept snapshot needs them
+    reloaded.migrate("flat", background=False)
+    for _ in range(settings.VECTOR_SNAPSHOT_KEEP):
+        reloaded.compact()
+    assert not [f for f in os.listdir(reloaded.snapshot_dir) if f.endswith(".f32")]
+
+
+def test_memory_budget_picks_compression(monkeypatch, make_store):
+    monkeypatch.setattr(settings, "VECTOR_PQ_M", 8)
+    vs = make_store("auto")
+    n, d = 20_000, 64
+    monkeypatch.setattr(settings, "VECTOR_MEMORY_BUDGET_MB", 0)
+    assert vs._target_kind(n) == "flat"
+    monkeypatch.setattr(settings, "VECTOR_MEMORY_BUDGET_MB", n * d * 3 / 2**20)
+    assert vs._target_kind(n) == "fp16"
+    monkeypatch.setattr(settings, "VECTOR_MEMORY_BUDGET_MB", n * d / 2**20)
+    assert vs._target_kind(n) == "sq8"
+    monkeypatch.setattr(settings, "VECTOR_MEMORY_BUDGET_MB", n * 10 / 2**20)
+    assert vs._target_kind(n) == "pq"
+    # Too few vectors to train PQ codebooks yet
+    assert vs._target_kind(5000) == "flat"
@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.services.vector_filter import VectorFilter
+from app.services.vector_shards import ShardedVectorStore
+from app.services.vector_store import VectorStore, _ReadWriteLock
+
+WRITERS, READERS, BATCHES, BATCH = 6, 6, 20, 4
+
+
+def _meta(n, ts=None):
+    meta = {"message_id": str(uuid.UUID(int=n + 1)), "conversation_id": f"conv-{n // (BATCHES * BATCH)}",
+            "role": "user", "mode": "chat", "n": n}
+    if ts is not None:
+        meta["timestamp"] = ts.isoformat()
+    return meta
+
+
+def _consistent(meta):
+    # Metadata read back for a hit must be the row written together with that vector
+    n = meta["n"]
+    return meta["message_id"] == str(uuid.UUID(int=n + 1)) and meta["conversation_id"] == f"conv-{n // (BATCHES * BATCH)}"
+
+
+def _hammer(vs, timestamp=None, migrate=False):
+    """Run writers, readers (and optionally a migrator) against `vs` at once; returns (added, removed)."""
+    errors, added, removed = [], {}, set()
+    guard = threading.Lock()
+    start = threading.Barrier(WRITERS + READERS + int(migrate))
+    writers_done = threading.Event()
+
+    def writer(w):
+        try:
+            start.wait()
+            for b in range(BATCHES):
+                ns = [(w * BATCHES + b) * BATCH + i for i in range(BATCH)]
+                metas = [_meta(n, timestamp(n) if timestamp else None) for n in ns]
+                ids = vs.add_texts([f"writer {w} note {n}" for n in ns], metas)
+                with guard:
+                    added.update(zip(ids, metas))
+                if b % 5 == 4:
+                    assert vs.remove_ids([ids[0]]) == 1
+                    with guard:
+                        removed.add(ids[0])
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    def reader(r):
+        try:
+            start.wait()
+            while not writers_done.is_set():
+                for _, meta in vs.search(f"writer {r} note", k=5):
+                    assert _consistent(meta)
+                for _, meta in vs.search("note", k=5, filters=VectorFilter(conversation_id=f"conv-{r}")):
+                    assert meta["conversation_id"] == f"conv-{r}" and _consistent(meta)
+                assert vs.stats()["live"] >= 0
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    def migrator():
+        try:
+            start.wait()
+            for _ in range(3):
+                if writers_done.wait(0.02):
+                    break
+                vs.migrate()
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(WRITERS)]
+    threads += [threading.Thread(target=reader, args=(r,)) for r in range(READERS)]
+    if migrate:
+        threads.append(threading.Thread(target=migrator))
+    for t in threads:
+        t.start()
+    for t in threads[:WRITERS]:
+        t.join()
+    writers_done.set()
+    for t in threads[WRITERS:]:
+        t.join()
+    assert not errors, errors
+    return added, removed
+
+
+@pytest.mark.parametrize("index_type", ["flat", "sparse", "hnsw"])
+def test_parallel_add_and_search_stay_consistent(tmp_path, monkeypatch, index_type):
+    # Small log threshold so snapshots are written while searches run (durability is not under test)
+    monkeypatch.setattr(settings, "VECTOR_LOG_COMPACT_BYTES", 64 * 1024)
+    monkeypatch.setattr(settings, "VECTOR_SNAPSHOT_FSYNC", False)
+    paths = dict(index_path=str(tmp_path / "v.index"), meta_path=str(tmp_path / "v_meta.json"), index_type=index_type)
+    vs = VectorStore(dim=64, **paths)
+    added, removed = _hammer(vs, migrate=True)
+
+    # No ID handed out twice, every vector kept its own metadata
+    assert len(added) == WRITERS * BATCHES * BATCH
+    assert vs.stats()["live"] == len(added) - len(removed)
+    for vid, meta in added.items():
+        assert vs.get_meta(vid) == (None if vid in removed else meta)
+
+    vs.compact()
+    reopened = VectorStore(dim=64, **paths)
+    assert reopened.stats()["live"] == len(added) - len(removed)
+    assert all(reopened.get_meta(vid) == meta for vid, meta in added.items() if vid not in removed)
+
+
+def test_parallel_writes_across_shards(tmp_path):
+    vs = ShardedVectorStore(root=str(tmp_path / "shards"), dim=64, threads=4)
+    # Each writer's batches land in a different month, so shards are opened while searches run
+    added, removed = _hammer(vs, timestamp=lambda n: datetime(2024, 1 + n % 6, 10))
+    assert len(added) == WRITERS * BATCHES * BATCH
+    assert vs.stats()["live"] == len(added) - len(removed)
+    assert all(vs.get_meta(vid) == meta for vid, meta in added.items() if vid not in removed)
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = _ReadWriteLock()
+    order = []
+
+    def write():
+        with lock.write():
+            order.append("write")
+
+    def read():
+        with lock.read():
+            order.append("read")
+
+    with lock.read():
+        w = threading.Thread(target=write)
+        w.start()
+        while not lock._writers_waiting:
+            time.sleep(0.001)
+        r = threading.Thread(target=read)
+        r.start()
+        time.sleep(0.05)
+        assert order == []
+    w.join()
+    r.join()
+    assert order == ["write", "read"]
@@ -0,0 +1,63 @@
+from app.core.config import settings
+
+
+def _meta(i):
+    return {"message_id": f"m{i}", "conversation_id": f"c{i % 3}"}
+
+
+def test_remove_hides_vectors_and_survives_restart(make_store):
+    vs = make_store()
+    texts = [f"note {i} about topic{i}" for i in range(9)]
+    ids = vs.add_texts(texts, [_meta(i) for i in range(9)])
+    assert ids == list(range(9))
+
+    assert vs.remove_where("conversation_id", ["c1"]) == 3
+    assert vs.remove_where("message_id", ["m0"]) == 1
+    assert vs.remove_ids([1]) == 0  # already gone
+    hits = vs.search("note topic1", k=9)
+    assert {m["message_id"] for _, m in hits} == {"m2", "m3", "m5", "m6", "m8"}
+
+    # Removal is logged and replayed; new IDs keep counting up
+    reopened = make_store()
+    assert reopened.stats()["live"] == 5
+    assert reopened.add_texts(["late"], [_meta(9)]) == [9]
+    reopened.compact()
+    again = make_store()
+    assert again.stats()["tombstones"] == 4
+    assert again.search("late", k=1)[0][1]["message_id"] == "m9"
+
+
+def test_purge_rebuilds_without_dead_vectors(monkeypatch, make_store):
+    monkeypatch.setattr(settings, "VECTOR_TOMBSTONE_PURGE_MIN", 1)
+    monkeypatch.setattr(settings, "VECTOR_TOMBSTONE_PURGE_RATIO", 0.5)
+    vs = make_store()
+    vs.add_texts([f"item {i}" for i in range(10)], [_meta(i) for i in range(10)])
+    vs.remove_ids(list(range(6)))
+    if vs._migration is not None:
+        vs._migration.join()
+    stats = vs.stats()
+    assert stats["ntotal"] == 4 and stats["tombstones"] == 0
+    assert vs._ids.ids.tolist() == [6, 7, 8, 9]
+    assert vs.search("item 7", k=1)[0][1]["message_id"] == "m7"
+    assert make_store().add_texts(["next"], [_meta(10)]) == [10]
+
+
+def test_memory_service_deletes_purge_vectors():
+    from app.services.memory_service import memory_service
+    from app.services.privacy_service import privacy_service
+    from app.services.vector_store import vector_store
+
+    conv = memory_service.store_conversation("delete me")
+    msg = memory_service.add_message(conv.id, "user", "zebra xylophone quartz")
+    other = memory_service.add_message(conv.id, "user", "zebra xylophone quartz again")
+    vector_store.flush()
+    assert memory_service.delete_message(msg.id)
+    assert vector_store.ids_where("message_id", [msg.id]) == []
+    assert memory_service.delete_conversation(conv.id)
+    assert vector_store.ids_where("conversation_id", [conv.id]) == []
+
+    conv2 = memory_service.store_conversation("retention")
+    old = memory_service.add_message(conv2.id, "user", "ancient record")
+    vector_store.flush()
+    assert privacy_service.delete_messages_older_than(-1) >= 1
+    assert vector_store.ids_where("message_id", [old.id, other.id]) == []
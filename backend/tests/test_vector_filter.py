@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.vector_filter import VectorFilter
+from app.services.vector_store import VectorStore
+
+NOW = datetime(2025, 1, 31, 12, 0, 0)
+
+
+def _populate(vs):
+    texts, metas = [], []
+    for i in range(40):
+        texts.append(f"apple banana report {i}" if i % 4 else f"apple banana apple banana {i}")
+        metas.append({
+            "message_id": f"m{i}",
+            "conversation_id": f"c{i % 4}",
+            "role": "assistant" if i % 2 else "user",
+            "mode": "chat",
+            "timestamp": (NOW - timedelta(days=i)).isoformat(),
+        })
+    vs.add_texts(texts, metas)
+    return metas
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "sparse"])
+@pytest.mark.parametrize("exact_max", [0, 4096])
+def test_filtered_search_returns_only_matches(tmp_path, monkeypatch, index_type, exact_max):
+    monkeypatch.setattr(settings, "VECTOR_FILTER_EXACT_MAX", exact_max)
+    vs = VectorStore(dim=64, index_path=str(tmp_path / "v.index"), meta_path=str(tmp_path / "v_meta.json"),
+                     index_type=index_type)
+    _populate(vs)
+
+    # Global top-k is dominated by c0; a conversation filter still fills k from c3
+    hits = vs.search("apple banana", k=5, filters=VectorFilter(conversation_id="c3"))
+    assert len(hits) == 5 and {m["conversation_id"] for _, m in hits} == {"c3"}
+
+    hits = vs.search("apple banana", k=40, filters=VectorFilter(role="assistant", since=NOW - timedelta(days=9)))
+    assert sorted(m["message_id"] for _, m in hits) == ["m1", "m3", "m5", "m7", "m9"]
+
+    vs.remove_where("message_id", ["m3"])
+    hits = vs.search("apple banana", k=40, filters=VectorFilter(conversation_id="c3", until=NOW - timedelta(days=20)))
+    assert sorted(m["message_id"] for _, m in hits) == ["m23", "m27", "m31", "m35", "m39"]
+    assert vs.search("apple", k=5, filters=VectorFilter(conversation_id="nope")) == []
+
+
+def test_semantic_search_endpoint_filters():
+    from app.main import app
+    from app.services.memory_service import memory_service
+
+    conv = memory_service.store_conversation("filter")
+    memory_service.add_message(conv.id, "user", "kumquat orchard question")
+    memory_service.add_message(conv.id, "assistant", "kumquat orchard answer")
+    other = memory_service.store_conversation("other")
+    memory_service.add_message(other.id, "assistant", "kumquat orchard elsewhere")
+
+    client = TestClient(app)
+    resp = client.post("/api/v1/search/semantic", json={
+        "query": "kumquat orchard", "conversation_id": conv.id, "role": "assistant", "read_your_writes": True,
+    })
+    assert resp.status_code == 200
+    assert [r["content"] for r in resp.json()] == ["kumquat orchard answer"]
@@ -0,0 +1,36 @@
+import os
+
+from app.services.embedding_service import embedding_service
+
+
+def test_adds_append_to_log_and_replay_on_startup(make_store):
+    vs = make_store(dim=embedding_service.dim)
+    for i in range(5):
+        vs.add_texts([f"note number {i} about apples"], [{"id": f"m{i}"}])
+    # No full rewrite per add: only the log grows
+    assert vs.snapshot_version is None
+    assert vs._log.size_bytes > 0
+
+    reopened = make_store(dim=embedding_service.dim)
+    assert reopened._index.ntotal == 5
+    assert reopened.get_meta(4) == {"id": "m4"}
+    assert reopened.search("number 3 apples", k=1)[0][1]["id"] == "m3"
+
+
+def test_torn_tail_is_dropped_and_compaction_snapshots(make_store):
+    vs = make_store(dim=embedding_service.dim)
+    vs.add_texts(["first entry"], [{"id": "a"}])
+    vs.add_texts(["second entry"], [{"id": "b"}])
+    # Simulate a crash mid-append
+    with open(vs._log.path, "ab") as f:
+        f.write(b"VLOG\x01garbage")
+    reopened = make_store(dim=embedding_service.dim)
+    assert reopened._index.ntotal == 2
+
+    reopened.compact()
+    assert os.path.exists(os.path.join(reopened.snapshot_path, "index"))
+    assert reopened._log.size_bytes == 0
+    reopened.add_texts(["third entry"], [{"id": "c"}])
+    final = make_store(dim=embedding_service.dim)
+    assert final._index.ntotal == 3
+    assert [final.get_meta(i)["id"] for i in range(3)] == ["a", "b", "c"]
@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import faiss
+import numpy as np
+
+from app.services.vector_meta import VectorMetaStore
+from app.services.vector_store import VectorStore
+
+
+def _msg_meta(i):
+    return {
+        "message_id": str(uuid.UUID(int=i + 1)),
+        "conversation_id": f"conv-{i % 2}",
+        "role": "user",
+        "mode": "chat",
+        "timestamp": datetime(2025, 1, 1, 12, 0, i).isoformat(),
+    }
+
+
+def test_columns_round_trip_and_persist_memory_mapped(tmp_path):
+    metas = [_msg_meta(0), _msg_meta(1), {"id": "custom", "role": "assistant"},
+             {"message_id": "not-a-uuid", "timestamp": "2025-01-01T00:00:00+02:00"}, None]
+    store = VectorMetaStore()
+    store.append([10, 11, 12, 13, 14], metas)
+    assert [store.get(i, 10 + i) for i in range(5)] == metas
+    # Only the values that do not fit a column are kept as Python objects
+    assert set(store._extras) == {12, 13}
+
+    store.write(str(tmp_path / "meta.cols"))
+    loaded = VectorMetaStore.read(str(tmp_path / "meta.cols"))
+    assert isinstance(loaded.col("timestamp"), np.memmap)
+    assert [loaded.get(i, 10 + i) for i in range(5)] == metas
+    ids = np.arange(10, 15)
+    assert loaded.match("message_id", [metas[1]["message_id"], "not-a-uuid"], ids).tolist() == [False, True, False, True, False]
+    loaded.append([15], [_msg_meta(5)])
+    assert loaded.get(5, 15) == _msg_meta(5)
+
+
+def test_vector_store_converts_legacy_json_meta(tmp_path):
+    index_path, meta_path = str(tmp_path / "v.index"), str(tmp_path / "v_meta.json")
+    vs = VectorStore(dim=64, index_path=index_path, meta_path=meta_path)
+    vs.add_texts(["alpha note", "beta note"], [_msg_meta(0), _msg_meta(1)])
+    vs.compact()
+    # Rewrite the snapshot the way earlier versions stored it
+    faiss.write_index(vs._index, index_path)
+    shutil.rmtree(vs.snapshot_dir)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"0": _msg_meta(0), "1": _msg_meta(1)}, f)
+
+    reopened = VectorStore(dim=64, index_path=index_path, meta_path=meta_path)
+    assert reopened.get_meta(1) == _msg_meta(1)
+    assert reopened.search("beta", k=1)[0][1] == _msg_meta(1)
+    reopened.compact()
+    assert VectorMetaStore.read(os.path.join(reopened.snapshot_path, "meta")).get(0, 0) == _msg_meta(0)
+    assert not os.path.exists(index_path)
@@ -0,0 +1,33 @@
+import faiss
+import numpy as np
+import pytest
+
+from app.core.config import settings
+
+pytestmark = pytest.mark.skipif(not hasattr(faiss, "IO_FLAG_MMAP_IFC"), reason="FAISS without mmap support")
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_snapshot_is_memory_mapped_and_copied_on_write(index_type, make_store):
+    vs = make_store(index_type)
+    vs.add_texts([f"entry {i} about pears" for i in range(10)], [{"id": i} for i in range(10)])
+    vs.add_texts([f"entry {i} about pears" for i in range(10, 20)], [{"id": i} for i in range(10, 20)])
+    assert vs.compact_if_dirty() and not vs.compact_if_dirty()
+
+    mapped = make_store(index_type)
+    assert mapped.stats()["mmap"] is True
+    assert mapped.search("entry 7 pears", k=1)[0][1] == {"id": 7}
+
+    # First write materializes a private copy instead of resizing the read-only view
+    mapped.add_texts(["entry 20 about plums"], [{"id": 20}])
+    assert mapped.stats()["mmap"] is False
+    assert mapped.search("entry 20 plums", k=1)[0][1] == {"id": 20}
+    np.testing.assert_allclose(mapped._index.reconstruct(3), vs._index.reconstruct(3))
+
+
+def test_mmap_can_be_disabled(monkeypatch, make_store):
+    vs = make_store()
+    vs.add_texts(["only entry"], [{"id": 0}])
+    vs.compact()
+    monkeypatch.setattr(settings, "VECTOR_INDEX_MMAP", False)
+    assert make_store().stats()["mmap"] is False
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from app.services.memory_service import memory_service, message_vector_meta
+from app.services.vector_reindex import VectorReindexer
+
+
+@pytest.fixture
+def database(database):
+    result = database.import_data({
+        "conversations": [{"id": "c1", "title": "one"}, {"id": "c2", "title": "two"}],
+        "messages": [
+            {"conversation_id": f"c{1 + i % 2}", "role": "user", "content": f"note {i} about topic{i}",
+             "timestamp": datetime(2024, 1 + i % 3, 5, 12, 0, i).isoformat()}
+            for i in range(30)
+        ],
+    })
+    assert result["messages"] == 30
+    return database
+
+
+def _hit_ids(store, query, k=5):
+    return [m["message_id"] for _, m in store.search(query, k=k)]
+
+
+def test_rebuild_from_database(database, make_store):
+    store = make_store()
+    reindexer = VectorReindexer(store=store, database=database, batch_size=7)
+    assert reindexer.needed() == "missing"
+
+    status = reindexer.run()
+    assert status["state"] == "done" and status["indexed"] == status["total"] == 30 == status["live"]
+    assert status["messages_per_sec"] > 0
+    target = next(m for page in database.iter_messages(100) for m in page if m.content == "note 17 about topic17")
+    assert _hit_ids(store, "note 17 about topic17")[0] == target.id
+    assert reindexer.needed() is None
+
+    reopened = make_store()
+    assert reopened.stats()["live"] == 30 and reopened.stats()["log_bytes"] == 0
+    assert _hit_ids(reopened, "note 17 about topic17")[0] == target.id
+
+
+def test_changes_during_rebuild_are_carried_over(database, make_store):
+    store = make_store()
+    reindexer = VectorReindexer(store=store, database=database, batch_size=7)
+    reindexer.run()
+    victim = next(m for page in database.iter_messages(100) for m in page if m.content == "note 3 about topic3")
+    added = []
+
+    def batches():
+        for i, batch in enumerate(reindexer._batches()):
+            if i == 1:
+                # Concurrent chat traffic: one new message, one deletion
+                msg = database.add_message("c1", "user", "zebra crossing at midnight")
+                store.add_texts([msg.content], [message_vector_meta(msg)])
+                added.append(msg.id)
+                database.delete_message(victim.id)
+                store.remove_where("message_id", [victim.id])
+            yield batch
+
+    assert store.rebuild(batches(), reindexer._catch_up) == 30
+    assert store.ids_where("message_id", added) and len(store.ids_where("message_id", added)) == 1
+    assert _hit_ids(store, "zebra crossing at midnight")[0] == added[0]
+    assert store.ids_where("message_id", [victim.id]) == []
+
+
+def test_unreadable_index_is_flagged_and_rebuilt(tmp_path, database, make_store):
+    with open(tmp_path / "v.index", "wb") as f:
+        f.write(b"not an index")
+    store = make_store()
+    reindexer = VectorReindexer(store=store, database=database)
+    assert store.stats()["rebuild_reason"] == reindexer.needed() == "unreadable"
+    assert reindexer.start() and not reindexer.start()
+    assert reindexer.wait(timeout=30)["state"] == "done"
+    assert store.rebuild_reason is None and store.stats()["live"] == 30
+
+
+def test_rebuild_sharded_store(database, make_store):
+    store = make_store(sharded=True, threads=2)
+    status = VectorReindexer(store=store, database=database, batch_size=8).run()
+    assert status["live"] == 30
+    assert sorted(os.listdir(store.root)) == ["2024-01", "2024-02", "2024-03"]
+    assert {name: s["live"] for name, s in store.stats()["shards"].items()} == {"2024-01": 10, "2024-02": 10, "2024-03": 10}
+
+
+def test_import_indexes_messages():
+    conv = memory_service.store_conversation("imported")
+    result = memory_service.import_data({"messages": [
+        {"conversation_id": conv.id, "role": "user", "content": "quokka sanctuary opening hours"},
+    ]})
+    assert result["messages"] == result["indexed_messages"] == 1
+    hits = memory_service.semantic_search("quokka sanctuary opening hours", read_your_writes=True)
+    assert hits and hits[0].content == "quokka sanctuary opening hours"
@@ -0,0 +1,44 @@
+import os
+import uuid
+from datetime import datetime
+
+from app.services.vector_filter import VectorFilter
+from app.services.vector_shards import SHARD_ID_BITS, month_key
+
+
+def _meta(i, ts):
+    return {"message_id": str(uuid.UUID(int=i + 1)), "conversation_id": "c", "role": "user", "mode": "chat",
+            "timestamp": ts.isoformat()}
+
+
+def test_writes_route_by_month_and_search_merges(make_store):
+    vs = make_store(sharded=True, threads=2)
+    months = [datetime(2024, 11, 5), datetime(2024, 12, 5), datetime(2025, 1, 5)]
+    texts = [f"lantern festival night {i}" for i in range(6)]
+    metas = [_meta(i, months[i % 3]) for i in range(6)]
+    ids = vs.add_texts(texts, metas)
+    assert sorted(os.listdir(vs.root)) == ["2024-11", "2024-12", "2025-01"]
+    assert [vid >> SHARD_ID_BITS for vid in ids] == [month_key(metas[i]["timestamp"]) for i in range(6)]
+    assert vs.get_meta(ids[4]) == metas[4]
+
+    hits = vs.search("lantern festival night 4", k=3)
+    assert len(hits) == 3 and hits[0][1] == metas[4]
+    assert [h[0] for h in hits] == sorted((h[0] for h in hits), reverse=True)
+    # A time filter only consults the matching shard
+    hits = vs.search("lantern festival", k=6, filters=VectorFilter(since=datetime(2025, 1, 1)))
+    assert {m["message_id"] for _, m in hits} == {metas[2]["message_id"], metas[5]["message_id"]}
+
+    reopened = make_store(sharded=True, threads=2)
+    assert reopened.stats()["live"] == 6
+    assert reopened.search_batch(["lantern festival night 4"], k=1)[0][0][1] == metas[4]
+
+
+def test_retention_drops_whole_shards(make_store):
+    vs = make_store(sharded=True, threads=2)
+    vs.add_texts(["old one", "old two", "mid", "new"], [
+        _meta(0, datetime(2024, 1, 3)), _meta(1, datetime(2024, 1, 20)),
+        _meta(2, datetime(2024, 2, 10)), _meta(3, datetime(2024, 3, 1)),
+    ])
+    assert vs.drop_older_than(datetime(2024, 2, 15)) == 3
+    assert sorted(os.listdir(vs.root)) == ["2024-02", "2024-03"]
+    assert [m["message_id"] for _, m in vs.search("old mid new", k=5)] == [_meta(3, datetime(2024, 3, 1))["message_id"]]
@@ -0,0 +1,100 @@
+import json
+import os
+
+import faiss
+
+from app.services.embedding_service import embedding_service
+from app.services.vector_snapshot import MANIFEST
+
+
+def _add(vs, start, n):
+    vs.add_texts([f"note {i} about kiwis" for i in range(start, start + n)], [{"id": i} for i in range(start, start + n)])
+
+
+def _manifest(vs, version):
+    with open(os.path.join(vs._snapshots.path(version), MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_snapshots_are_versioned_and_pruned(make_store):
+    vs = make_store(dim=embedding_service.dim)
+    for v in range(3):
+        _add(vs, v * 5, 5)
+        vs.compact()
+    assert vs._snapshots.versions() == [2, 3] and vs.snapshot_version == 3
+    manifest = _manifest(vs, 3)
+    assert manifest["ntotal"] == manifest["live"] == 15 and manifest["next_id"] == 15
+    assert manifest["dim"] == embedding_service.dim
+    assert manifest["embedding"]["version"] == embedding_service.version
+    assert {"index", "ids"} <= set(manifest["files"]) and all("crc32" in f for f in manifest["files"].values())
+
+    # A snapshot interrupted before its rename is ignored and cleaned up
+    os.makedirs(os.path.join(vs.snapshot_dir, "00000004.tmp"))
+    reopened = make_store(dim=embedding_service.dim)
+    assert reopened.snapshot_version == 3 and reopened.stats()["live"] == 15
+    reopened.compact()
+    assert sorted(os.listdir(reopened.snapshot_dir)) == ["00000003", "00000004"]
+
+
+def test_damaged_snapshot_falls_back_to_previous(make_store):
+    vs = make_store(dim=embedding_service.dim)
+    _add(vs, 0, 5)
+    vs.compact()
+    _add(vs, 5, 5)
+    vs.compact()
+    # Flip a byte in the newest index: size still matches, the checksum does not
+    path = os.path.join(vs._snapshots.path(2), "index")
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    reopened = make_store(dim=embedding_service.dim)
+    assert reopened.snapshot_version == 1 and reopened.rebuild_reason is None
+    assert reopened.stats()["live"] == 5 and reopened.get_meta(4) == {"id": 4}
+    # Changes logged after the fallback snapshot still replay on top of it
+    _add(reopened, 10, 1)
+    again = make_store(dim=embedding_service.dim)
+    assert again.snapshot_version == 1 and again.get_meta(10) == {"id": 10}
+
+
+def test_all_snapshots_damaged_needs_rebuild(make_store):
+    vs = make_store(dim=embedding_service.dim)
+    _add(vs, 0, 3)
+    vs.compact()
+    os.remove(os.path.join(vs.snapshot_path, "ids"))
+    reopened = make_store(dim=embedding_service.dim)
+    assert reopened.rebuild_reason == "unreadable" and reopened.stats()["live"] == 0
+
+
+def test_embedding_version_change_is_detected(make_store):
+    vs = make_store(dim=embedding_service.dim)
+    _add(vs, 0, 3)
+    vs.compact()
+    path = os.path.join(vs.snapshot_path, MANIFEST)
+    manifest = _manifest(vs, vs.snapshot_version)
+    manifest["embedding"]["version"] = "some-other-model"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    assert make_store(dim=embedding_service.dim).rebuild_reason == "embedding_changed"
+
+
+def test_legacy_files_are_migrated(tmp_path, make_store):
+    vs = make_store(dim=embedding_service.dim)
+    _add(vs, 0, 4)
+    vs.compact()
+    # Lay the snapshot out the way earlier releases did: unversioned files beside the log
+    legacy = str(tmp_path / "v.index")
+    faiss.write_index(vs._index, legacy)
+    vs._ids.write(f"{legacy}.ids")
+    vs._meta.write(vs.meta_dir)
+    for version in vs._snapshots.versions():
+        os.rename(vs._snapshots.path(version), str(tmp_path / f"old-{version}"))
+
+    reopened = make_store(dim=embedding_service.dim)
+    assert reopened.snapshot_version is None and reopened.get_meta(3) == {"id": 3}
+    reopened.compact()
+    assert reopened.snapshot_version == 1
+    assert not os.path.exists(legacy) and not os.path.exists(f"{legacy}.ids") and not os.path.exists(vs.meta_dir)
+    assert make_store(dim=embedding_service.dim).get_meta(3) == {"id": 3}
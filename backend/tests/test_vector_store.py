@@ -1,5 +1,8 @@
 import os
 import tempfile
+
+import numpy as np
+
 from app.services.vector_store import VectorStore
 from app.services.embedding_service import EmbeddingService
 
@@ -31,3 +34,13 @@ def test_vector_store_add_and_search():
         score, meta = results[0]
         assert isinstance(score, float)
         assert "id" in meta
+
+
+def test_dimension_mismatch_is_logged_once(tmp_path, caplog):
+    vs = VectorStore(dim=64, index_path=str(tmp_path / "v.index"), meta_path=str(tmp_path / "v_meta.json"))
+    vs.add_vectors(np.eye(64, dtype=np.float32)[:3], [{"id": i} for i in range(3)])
+    query = np.ones((1, 32), dtype=np.float32)
+    with caplog.at_level("WARNING", logger="app.services.vector_store"):
+        assert vs.search_vectors(query, k=2) == [[]]
+        assert vs.search_vectors(query, k=2) == [[]]
+    assert sum("has dimension 64 but queries have 32" in r.getMessage() for r in caplog.records) == 1
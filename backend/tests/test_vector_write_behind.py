@@ -0,0 +1,103 @@
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_service import embedding_service
+from app.services.vector_store import VectorStore
+
+
+def test_enqueue_acknowledges_immediately_and_flushes_in_batches(tmp_path, monkeypatch):
+    vs = VectorStore(
+        dim=embedding_service.dim,
+        index_path=os.path.join(str(tmp_path), "v.index"),
+        meta_path=os.path.join(str(tmp_path), "v_meta.json"),
+    )
+    gate = threading.Event()
+    batches = []
+    real_add = vs.add_texts
+
+    def slow_add(texts, metas):
+        gate.wait(5)
+        batches.append(len(texts))
+        return real_add(texts, metas)
+
+    vs._write_queue._sink = slow_add
+    for i in range(10):
+        vs.enqueue_texts([f"queued message {i}"], [{"id": i}])
+    # Nothing indexed yet; the caller was not blocked
+    assert vs._index.ntotal == 0
+    assert vs.pending_writes == 10
+    gate.set()
+
+    hits = vs.search("queued message 7", k=1, read_your_writes=True)
+    assert hits and hits[0][1]["id"] == 7
+    assert vs.pending_writes == 0
+    assert vs._index.ntotal == 10
+    # Inserts were grouped rather than indexed one by one
+    assert len(batches) < 10
+
+
+def test_failed_batches_are_retried_then_counted(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_WRITE_RETRY_MS", 10.0)
+    vs = VectorStore(
+        dim=embedding_service.dim,
+        index_path=os.path.join(str(tmp_path), "v.index"),
+        meta_path=os.path.join(str(tmp_path), "v_meta.json"),
+    )
+    calls = []
+    real_add = vs.add_texts
+
+    def flaky_add(texts, metas):
+        calls.append(len(texts))
+        if len(calls) == 1:
+            raise RuntimeError("embedding backend down")
+        return real_add(texts, metas)
+
+    vs._write_queue._sink = flaky_add
+    vs.enqueue_texts(["retried message"], [{"id": 1}])
+    assert vs.flush(timeout=5)
+    assert vs._index.ntotal == 1 and len(calls) == 2
+    assert vs.stats()["write_errors"] == 1 and vs.stats()["write_dropped"] == 0
+
+    def broken_add(texts, metas):
+        raise RuntimeError("still down")
+
+    vs._write_queue._sink = broken_add
+    vs.enqueue_texts(["lost message", "another"], [{"id": 2}, {"id": 3}])
+    assert vs.flush(timeout=5)
+    assert vs._index.ntotal == 1
+    assert vs.stats()["write_errors"] == 1 + settings.VECTOR_WRITE_ATTEMPTS
+    assert vs.stats()["write_dropped"] == 2
+
+
+@pytest.mark.parametrize("sharded", [False, True])
+def test_deletes_reach_inserts_still_queued_or_in_flight(make_store, sharded):
+    vs = make_store(dim=embedding_service.dim, sharded=sharded)
+    started, gate = threading.Event(), threading.Event()
+    real_add = vs.add_texts
+
+    def slow_add(texts, metas):
+        started.set()
+        gate.wait(5)
+        return real_add(texts, metas)
+
+    vs._write_queue._sink = slow_add
+    ts = "2024-05-01T12:00:00"
+    vs.enqueue_texts(["in flight"], [{"message_id": "a", "conversation_id": "c1", "timestamp": ts}])
+    assert started.wait(5)
+    vs.enqueue_texts(["queued", "kept", "expired"], [
+        {"message_id": "b", "conversation_id": "c1", "timestamp": ts},
+        {"message_id": "c", "conversation_id": "c2", "timestamp": ts},
+        {"message_id": "d", "conversation_id": "c2", "timestamp": "2020-01-01T00:00:00"},
+    ])
+    # Nothing is indexed yet and neither call waits for the sink
+    assert vs.remove_where("conversation_id", ["c1"]) == 0
+    assert vs.drop_older_than(datetime(2021, 1, 1)) == 0
+    assert vs.pending_writes == 2  # "a" in flight, "c" queued
+    gate.set()
+    assert vs.flush(timeout=5)
+    assert vs.ids_where("conversation_id", ["c1"]) == []
+    assert [vs.get_meta(vid)["message_id"] for vid in vs.ids_where("conversation_id", ["c2"])] == ["c"]